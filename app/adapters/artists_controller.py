@@ -1,25 +1,49 @@
+import asyncio
+import math
 import logging
-from typing import Optional, List
-from fastapi import APIRouter, status, Depends, HTTPException, Body
+from typing import List, Optional, Set
+from fastapi import APIRouter, status, Depends, HTTPException, Body, Header, Query
 from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
 
 from app.adapters.dtos.artists import (
     ArtistResponseDto,
     ArtistRequestDto,
     UpdateArtistRequestDto,
     CompleteArtistResponseDto,
+    ArtistBulkItemResponseDto,
+    ArtistBulkResponseDto,
 )
+from app.adapters.dtos.bulk import CREATED
+from app.adapters.conditional import (
+    ProfileViews,
+    expand_variant,
+    get_artist_views,
+    if_match_versions,
+    make_etag,
+    profile_version,
+)
+from app.adapters.expand import expand_ids, expand_param
+from app.adapters.export import ndjson_response, users_enricher
+from app.adapters.responses import DtoResponse
+from app.adapters.pagination import MAX_PAGE_SIZE, set_next_cursor
+from app.conf.config import Settings, get_settings
 from app.db import DatabaseManager, get_database
 from app.db.impl.artist_manager import ArtistManager
-from app.db.model.artist import ArtistModel, UpdateArtistModel
+from app.db.impl.versioning import VersionConflictError
+from app.db.model.artist import ArtistListModel, ArtistModel, UpdateArtistModel
 from app.db.model.artist import CompleteArtistModel
-from app.rest import get_restclient_user, get_restclient_multimedia
+from app.rest import (
+    get_restclient_user,
+    get_restclient_multimedia,
+    get_multimedia_loader,
+)
+from app.rest.circuit_breaker import CircuitOpenError
 from app.rest.users_client import UserClient
 from app.rest.dtos.request.album import AlbumRequestDto
 from app.rest.dtos.request.user import UserRequestDto, UpdateUserRequestDto
 from app.rest.dtos.request.song import SongRequestDto
 from app.rest.multimedia_client import MultimediaClient
+from app.rest.multimedia_loader import MultimediaLoader
 
 router = APIRouter(tags=["artists"])
 
@@ -33,7 +57,7 @@ async def create_profile(
     req: ArtistRequestDto = Body(...),
     db: DatabaseManager = Depends(get_database),
     rest_user: UserClient = Depends(get_restclient_user),
-    rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
 ):
     manager = ArtistManager(db.db)
     try:
@@ -45,18 +69,18 @@ async def create_profile(
             location=req.location,
             email=req.email,
         )
-        user = rest_user.create_user(user_req)
+        user = await rest_user.create_user(user_req)
         artist_model = ArtistModel(
             user_id=user.id,
             songs=req.songs,
             albums=req.albums,
-            cover_picture=req.cover_picture
+            cover_picture=req.cover_picture,
         )
 
         created_profile = await manager.add_profile(artist_model)
 
-        albums = rest_media.get_albums(created_profile["albums"])
-        songs = rest_media.get_songs(created_profile["songs"])
+        albums = await loader.get_albums(created_profile["albums"])
+        songs = await loader.get_songs(created_profile["songs"])
 
         complete_artist_model = CompleteArtistModel(
             user_id=user.id,
@@ -65,15 +89,96 @@ async def create_profile(
         )
         artist = ArtistModel(**created_profile)
         dto = CompleteArtistResponseDto.from_models(artist, user, complete_artist_model)
-        return JSONResponse(
-            status_code=status.HTTP_201_CREATED, content=jsonable_encoder(dto)
-        )
+        return DtoResponse(dto, status_code=status.HTTP_201_CREATED)
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Could not create User. Exception: {e}"
         )
 
 
+@router.post(
+    "/artists:bulk",
+    response_description="Add many artist profiles",
+    response_model=ArtistBulkResponseDto,
+)
+async def create_profiles(
+    reqs: List[ArtistRequestDto] = Body(...),
+    enrich: bool = False,
+    db: DatabaseManager = Depends(get_database),
+    rest_user: UserClient = Depends(get_restclient_user),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
+    settings: Settings = Depends(get_settings),
+):
+    if len(reqs) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.bulk_max_items} profiles per request",
+        )
+
+    users = await rest_user.create_users(
+        [
+            UserRequestDto(
+                firebase_id=req.firebase_id,
+                first_name=req.first_name,
+                last_name=req.last_name,
+                role="ARTIST",
+                location=req.location,
+                email=req.email,
+            )
+            for req in reqs
+        ],
+        settings.bulk_user_concurrency,
+    )
+
+    items = [ArtistBulkItemResponseDto(index=index) for index in range(len(reqs))]
+    pending = {}
+    for item, req, user in zip(items, reqs, users):
+        if isinstance(user, Exception):
+            item.error = f"Could not create User. Exception: {user}"
+            continue
+        item.user_id = user.id
+        pending[item.index] = ArtistModel(
+            user_id=user.id,
+            songs=req.songs,
+            albums=req.albums,
+            cover_picture=req.cover_picture,
+        )
+
+    manager = ArtistManager(db.db)
+    profiles, errors = await manager.add_profiles(list(pending.values()))
+    created = []
+    for position, (index, artist) in enumerate(pending.items()):
+        if position in errors:
+            items[index].error = f"Could not create profile: {errors[position]}"
+            continue
+        items[index].status = CREATED
+        items[index].id = profiles[position]["_id"]
+        created.append((items[index], artist, users[index]))
+
+    if enrich:
+        all_albums, all_songs = await asyncio.gather(
+            asyncio.gather(
+                *[loader.get_albums(artist.albums) for _, artist, _ in created]
+            ),
+            asyncio.gather(
+                *[loader.get_songs(artist.songs) for _, artist, _ in created]
+            ),
+        )
+        for (item, artist, user), albums, songs in zip(created, all_albums, all_songs):
+            complete_artist_model = CompleteArtistModel(
+                user_id=artist.user_id, albums=albums, songs=songs
+            )
+            item.profile = CompleteArtistResponseDto.from_models(
+                artist, user, complete_artist_model
+            )
+
+    return DtoResponse(
+        ArtistBulkResponseDto(
+            created=len(created), failed=len(items) - len(created), items=items
+        )
+    )
+
+
 @router.get(
     "/artists",
     response_description="Get a single artist profile",
@@ -82,35 +187,38 @@ async def create_profile(
 )
 async def get_profiles(
     user_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor returned as X-Next-Cursor"),
     db: DatabaseManager = Depends(get_database),
     rest_user: UserClient = Depends(get_restclient_user),
 ):
     manager = ArtistManager(db.db)
-    profiles = await manager.get_all_profiles(user_id)
+    profiles = await manager.get_all_profiles(
+        user_id, limit=limit, after=after, view=ArtistListModel
+    )
 
     user_ids = []
     for profile in profiles:
-        user_ids.append(profile["user_id"])
+        user_ids.append(profile.user_id)
 
     logging.info(f"user_ids -> {user_ids}")
 
     try:
-        users = rest_user.all(','.join(user_ids))
-        users_map = {}
-
-        for user in users:
-            users_map[user.id] = user
+        users_map, missing = await rest_user.get_many(user_ids)
+        if missing:
+            logging.error(f"Users not found: {missing}")
 
         artists = []
-        for profile in profiles:
-            artist_model = ArtistModel(**profile)
+        for artist_model in profiles:
             user = users_map.get(artist_model.user_id)
             if user:
                 artists.append(ArtistResponseDto.from_artist_model(artist_model, user))
             else:
                 logging.error(f"User with id {artist_model.user_id} not found")
 
-        return artists
+        result = DtoResponse(artists)
+        set_next_cursor(result, profiles, limit)
+        return result
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -119,6 +227,25 @@ async def get_profiles(
         )
 
 
+@router.get(
+    "/artists/export",
+    response_description="Stream every artist profile as NDJSON",
+    status_code=status.HTTP_200_OK,
+)
+async def export_profiles(
+    with_users: bool = False,
+    db: DatabaseManager = Depends(get_database),
+    rest_user: UserClient = Depends(get_restclient_user),
+    settings: Settings = Depends(get_settings),
+):
+    manager = ArtistManager(db.db)
+    return ndjson_response(
+        manager.iter_profiles(batch_size=settings.export_batch_size),
+        settings.export_batch_size,
+        enrich=users_enricher(rest_user) if with_users else None,
+    )
+
+
 @router.get(
     "/artists/{artist_id}",
     response_description="Get a single artist profile",
@@ -127,9 +254,12 @@ async def get_profiles(
 )
 async def show_profile(
     artist_id: str,
+    expand: Set[str] = Depends(expand_param("albums", "songs")),
+    if_none_match: Optional[str] = Header(None),
     db: DatabaseManager = Depends(get_database),
-    rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
     rest_user: UserClient = Depends(get_restclient_user),
+    views: ProfileViews = Depends(get_artist_views),
 ):
     manager = ArtistManager(db.db)
     profile = await manager.get_profile(id=artist_id)
@@ -138,12 +268,20 @@ async def show_profile(
             status_code=404, detail=f"Artist's Profile {artist_id} not found"
         )
 
+    version, variant = profile_version(profile), expand_variant(expand)
+    cached = await views.lookup(artist_id, version, variant)
+    if cached is not None:
+        return views.respond(cached, if_none_match)
+
     try:
         artist = ArtistModel(**profile)
-        user = rest_user.get(artist.user_id)
-
-        albums = rest_media.get_albums(profile["albums"])
-        songs = rest_media.get_songs(profile["songs"])
+        user, albums, songs = await asyncio.gather(
+            rest_user.get(artist.user_id),
+            expand_ids(
+                artist.albums, loader.get_albums if "albums" in expand else None
+            ),
+            expand_ids(artist.songs, loader.get_songs if "songs" in expand else None),
+        )
 
         complete_artist_model = CompleteArtistModel(
             user_id=artist.user_id,
@@ -151,7 +289,16 @@ async def show_profile(
             songs=songs,
         )
         dto = CompleteArtistResponseDto.from_models(artist, user, complete_artist_model)
-        return dto
+        representation = await views.store(
+            artist_id, version, variant, DtoResponse(dto), not loader.misses
+        )
+        return views.respond(representation, if_none_match)
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
     except Exception as e:
         raise HTTPException(
             status_code=404, detail=f"User data not found. Exception {e}"
@@ -168,10 +315,13 @@ async def update_profile(
     artist_id: str,
     req: UpdateArtistRequestDto = Body(...),
     db: DatabaseManager = Depends(get_database),
-    rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
     rest_user: UserClient = Depends(get_restclient_user),
+    views: ProfileViews = Depends(get_artist_views),
+    if_match: Optional[str] = Header(None),
 ):
     manager = ArtistManager(db.db)
+    expected_versions = if_match_versions(if_match)
     try:
         # update profile
         artist = UpdateArtistModel(
@@ -179,10 +329,14 @@ async def update_profile(
             songs=req.songs,
             albums=req.albums,
         )
-        response = await manager.update_profile(id=artist_id, profile=artist)
+        response = await manager.update_profile(
+            id=artist_id, profile=artist, expected_versions=expected_versions
+        )
         if not response:
             raise HTTPException(status_code=404, detail=f"Artist {artist_id} not found")
         artist = ArtistModel(**response)
+        # user fields live upstream, so the profile version may not change
+        await views.invalidate(artist_id)
         # update user
         user_req = UpdateUserRequestDto(
             firebase_id=req.firebase_id,
@@ -193,10 +347,10 @@ async def update_profile(
             email=req.email,
             status=req.status,
         )
-        user = rest_user.update(artist.user_id, user_req)
+        user = await rest_user.update(artist.user_id, user_req)
 
-        albums = rest_media.get_albums(artist.albums)
-        songs = rest_media.get_songs(artist.songs)
+        albums = await loader.get_albums(artist.albums)
+        songs = await loader.get_songs(artist.songs)
 
         complete_artist_model = CompleteArtistModel(
             user_id=artist.user_id,
@@ -204,9 +358,13 @@ async def update_profile(
             songs=songs,
         )
         dto = CompleteArtistResponseDto.from_models(artist, user, complete_artist_model)
-        return dto
+        result = DtoResponse(dto)
+        result.headers["ETag"] = make_etag(profile_version(response), result.body)
+        return result
     except HTTPException as e:
         raise e
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Error updating User. Exception {e}"
@@ -219,11 +377,16 @@ async def update_profile(
     include_in_schema=False,
     status_code=status.HTTP_200_OK,
 )
-async def delete_profile(artist_id: str, db: DatabaseManager = Depends(get_database)):
+async def delete_profile(
+    artist_id: str,
+    db: DatabaseManager = Depends(get_database),
+    views: ProfileViews = Depends(get_artist_views),
+):
     manager = ArtistManager(db.db)
     delete_result = await manager.delete_profile(artist_id)
 
     if delete_result.deleted_count == 1:
+        await views.invalidate(artist_id)
         return JSONResponse(status_code=status.HTTP_204_NO_CONTENT)
 
     raise HTTPException(status_code=404, detail=f"Artist {artist_id} not found")
@@ -240,10 +403,11 @@ async def create_album(
     album: AlbumRequestDto = Body(...),
     db: DatabaseManager = Depends(get_database),
     rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
     rest_user: UserClient = Depends(get_restclient_user),
 ):
     try:
-        album, album_id = rest_media.create_album(album)
+        album, album_id = await rest_media.create_album(album)
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Error creating album. Exception {e}"
@@ -260,9 +424,9 @@ async def create_album(
         artist_model = ArtistModel(**artist)
 
         # api calls
-        user = rest_user.get(artist_model.user_id)
-        albums = rest_media.get_albums(artist_model.albums)
-        songs = rest_media.get_songs(artist_model.songs)
+        user = await rest_user.get(artist_model.user_id)
+        albums = await loader.get_albums(artist_model.albums)
+        songs = await loader.get_songs(artist_model.songs)
 
         complete_artist_model = CompleteArtistModel(
             user_id=artist_model.user_id,
@@ -272,9 +436,9 @@ async def create_album(
         dto = CompleteArtistResponseDto.from_models(
             artist_model, user, complete_artist_model
         )
-        return JSONResponse(
-            status_code=status.HTTP_201_CREATED, content=jsonable_encoder(dto)
-        )
+        return DtoResponse(dto, status_code=status.HTTP_201_CREATED)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=404, detail=f"Error getting user/album/song info. Exception {e}"
@@ -292,11 +456,12 @@ async def create_song(
     song: SongRequestDto = Body(...),
     db: DatabaseManager = Depends(get_database),
     rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
     rest_user: UserClient = Depends(get_restclient_user),
 ):
     try:
-        song, song_id = rest_media.create_song(song)
-        success = rest_media.add_song_to_album(album_id, song_id)
+        song, song_id = await rest_media.create_song(song)
+        success = await rest_media.add_song_to_album(album_id, song_id)
     except Exception as e:
         raise HTTPException(
             status_code=400,
@@ -313,15 +478,15 @@ async def create_song(
         artist = await manager.add_song(id=artist_id, song_id=song_id)
         if not artist:
             raise HTTPException(
-                status_code=400, detail=f"Artist {artist_id} could not be updated"
+                status_code=404, detail=f"Artist {artist_id} could not be updated"
             )
 
         artist_model = ArtistModel(**artist)
 
         # api calls
-        user = rest_user.get(artist_model.user_id)
-        albums = rest_media.get_albums(artist_model.albums)
-        songs = rest_media.get_songs(artist_model.songs)
+        user = await rest_user.get(artist_model.user_id)
+        albums = await loader.get_albums(artist_model.albums)
+        songs = await loader.get_songs(artist_model.songs)
 
         complete_artist_model = CompleteArtistModel(
             user_id=artist_model.user_id,
@@ -331,7 +496,9 @@ async def create_song(
         dto = CompleteArtistResponseDto.from_models(
             artist_model, user, complete_artist_model
         )
-        return dto
+        return DtoResponse(dto)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=404, detail=f"Error getting user/album/song info. Exception {e}"
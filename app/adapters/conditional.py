@@ -0,0 +1,127 @@
+import hashlib
+from typing import List, Optional, Set
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from app.db.impl.versioning import document_version
+from app.rest import rest
+from app.rest.cache import Representation, TTLCache
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def profile_version(profile: dict) -> str:
+    return str(document_version(profile))
+
+
+def expand_variant(expand: Set[str]) -> str:
+    return ",".join(sorted(expand))
+
+
+def make_etag(version: str, body: bytes) -> str:
+    return f'"{version}-{_digest(body)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check, with the weak comparison RFC 7232 asks for."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def if_match_versions(if_match: Optional[str]) -> Optional[List[int]]:
+    """
+    Versions an If-Match header allows a write on, None when it allows any.
+    Tags are compared strongly, so weak ones never match; when no tag can
+    match, the precondition has failed already.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = []
+    for candidate in if_match.split(","):
+        tag = candidate.strip()
+        if not (len(tag) > 1 and tag[0] == tag[-1] == '"'):
+            continue
+        version = tag[1:-1].split("-", 1)[0]
+        if version.isdigit():
+            versions.append(int(version))
+    if not versions:
+        raise HTTPException(
+            status_code=412, detail=f"No version in If-Match {if_match}"
+        )
+    return versions
+
+
+class ProfileViews:
+    """
+    Conditional GETs for one kind of profile.
+
+    The last rendered representation of each profile is cached together with
+    the profile version and expand variant it was rendered from. A request
+    whose profile document still has that version is answered from the cache,
+    or with a 304 when it already holds the ETag, without enriching the
+    profile again. Enriched data is at most the cache TTL older than the
+    profile document, the same bound the user and catalog caches give.
+    Representations missing part of an expansion are served but not cached.
+    """
+
+    def __init__(self, cache: Optional[TTLCache]):
+        self.cache = cache
+
+    async def lookup(
+        self, profile_id: str, version: str, variant: str
+    ) -> Optional[Representation]:
+        if self.cache is None:
+            return None
+        cached = (await self.cache.get_fresh_many([profile_id])).get(profile_id)
+        if cached is None or (cached.version, cached.variant) != (version, variant):
+            return None
+        return cached
+
+    async def store(
+        self,
+        profile_id: str,
+        version: str,
+        variant: str,
+        response: Response,
+        complete: bool = True,
+    ) -> Representation:
+        representation = Representation(
+            version, variant, make_etag(version, response.body), response.body
+        )
+        if self.cache is not None and complete:
+            await self.cache.set(profile_id, representation)
+        return representation
+
+    async def invalidate(self, profile_id: str):
+        if self.cache is not None:
+            await self.cache.invalidate(profile_id)
+
+    @staticmethod
+    def respond(representation: Representation, if_none_match: Optional[str]):
+        headers = {"ETag": representation.etag}
+        if etag_matches(if_none_match, representation.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(
+            representation.body, media_type="application/json", headers=headers
+        )
+
+
+def _views(kind: str) -> ProfileViews:
+    cache = rest.profile_cache
+    return ProfileViews(getattr(cache, kind) if cache is not None else None)
+
+
+def get_listener_views() -> ProfileViews:
+    return _views("listeners")
+
+
+def get_artist_views() -> ProfileViews:
+    return _views("artists")
@@ -1,9 +1,10 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from pydantic.fields import Field
 from pydantic.main import BaseModel
 
-from app.db.model.artist import ArtistModel, CompleteArtistModel
+from app.adapters.dtos.bulk import BulkItemResponseDto
+from app.db.model.artist import ArtistListModel, ArtistModel, CompleteArtistModel
 from app.rest.dtos.album import AlbumSongResponseDto
 from app.rest.dtos.song import SongResponseDto
 from app.rest.dtos.user import UserResponseDto
@@ -42,6 +43,7 @@ class ArtistResponseDto(BaseModel):
     cover_picture: str = Field(example="image.png")
     songs: List[str] = []
     albums: List[str] = []
+    version: int = 0
 
     class Config:
         allow_population_by_field_name = True
@@ -50,7 +52,7 @@ class ArtistResponseDto(BaseModel):
 
     @staticmethod
     def from_artist_model(
-        artist_model: ArtistModel,
+        artist_model: Union[ArtistModel, ArtistListModel],
         user: UserResponseDto,
     ) -> "ArtistResponseDto":
         return ArtistResponseDto(
@@ -66,12 +68,13 @@ class ArtistResponseDto(BaseModel):
             songs=artist_model.songs,
             albums=artist_model.albums,
             cover_picture=artist_model.cover_picture,
+            version=artist_model.version,
         )
 
 
 class CompleteArtistResponseDto(ArtistResponseDto):
-    albums: List[AlbumSongResponseDto] = []
-    songs: List[SongResponseDto] = []
+    albums: List[Union[AlbumSongResponseDto, str]] = []
+    songs: List[Union[SongResponseDto, str]] = []
 
     class Config:
         allow_population_by_field_name = True
@@ -97,4 +100,15 @@ class CompleteArtistResponseDto(ArtistResponseDto):
             songs=complete_artist_model.songs,
             albums=complete_artist_model.albums,
             cover_picture=artist_model.cover_picture,
+            version=artist_model.version,
         )
+
+
+class ArtistBulkItemResponseDto(BulkItemResponseDto):
+    profile: Optional[CompleteArtistResponseDto]
+
+
+class ArtistBulkResponseDto(BaseModel):
+    created: int
+    failed: int
+    items: List[ArtistBulkItemResponseDto]
@@ -0,0 +1,15 @@
+from typing import Optional
+
+from pydantic.main import BaseModel
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+FAILED = "failed"
+
+
+class BulkItemResponseDto(BaseModel):
+    index: int
+    status: str = FAILED
+    id: Optional[str]
+    user_id: Optional[str]
+    error: Optional[str]
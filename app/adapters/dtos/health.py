@@ -1,5 +1,37 @@
+from typing import Optional
+
 from pydantic.main import BaseModel
 
 
 class HealthStatusResponse(BaseModel):
     status: str
+
+
+class HedgeStatsResponse(BaseModel):
+    calls: int
+    hedges: int
+    hedge_wins: int
+    budget_exhausted: int
+    delay: Optional[float]
+
+
+class UpstreamStatsResponse(BaseModel):
+    name: str
+    state: str
+    requests: int
+    error_rate: float
+    rejected: int
+    p50: Optional[float]
+    p99: Optional[float]
+    timeout: float
+    hedging: Optional[HedgeStatsResponse]
+
+
+class CacheStatsResponse(BaseModel):
+    name: str
+    hits: int
+    stale_hits: int
+    misses: int
+    size: Optional[int]
+    max_size: Optional[int]
+    evictions: Optional[int]
@@ -1,10 +1,15 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from pydantic.fields import Field
 from pydantic.main import BaseModel
 
-from app.db.model.listener import ListenerModel, CompleteListenerModel
-from app.rest.dtos.playlist import PlaylistSongResponseDto
+from app.adapters.dtos.bulk import BulkItemResponseDto
+from app.db.model.listener import (
+    CompleteListenerModel,
+    ListenerListModel,
+    ListenerModel,
+)
+from app.rest.dtos.playlist import PlaylistResponseDto, PlaylistSongResponseDto
 from app.rest.dtos.user import UserResponseDto
 
 
@@ -43,6 +48,7 @@ class ListenerResponseDto(BaseModel):
     interests: List[str] = []
     playlists: List[str] = []
     wallet_addr: str = ""
+    version: int = 0
 
     class Config:
         allow_population_by_field_name = True
@@ -67,11 +73,12 @@ class ListenerResponseDto(BaseModel):
             subscription=listener_model.subscription,
             playlists=listener_model.playlists,
             wallet_addr=listener_model.wallet_addr,
+            version=listener_model.version,
         )
 
 
 class CompleteListenerResponseDto(ListenerResponseDto):
-    playlists: List[PlaylistSongResponseDto] = []
+    playlists: List[Union[PlaylistSongResponseDto, PlaylistResponseDto, str]] = []
 
     class Config:
         allow_population_by_field_name = True
@@ -80,7 +87,7 @@ class CompleteListenerResponseDto(ListenerResponseDto):
 
     @staticmethod
     def from_models(
-        listener_model: ListenerModel,
+        listener_model: Union[ListenerModel, ListenerListModel],
         user: UserResponseDto,
         complete_listener_model: CompleteListenerModel,
     ) -> "CompleteListenerResponseDto":
@@ -98,4 +105,15 @@ class CompleteListenerResponseDto(ListenerResponseDto):
             subscription=listener_model.subscription,
             playlists=complete_listener_model.playlists,
             wallet_addr=listener_model.wallet_addr,
+            version=listener_model.version,
         )
+
+
+class ListenerBulkItemResponseDto(BulkItemResponseDto):
+    profile: Optional[CompleteListenerResponseDto]
+
+
+class ListenerBulkResponseDto(BaseModel):
+    created: int
+    failed: int
+    items: List[ListenerBulkItemResponseDto]
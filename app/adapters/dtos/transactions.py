@@ -0,0 +1,19 @@
+from typing import List, Optional
+
+from pydantic.main import BaseModel
+
+from app.adapters.dtos.bulk import FAILED
+
+
+class TransactionBulkItemResponseDto(BaseModel):
+    index: int
+    status: str = FAILED
+    id: Optional[str]
+    error: Optional[str]
+
+
+class TransactionBulkResponseDto(BaseModel):
+    created: int
+    duplicates: int
+    failed: int
+    items: List[TransactionBulkItemResponseDto]
@@ -0,0 +1,22 @@
+from pydantic.fields import Field
+from pydantic.main import BaseModel
+
+
+class WalletStatsResponseDto(BaseModel):
+    wallet_addr: str = Field(example="wallet_addr")
+    sent: float = 0.0
+    received: float = 0.0
+    net: float = 0.0
+    sent_count: int = 0
+    received_count: int = 0
+
+    @staticmethod
+    def from_stats(stats: dict) -> "WalletStatsResponseDto":
+        return WalletStatsResponseDto(
+            wallet_addr=stats["_id"],
+            sent=stats["sent"],
+            received=stats["received"],
+            net=stats["received"] - stats["sent"],
+            sent_count=stats["sent_count"],
+            received_count=stats["received_count"],
+        )
@@ -0,0 +1,38 @@
+from typing import Awaitable, Callable, List, Optional, Set
+
+from fastapi import HTTPException, Query
+
+
+def expand_param(*allowed: str) -> Callable[..., Set[str]]:
+    """
+    Builds a dependency that parses `expand=a,b.c` into the set of requested
+    expansions. A nested expansion implies its parents; unknown ones are a 422.
+    """
+
+    def parse(
+        expand: Optional[str] = Query(
+            None, description=f"Comma separated subset of: {', '.join(allowed)}"
+        ),
+    ) -> Set[str]:
+        requested = {v.strip() for v in (expand or "").split(",") if v.strip()}
+        unknown = requested - set(allowed)
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Unknown expand values {sorted(unknown)}, "
+                f"allowed: {list(allowed)}",
+            )
+        for value in list(requested):
+            parts = value.split(".")
+            for end in range(1, len(parts)):
+                requested.add(".".join(parts[:end]))
+        return requested
+
+    return parse
+
+
+async def expand_ids(
+    ids: List[str], load: Optional[Callable[[List[str]], Awaitable[list]]]
+) -> list:
+    """Loads the entities behind ids, or keeps the bare ids when load is None."""
+    return await load(ids) if load else ids
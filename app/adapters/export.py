@@ -0,0 +1,62 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+from app.rest.users_client import UserClient
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+Document = Dict[str, Any]
+Enricher = Callable[[List[Document]], Awaitable[List[Document]]]
+
+
+async def ndjson_lines(
+    documents: AsyncIterator[Document],
+    chunk_size: int,
+    enrich: Optional[Enricher] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Encodes documents as NDJSON, one chunk of up to chunk_size documents per
+    yielded block. The ASGI server only asks for the next block once the last
+    one was sent, so the cursor is never read ahead of the client.
+    """
+    chunk = []
+    async for document in documents:
+        chunk.append(document)
+        if len(chunk) == chunk_size:
+            yield await _encode(chunk, enrich)
+            chunk = []
+    if chunk:
+        yield await _encode(chunk, enrich)
+
+
+async def _encode(chunk: List[Document], enrich: Optional[Enricher]) -> bytes:
+    if enrich is not None:
+        chunk = await enrich(chunk)
+    return b"".join(orjson.dumps(document) + b"\n" for document in chunk)
+
+
+def users_enricher(rest_user: UserClient) -> Enricher:
+    """Adds the owning user, or None when it cannot be resolved, to profiles."""
+
+    async def enrich(profiles: List[Document]) -> List[Document]:
+        users_map, _ = await rest_user.get_many(
+            [profile["user_id"] for profile in profiles]
+        )
+        for profile in profiles:
+            user = users_map.get(profile["user_id"])
+            profile["user"] = user.dict() if user else None
+        return profiles
+
+    return enrich
+
+
+def ndjson_response(
+    documents: AsyncIterator[Document],
+    chunk_size: int,
+    enrich: Optional[Enricher] = None,
+) -> StreamingResponse:
+    return StreamingResponse(
+        ndjson_lines(documents, chunk_size, enrich), media_type=NDJSON_MEDIA_TYPE
+    )
@@ -1,5 +1,12 @@
+from typing import List
+
 from fastapi import APIRouter, status
-from app.adapters.dtos.health import HealthStatusResponse
+from app.adapters.dtos.health import (
+    CacheStatsResponse,
+    HealthStatusResponse,
+    UpstreamStatsResponse,
+)
+from app.rest import rest
 
 router = APIRouter(tags=["health"])
 
@@ -12,3 +19,28 @@ router = APIRouter(tags=["health"])
 )
 async def health():
     return HealthStatusResponse(status="UP")
+
+
+@router.get(
+    "/health/cache",
+    response_description="Get cache counters",
+    response_model=List[CacheStatsResponse],
+    status_code=status.HTTP_200_OK,
+)
+async def cache_stats():
+    stats = (
+        rest.catalog_cache.stats()
+        + rest.user_cache.stats()
+        + rest.profile_cache.stats()
+    )
+    return [CacheStatsResponse(**cache) for cache in stats]
+
+
+@router.get(
+    "/health/upstreams",
+    response_description="Get circuit breaker, latency and hedging state per upstream",
+    response_model=List[UpstreamStatsResponse],
+    status_code=status.HTTP_200_OK,
+)
+async def upstream_stats():
+    return [UpstreamStatsResponse(**upstream) for upstream in rest.upstream_stats()]
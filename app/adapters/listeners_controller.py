@@ -1,26 +1,54 @@
-from typing import Optional, List
-from fastapi import APIRouter, status, Depends, HTTPException, Body
+import asyncio
+import math
+from typing import Awaitable, Callable, List, Optional, Set
+from fastapi import APIRouter, status, Depends, HTTPException, Body, Header, Query
 from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
 import traceback
 
 from app.adapters.dtos.listeners import (
     UpdateListenerRequestDto,
     ListenerRequestDto,
     CompleteListenerResponseDto,
+    ListenerBulkItemResponseDto,
+    ListenerBulkResponseDto,
 )
+from app.adapters.dtos.bulk import CREATED
+from app.adapters.conditional import (
+    ProfileViews,
+    expand_variant,
+    get_listener_views,
+    if_match_versions,
+    make_etag,
+    profile_version,
+)
+from app.adapters.expand import expand_ids, expand_param
+from app.adapters.export import ndjson_response, users_enricher
+from app.adapters.responses import DtoResponse
+from app.adapters.pagination import MAX_PAGE_SIZE, set_next_cursor
+from app.conf.config import Settings, get_settings
 from app.db import DatabaseManager, get_database
-from app.rest import get_restclient_user, get_restclient_multimedia
+from app.rest import (
+    get_restclient_user,
+    get_restclient_multimedia,
+    get_multimedia_loader,
+    get_recommendation_engine,
+)
 from app.db.impl.listener_manager import ListenerManager
+from app.db.impl.versioning import VersionConflictError
 from app.db.model.listener import (
+    ListenerPreferencesModel,
+    ListenerListModel,
     ListenerModel,
     UpdateListenerModel,
     CompleteListenerModel,
 )
+from app.rest.circuit_breaker import CircuitOpenError
 from app.rest.dtos.request.playlist import PlaylistRequestDto
 from app.rest.dtos.request.user import UpdateUserRequestDto, UserRequestDto
 from app.rest.dtos.song import SongResponseDto
 from app.rest.multimedia_client import MultimediaClient
+from app.rest.multimedia_loader import MultimediaLoader
+from app.rest.recommendations import RecommendationEngine
 from app.rest.users_client import UserClient
 
 import logging
@@ -28,6 +56,19 @@ import logging
 router = APIRouter(tags=["listeners"])
 
 
+LISTENER_EXPAND = expand_param("playlists", "playlists.songs")
+
+
+def playlists_loader(
+    loader: MultimediaLoader, expand: Set[str]
+) -> Optional[Callable[[List[str]], Awaitable[list]]]:
+    if "playlists.songs" in expand:
+        return loader.get_playlists
+    if "playlists" in expand:
+        return loader.get_playlist_infos
+    return None
+
+
 @router.post(
     "/listeners",
     response_description="Add new listener profile",
@@ -37,7 +78,7 @@ async def create_profile(
     req: ListenerRequestDto = Body(...),
     db: DatabaseManager = Depends(get_database),
     rest_user: UserClient = Depends(get_restclient_user),
-    rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
 ):
     manager = ListenerManager(db.db)
     try:
@@ -49,7 +90,7 @@ async def create_profile(
             location=req.location,
             email=req.email,
         )
-        user = rest_user.create_user(user_req)
+        user = await rest_user.create_user(user_req)
         listener_model = ListenerModel(
             user_id=user.id,
             subscription=req.subscription,
@@ -60,7 +101,7 @@ async def create_profile(
         created_profile = await manager.add_profile(listener_model)
         listener = ListenerModel(**created_profile)
 
-        playlists = rest_media.get_playlists(listener.playlists)
+        playlists = await loader.get_playlists(listener.playlists)
         complete_listener_model = CompleteListenerModel(
             user_id=listener.user_id,
             playlists=playlists,
@@ -69,9 +110,7 @@ async def create_profile(
         dto = CompleteListenerResponseDto.from_models(
             listener, user, complete_listener_model
         )
-        return JSONResponse(
-            status_code=status.HTTP_201_CREATED, content=jsonable_encoder(dto)
-        )
+        return DtoResponse(dto, status_code=status.HTTP_201_CREATED)
     except Exception as e:
         print(traceback.print_exc())
         raise HTTPException(
@@ -79,6 +118,104 @@ async def create_profile(
         )
 
 
+@router.post(
+    "/listeners:bulk",
+    response_description="Add many listener profiles",
+    response_model=ListenerBulkResponseDto,
+)
+async def create_profiles(
+    reqs: List[ListenerRequestDto] = Body(...),
+    enrich: bool = False,
+    db: DatabaseManager = Depends(get_database),
+    rest_user: UserClient = Depends(get_restclient_user),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
+    settings: Settings = Depends(get_settings),
+):
+    if len(reqs) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.bulk_max_items} profiles per request",
+        )
+
+    users = await rest_user.create_users(
+        [
+            UserRequestDto(
+                firebase_id=req.firebase_id,
+                first_name=req.first_name,
+                last_name=req.last_name,
+                role="LISTENER",
+                location=req.location,
+                email=req.email,
+            )
+            for req in reqs
+        ],
+        settings.bulk_user_concurrency,
+    )
+
+    items = [ListenerBulkItemResponseDto(index=index) for index in range(len(reqs))]
+    pending = {}
+    for item, req, user in zip(items, reqs, users):
+        if isinstance(user, Exception):
+            item.error = f"Could not create User. Exception: {user}"
+            continue
+        item.user_id = user.id
+        pending[item.index] = ListenerModel(
+            user_id=user.id,
+            subscription=req.subscription,
+            interests=req.interests,
+            playlists=req.playlists,
+            wallet_addr=req.wallet_addr,
+        )
+
+    manager = ListenerManager(db.db)
+    profiles, errors = await manager.add_profiles(list(pending.values()))
+    created = []
+    for position, (index, listener) in enumerate(pending.items()):
+        if position in errors:
+            items[index].error = f"Could not create profile: {errors[position]}"
+            continue
+        items[index].status = CREATED
+        items[index].id = profiles[position]["_id"]
+        created.append((items[index], listener, users[index]))
+
+    if enrich:
+        all_playlists = await asyncio.gather(
+            *[loader.get_playlists(listener.playlists) for _, listener, _ in created]
+        )
+        for (item, listener, user), playlists in zip(created, all_playlists):
+            complete_listener_model = CompleteListenerModel(
+                user_id=listener.user_id, playlists=playlists
+            )
+            item.profile = CompleteListenerResponseDto.from_models(
+                listener, user, complete_listener_model
+            )
+
+    return DtoResponse(
+        ListenerBulkResponseDto(
+            created=len(created), failed=len(items) - len(created), items=items
+        )
+    )
+
+
+@router.get(
+    "/listeners/export",
+    response_description="Stream every listener profile as NDJSON",
+    status_code=status.HTTP_200_OK,
+)
+async def export_profiles(
+    with_users: bool = False,
+    db: DatabaseManager = Depends(get_database),
+    rest_user: UserClient = Depends(get_restclient_user),
+    settings: Settings = Depends(get_settings),
+):
+    manager = ListenerManager(db.db)
+    return ndjson_response(
+        manager.iter_profiles(batch_size=settings.export_batch_size),
+        settings.export_batch_size,
+        enrich=users_enricher(rest_user) if with_users else None,
+    )
+
+
 @router.get(
     "/listeners/{listener_id}",
     response_description="Get a single listener profile",
@@ -87,9 +224,12 @@ async def create_profile(
 )
 async def show_profile(
     listener_id: str,
+    expand: Set[str] = Depends(LISTENER_EXPAND),
+    if_none_match: Optional[str] = Header(None),
     db: DatabaseManager = Depends(get_database),
-    rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
     rest_user: UserClient = Depends(get_restclient_user),
+    views: ProfileViews = Depends(get_listener_views),
 ):
     manager = ListenerManager(db.db)
     profile = await manager.get_profile(id=listener_id)
@@ -98,10 +238,17 @@ async def show_profile(
             status_code=404, detail=f"Listener's Profile {listener_id} not found"
         )
 
+    version, variant = profile_version(profile), expand_variant(expand)
+    cached = await views.lookup(listener_id, version, variant)
+    if cached is not None:
+        return views.respond(cached, if_none_match)
+
     try:
         listener = ListenerModel(**profile)
-        user = rest_user.get(listener.user_id)
-        playlists = rest_media.get_playlists(listener.playlists)
+        user, playlists = await asyncio.gather(
+            rest_user.get(listener.user_id),
+            expand_ids(listener.playlists, playlists_loader(loader, expand)),
+        )
         complete_listener_model = CompleteListenerModel(
             user_id=listener.user_id,
             playlists=playlists,
@@ -109,7 +256,16 @@ async def show_profile(
         dto = CompleteListenerResponseDto.from_models(
             listener, user, complete_listener_model
         )
-        return dto
+        representation = await views.store(
+            listener_id, version, variant, DtoResponse(dto), not loader.misses
+        )
+        return views.respond(representation, if_none_match)
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
     except Exception as e:
         raise HTTPException(
             status_code=404, detail=f"User data not found. Exception {e}"
@@ -124,34 +280,43 @@ async def show_profile(
 )
 async def get_profiles(
     user_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor returned as X-Next-Cursor"),
+    expand: Set[str] = Depends(LISTENER_EXPAND),
     db: DatabaseManager = Depends(get_database),
-    rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
     rest_user: UserClient = Depends(get_restclient_user),
 ):
     manager = ListenerManager(db.db)
-    profiles = await manager.get_all_profiles(user_id)
+    profiles = await manager.get_all_profiles(
+        user_id, limit=limit, after=after, view=ListenerListModel
+    )
 
     user_ids = []
     for profile in profiles:
-        user_ids.append(profile["user_id"])
+        user_ids.append(profile.user_id)
 
     logging.info(f"user_ids -> {user_ids}")
 
     try:
-        users = rest_user.all(','.join(user_ids))
-        users_map = {}
-
-        for user in users:
-            users_map[user.id] = user
+        users_map, missing = await rest_user.get_many(user_ids)
+        if missing:
+            logging.error(f"Users not found: {missing}")
+
+        load = playlists_loader(loader, expand)
+        if load:
+            # one batch for every listener; the per-listener loads below reuse it
+            await load([i for profile in profiles for i in profile.playlists])
+        all_playlists = await asyncio.gather(
+            *[expand_ids(profile.playlists, load) for profile in profiles]
+        )
 
         listeners = []
-        for profile in profiles:
-            listener_model = ListenerModel(**profile)
-            user = users_map.get(profile["user_id"])
+        for listener_model, playlists in zip(profiles, all_playlists):
+            user = users_map.get(listener_model.user_id)
 
-            playlists = rest_media.get_playlists(profile["playlists"])
             complete_listener_model = CompleteListenerModel(
-                user_id=profile["user_id"],
+                user_id=listener_model.user_id,
                 playlists=playlists,
             )
             if user:
@@ -161,9 +326,11 @@ async def get_profiles(
                     )
                 )
             else:
-                logging.error(f"User with id {profile['user_id']} not found")
+                logging.error(f"User with id {listener_model.user_id} not found")
 
-        return listeners
+        result = DtoResponse(listeners)
+        set_next_cursor(result, profiles, limit)
+        return result
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -183,19 +350,25 @@ async def update_profile(
     req: UpdateListenerRequestDto = Body(...),
     db: DatabaseManager = Depends(get_database),
     rest_user: UserClient = Depends(get_restclient_user),
-    rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
+    engine: RecommendationEngine = Depends(get_recommendation_engine),
+    views: ProfileViews = Depends(get_listener_views),
+    if_match: Optional[str] = Header(None),
 ):
     manager = ListenerManager(db.db)
+    expected_versions = if_match_versions(if_match)
     try:
         # update profile
         listener = UpdateListenerModel(
             interests=req.interests,
             wallet_addr=req.wallet_addr,
             subscription=req.subscription,
-            playlists=req.playlists
+            playlists=req.playlists,
         )
         logging.info(f"req log: {req}")
-        response = await manager.update_profile(id=listener_id, profile=listener)
+        response = await manager.update_profile(
+            id=listener_id, profile=listener, expected_versions=expected_versions
+        )
         if not response:
             raise HTTPException(
                 status_code=404, detail=f"Listener {listener_id} not found"
@@ -203,6 +376,10 @@ async def update_profile(
 
         listener = ListenerModel(**response)
         logging.info(f" check listener {listener}")
+        if req.interests is not None:
+            engine.invalidate(listener_id)
+        # user fields live upstream, so the profile version may not change
+        await views.invalidate(listener_id)
         # update user
         user_req = UpdateUserRequestDto(
             firebase_id=req.firebase_id,
@@ -213,8 +390,8 @@ async def update_profile(
             email=req.email,
             status=req.status,
         )
-        user = rest_user.update(listener.user_id, user_req)
-        playlists = rest_media.get_playlists(listener.playlists)
+        user = await rest_user.update(listener.user_id, user_req)
+        playlists = await loader.get_playlists(listener.playlists)
 
         complete_listener_model = CompleteListenerModel(
             user_id=listener.user_id,
@@ -224,9 +401,13 @@ async def update_profile(
         dto = CompleteListenerResponseDto.from_models(
             listener, user, complete_listener_model
         )
-        return dto
+        result = DtoResponse(dto)
+        result.headers["ETag"] = make_etag(profile_version(response), result.body)
+        return result
     except HTTPException as e:
         raise e
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Error updating User. Exception {e}"
@@ -239,11 +420,16 @@ async def update_profile(
     include_in_schema=False,
     status_code=status.HTTP_200_OK,
 )
-async def delete_profile(listener_id: str, db: DatabaseManager = Depends(get_database)):
+async def delete_profile(
+    listener_id: str,
+    db: DatabaseManager = Depends(get_database),
+    views: ProfileViews = Depends(get_listener_views),
+):
     manager = ListenerManager(db.db)
     delete_result = await manager.delete_profile(listener_id)
 
     if delete_result.deleted_count == 1:
+        await views.invalidate(listener_id)
         return JSONResponse(status_code=status.HTTP_204_NO_CONTENT)
 
     raise HTTPException(status_code=404, detail=f"Listener {listener_id} not found")
@@ -260,10 +446,11 @@ async def create_playlist(
     playlist: PlaylistRequestDto = Body(...),
     db: DatabaseManager = Depends(get_database),
     rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+    loader: MultimediaLoader = Depends(get_multimedia_loader),
     rest_user: UserClient = Depends(get_restclient_user),
 ):
     try:
-        playlist, playlist_id = rest_media.create_playlist(playlist)
+        playlist, playlist_id = await rest_media.create_playlist(playlist)
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Could not create playlist. Exception {e}"
@@ -276,15 +463,15 @@ async def create_playlist(
         )
         if not listener:
             raise HTTPException(
-                status_code=400,
+                status_code=404,
                 detail=f"Listener {listener_id} could not be updated with playlist",
             )
 
         listener_model = ListenerModel(**listener)
 
         # api calls
-        user = rest_user.get(listener_model.user_id)
-        playlists = rest_media.get_playlists(listener_model.playlists)
+        user = await rest_user.get(listener_model.user_id)
+        playlists = await loader.get_playlists(listener_model.playlists)
 
         complete_listener_model = CompleteListenerModel(
             user_id=listener_model.user_id,
@@ -296,9 +483,9 @@ async def create_playlist(
             complete_listener_model,
         )
 
-        return JSONResponse(
-            status_code=status.HTTP_201_CREATED, content=jsonable_encoder(dto)
-        )
+        return DtoResponse(dto, status_code=status.HTTP_201_CREATED)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(traceback.print_exc())
         raise HTTPException(
@@ -315,15 +502,25 @@ async def create_playlist(
 )
 async def get_recommendations(
     listener_id: str,
+    limit: int = Query(10, ge=1),
     db: DatabaseManager = Depends(get_database),
-    rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+    engine: RecommendationEngine = Depends(get_recommendation_engine),
 ):
+    if limit > engine.max_limit:
+        raise HTTPException(
+            status_code=422, detail=f"limit must be at most {engine.max_limit}"
+        )
+
     try:
         manager = ListenerManager(db.db)
-        profile = await manager.get_profile(id=listener_id)
-        songs = rest_media.get_recomendation_by_genre(profile["interests"])
+        profile = await manager.get_profile(
+            id=listener_id, view=ListenerPreferencesModel
+        )
+        songs = await engine.recommend(
+            listener_id, profile.interests, profile.subscription, limit
+        )
 
-        return songs
+        return DtoResponse(songs)
     except Exception as e:
         raise HTTPException(
             status_code=404, detail=f"Listener {listener_id} not found. Error: {e}"
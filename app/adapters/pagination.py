@@ -0,0 +1,28 @@
+import base64
+from typing import Any, List
+
+import orjson
+from fastapi import HTTPException, Response
+
+from app.db.model.read_model import ReadModel
+
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def set_next_cursor(response: Response, page: List[ReadModel], limit: int):
+    # a full page may have a successor; the client resumes after its last _id
+    if len(page) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = page[-1].id
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque cursor for pages ordered on several keys."""
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        return orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, orjson.JSONDecodeError):
+        raise HTTPException(status_code=400, detail=f"Invalid cursor {cursor}")
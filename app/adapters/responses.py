@@ -0,0 +1,41 @@
+from functools import lru_cache
+from typing import Any, Type
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import Response
+from pydantic.main import BaseModel
+
+
+@lru_cache(maxsize=None)
+def _has_aliases(model: Type[BaseModel]) -> bool:
+    return any(field.alias != name for name, field in model.__fields__.items())
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        # a model's __dict__ holds its field values; orjson comes back here for
+        # nested models, which skips pydantic's much slower dict() walk
+        if _has_aliases(type(value)):
+            return value.dict(by_alias=True)
+        return value.__dict__
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+class DtoResponse(Response):
+    """
+    JSON response for DTOs that are already valid. Returning it skips
+    FastAPI's re-validation against response_model and the jsonable_encoder
+    walk: each DTO is turned into dicts once and dumped by orjson.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,7 +1,37 @@
-from fastapi import APIRouter, status, Depends, HTTPException, Body
+from datetime import datetime
+from typing import List, Optional
 
+import orjson
+from fastapi import (
+    APIRouter,
+    status,
+    Depends,
+    HTTPException,
+    Body,
+    Header,
+    Query,
+    Request,
+    Response,
+)
+from pydantic import ValidationError
+
+from app.adapters.conditional import if_match_versions
+from app.adapters.dtos.bulk import CREATED, DUPLICATE
+from app.adapters.dtos.transactions import (
+    TransactionBulkItemResponseDto,
+    TransactionBulkResponseDto,
+)
+from app.adapters.export import NDJSON_MEDIA_TYPE, ndjson_response
+from app.adapters.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+)
+from app.conf.config import Settings, get_settings
 from app.db import DatabaseManager, get_database
 from app.db.impl.transaction_manager import TransactionManager
+from app.db.impl.versioning import VersionConflictError
 from app.db.model.transaction import TransactionModel, UpdateTransactionModel
 
 router = APIRouter(tags=["transactions"])
@@ -13,11 +43,40 @@ router = APIRouter(tags=["transactions"])
     status_code=status.HTTP_200_OK,
 )
 async def get(
+    response: Response,
+    sender: Optional[str] = None,
+    receiver: Optional[str] = None,
+    date_from: Optional[datetime] = Query(None, description="Inclusive"),
+    date_to: Optional[datetime] = Query(None, description="Exclusive"),
+    sort: str = Query("-date", regex="^-?date$"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor returned as X-Next-Cursor"),
     db: DatabaseManager = Depends(get_database),
 ):
+    position = None
+    if after is not None:
+        try:
+            date, id = decode_cursor(after)
+            position = (datetime.fromisoformat(date), id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid cursor {after}")
+
     manager = TransactionManager(db.db)
     try:
-        model = await manager.get_all()
+        model = await manager.get_all(
+            sender=sender,
+            receiver=receiver,
+            date_from=date_from,
+            date_to=date_to,
+            descending=sort.startswith("-"),
+            limit=limit,
+            after=position,
+        )
+        if len(model) == limit:
+            last = model[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                last["date"], last["_id"]
+            )
         return model
     except Exception as e:
         raise HTTPException(
@@ -25,6 +84,22 @@ async def get(
         )
 
 
+@router.get(
+    "/transactions/export",
+    response_description="Stream every transaction as NDJSON",
+    status_code=status.HTTP_200_OK,
+)
+async def export(
+    db: DatabaseManager = Depends(get_database),
+    settings: Settings = Depends(get_settings),
+):
+    manager = TransactionManager(db.db)
+    return ndjson_response(
+        manager.iter_all(batch_size=settings.export_batch_size),
+        settings.export_batch_size,
+    )
+
+
 @router.post(
     "/transactions",
     response_description="Create transaction",
@@ -44,6 +119,88 @@ async def post(
         )
 
 
+@router.post(
+    "/transactions:bulk",
+    response_description="Create many transactions, skipping replayed ones",
+    response_model=TransactionBulkResponseDto,
+    status_code=status.HTTP_200_OK,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": TransactionModel.schema(by_alias=False),
+                    }
+                },
+                NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def post_bulk(
+    request: Request,
+    db: DatabaseManager = Depends(get_database),
+    settings: Settings = Depends(get_settings),
+):
+    records = await read_records(request)
+    if len(records) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.bulk_max_items} transactions per request",
+        )
+
+    items = [TransactionBulkItemResponseDto(index=i) for i in range(len(records))]
+    pending = {}
+    for item, record in zip(items, records):
+        try:
+            pending[item.index] = TransactionModel.parse_obj(record)
+        except ValidationError as e:
+            item.error = f"Invalid transaction: {e}"
+
+    manager = TransactionManager(db.db)
+    try:
+        models, duplicates, errors = await manager.add_many(list(pending.values()))
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Could not create transactions. Exception: {e}"
+        )
+
+    for position, index in enumerate(pending):
+        item = items[index]
+        if position in duplicates:
+            item.status = DUPLICATE
+            item.id = duplicates[position]
+        elif position in errors:
+            item.error = errors[position]
+        else:
+            item.status = CREATED
+            item.id = models[position]["_id"]
+
+    created = sum(1 for item in items if item.status == CREATED)
+    return TransactionBulkResponseDto(
+        created=created,
+        duplicates=len(duplicates),
+        failed=len(items) - created - len(duplicates),
+        items=items,
+    )
+
+
+async def read_records(request: Request) -> List[dict]:
+    """Reads a JSON array body, or one JSON object per line for NDJSON."""
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+            return [orjson.loads(line) for line in body.splitlines() if line.strip()]
+        records = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed body: {e}")
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array")
+    return records
+
+
 @router.put(
     "/transactions/{id}",
     response_description="Update transaction",
@@ -52,12 +209,20 @@ async def post(
 async def update(
     id: str,
     req: UpdateTransactionModel = Body(...),
+    if_match: Optional[str] = Header(None),
     db: DatabaseManager = Depends(get_database),
 ):
     manager = TransactionManager(db.db)
+    expected_versions = if_match_versions(if_match)
     try:
-        model = await manager.update(id, req)
+        model = await manager.update(id, req, expected_versions)
+        if model is None:
+            raise HTTPException(status_code=404, detail=f"Transaction {id} not found")
         return model
+    except HTTPException as e:
+        raise e
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Could not update transactions. Exception: {e}"
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, status, Depends, HTTPException
+
+from app.adapters.dtos.wallets import WalletStatsResponseDto
+from app.db import DatabaseManager, get_database
+from app.db.impl.wallet_stats_manager import WalletStatsManager
+
+router = APIRouter(tags=["wallets"])
+
+
+@router.get(
+    "/wallets/{wallet_addr}/stats",
+    response_description="Get the sent, received and net totals of a wallet",
+    response_model=WalletStatsResponseDto,
+    status_code=status.HTTP_200_OK,
+)
+async def get_stats(
+    wallet_addr: str,
+    db: DatabaseManager = Depends(get_database),
+):
+    manager = WalletStatsManager(db.db)
+    try:
+        stats = await manager.get(wallet_addr)
+        return WalletStatsResponseDto.from_stats(stats)
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Could not get wallet stats. Exception: {e}"
+        )
@@ -12,6 +12,43 @@ class Settings(BaseSettings):
     db_path: str
     users_api: str
     multimedia_api: str
+    db_ensure_indexes: bool = True
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 5.0
+    http2: bool = True
+    http_timeout: float = 10.0
+    http_connect_timeout: float = 5.0
+    upstream_failure_threshold: float = 0.5
+    upstream_min_requests: int = 20
+    upstream_window: float = 30
+    upstream_reset_timeout: float = 15
+    upstream_timeout_percentile: float = 0.99
+    upstream_timeout_factor: float = 3.0
+    upstream_min_timeout: float = 0.5
+    multimedia_hedging: bool = True
+    hedge_percentile: float = 0.95
+    hedge_budget: float = 0.1
+    multimedia_max_concurrency: int = 10
+    multimedia_batch_size: int = 50
+    users_batch_size: int = 50
+    export_batch_size: int = 500
+    bulk_max_items: int = 1000
+    bulk_user_concurrency: int = 10
+    recommendation_pool_size: int = 100
+    recommendation_refresh_interval: float = 300
+    recommendation_max_limit: int = 50
+    recommendation_max_listeners: int = 10000
+    recommendation_max_genres: int = 1000
+    cache_backend: str = "memory"
+    redis_url: str = "redis://localhost:6379/0"
+    cache_max_entries: int = 5000
+    cache_song_ttl: float = 600
+    cache_album_ttl: float = 300
+    cache_playlist_ttl: float = 60
+    cache_user_ttl: float = 60
+    cache_stale_ttl: float = 120
+    cache_profile_ttl: float = 30
 
     class Config:
         BASE_DIR = os.path.dirname(os.path.abspath("../.env"))
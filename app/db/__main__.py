@@ -0,0 +1,64 @@
+"""
+Database maintenance without starting the API:
+
+    python -m app.db verify
+    python -m app.db apply [--dry-run]
+    python -m app.db migrate-dates [--dry-run]
+    python -m app.db rebuild-wallet-stats
+"""
+import argparse
+import asyncio
+import sys
+from typing import List
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from app.conf.config import Settings
+from app.db.impl.wallet_stats_manager import WalletStatsManager
+from app.db.indexes import CREATED, OK, apply_indexes
+from app.db.migrations import migrate_transaction_dates
+
+
+async def indexes(db: AsyncIOMotorDatabase, dry_run: bool) -> int:
+    report = await apply_indexes(db, dry_run=dry_run)
+    for entry in report:
+        print(f"{entry['collection']}.{entry['name']}: {entry['status']}")
+    return 0 if all(entry["status"] in (OK, CREATED) for entry in report) else 1
+
+
+async def migrate_dates(db: AsyncIOMotorDatabase, dry_run: bool) -> int:
+    counts = await migrate_transaction_dates(db, dry_run=dry_run)
+    print(f"transactions: {counts['migrated']} migrated, {counts['invalid']} invalid")
+    return 0 if counts["invalid"] == 0 else 1
+
+
+async def rebuild_wallet_stats(db: AsyncIOMotorDatabase) -> int:
+    wallets = await WalletStatsManager(db).rebuild()
+    print(f"wallet_stats: {wallets} wallets rebuilt")
+    return 0
+
+
+async def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.db")
+    parser.add_argument(
+        "command", choices=["apply", "verify", "migrate-dates", "rebuild-wallet-stats"]
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--db-path", default=None)
+    args = parser.parse_args(argv)
+
+    db_path = args.db_path or Settings().db_path
+    client = AsyncIOMotorClient(db_path)
+    try:
+        if args.command == "migrate-dates":
+            return await migrate_dates(client.profiles, args.dry_run)
+        if args.command == "rebuild-wallet-stats":
+            return await rebuild_wallet_stats(client.profiles)
+        dry_run = args.dry_run or args.command == "verify"
+        return await indexes(client.profiles, dry_run)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -11,7 +11,7 @@ class DatabaseManager(object):
         raise NotImplementedError
 
     @abstractmethod
-    async def connect_to_database(self, path: str):
+    async def connect_to_database(self, path: str, ensure_indexes: bool = True):
         pass
 
     @abstractmethod
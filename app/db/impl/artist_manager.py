@@ -1,8 +1,18 @@
 import logging
+from typing import Collection, Dict, List, Optional, Tuple, Type
+
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
 from fastapi import Body
 
+from app.db.impl.versioning import (
+    VersionConflictError,
+    check_version,
+    versioned_update,
+)
 from app.db.model.artist import ArtistModel, UpdateArtistModel
+from app.db.model.read_model import ReadModel
 from fastapi.encoders import jsonable_encoder
 
 
@@ -10,16 +20,40 @@ class ArtistManager:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
 
-    async def get_profile(self, id: str):
-        profile = await self.db["artists"].find_one({"_id": id})
-        return profile
+    async def get_profile(self, id: str, view: Optional[Type[ReadModel]] = None):
+        """Returns the raw document, or only the fields of view as that model."""
+        if view is None:
+            return await self.db["artists"].find_one({"_id": id})
+        profile = await self.db["artists"].find_one({"_id": id}, view.projection())
+        return view.from_document(profile) if profile else None
 
-    async def get_all_profiles(self, user_id: str):
+    async def get_all_profiles(
+        self,
+        user_id: Optional[str],
+        limit: int = 100,
+        after: Optional[str] = None,
+        view: Optional[Type[ReadModel]] = None,
+    ):
+        """
+        Returns up to limit profiles ordered by _id, starting right after the
+        _id given as cursor, so each page is a range scan on the _id index.
+        With a view only its fields are fetched and profiles come back as it.
+        """
+        query = {}
         if user_id is not None:
-            profiles = await self.db["artists"].find({"user_id": user_id}).to_list(100)
-        else:
-            profiles = await self.db["artists"].find().to_list(100)
+            query["user_id"] = user_id
+        if after is not None:
+            query["_id"] = {"$gt": after}
 
+        profiles = (
+            await self.db["artists"]
+            .find(query, view.projection() if view else None)
+            .sort("_id", ASCENDING)
+            .limit(limit)
+            .to_list(limit)
+        )
+        if view is not None:
+            return [view.from_document(profile) for profile in profiles]
         return profiles
 
     async def add_profile(self, artist: ArtistModel = Body(...)):
@@ -27,16 +61,49 @@ class ArtistManager:
         await self.db["artists"].insert_one(profile)
         return profile
 
+    async def add_profiles(
+        self, artists: List[ArtistModel]
+    ) -> Tuple[List[dict], Dict[int, str]]:
+        """
+        Inserts unordered, so a failing profile does not stop the others.
+        Returns the stored profiles and the write error of each failed index.
+        """
+        profiles = [jsonable_encoder(artist) for artist in artists]
+        if not profiles:
+            return profiles, {}
+        try:
+            await self.db["artists"].insert_many(profiles, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            return profiles, {error["index"]: error["errmsg"] for error in errors}
+        except Exception as e:
+            # which profiles were written is unknown: all are reported failed,
+            # so callers can reconcile the users created for them
+            logging.error(f"[ADD_PROFILES] {len(profiles)} artists error: {e}")
+            return profiles, {index: str(e) for index in range(len(profiles))}
+        return profiles, {}
+
     async def delete_profile(self, id: str):
         delete_result = await self.db["artists"].delete_one({"_id": id})
         return delete_result
 
-    async def update_profile(self, id: str, profile: UpdateArtistModel = Body(...)):
+    async def update_profile(
+        self,
+        id: str,
+        profile: UpdateArtistModel = Body(...),
+        expected_versions: Optional[Collection[int]] = None,
+    ):
+        """
+        With expected_versions the update only applies while the stored profile
+        is at one of them, else VersionConflictError is raised.
+        """
         try:
             profile = {k: v for k, v in profile.dict().items() if v is not None}
-            await self.db["artists"].update_one({"_id": id}, {"$set": profile})
-            model = await self.get_profile(id)
-            return model
+            if not profile:
+                return check_version(await self.get_profile(id), expected_versions)
+            return await self._update(id, {"$set": profile}, expected_versions)
+        except VersionConflictError:
+            raise
         except Exception as e:
             msg = f"[UPDATE_PROFILE] Profile: {profile} error: {e}"
             logging.error(msg)
@@ -44,11 +111,7 @@ class ArtistManager:
 
     async def add_album(self, id: str, album_id: str):
         try:
-            await self.db["artists"].update_one(
-                {"_id": id}, {"$addToSet": {"albums": album_id}}
-            )
-            model = await self.get_profile(id)
-            return model
+            return await self._update(id, {"$addToSet": {"albums": album_id}})
         except Exception as e:
             msg = f"[ADD ALBUM] Fail with msg: {e}"
             logging.error(msg)
@@ -56,12 +119,22 @@ class ArtistManager:
 
     async def add_song(self, id: str, song_id: str):
         try:
-            await self.db["artists"].update_one(
-                {"_id": id}, {"$addToSet": {"songs": song_id}}
-            )
-            model = await self.get_profile(id)
-            return model
+            return await self._update(id, {"$addToSet": {"songs": song_id}})
         except Exception as e:
             msg = f"[ADD SONG] Fail with msg: {e}"
             logging.error(msg)
             raise RuntimeError(msg)
+
+    async def iter_profiles(self, batch_size: int = 500):
+        cursor = self.db["artists"].find().sort("_id", ASCENDING).batch_size(batch_size)
+        async for document in cursor:
+            yield document
+
+    async def _update(
+        self,
+        id: str,
+        update: dict,
+        expected_versions: Optional[Collection[int]] = None,
+    ):
+        # returns the post-image, or None when no profile has this id
+        return await versioned_update(self.db["artists"], id, update, expected_versions)
@@ -1,8 +1,18 @@
 import logging
 
+from typing import Collection, Dict, List, Optional, Tuple, Type
+
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
 
+from app.db.impl.versioning import (
+    VersionConflictError,
+    check_version,
+    versioned_update,
+)
 from app.db.model.listener import ListenerModel, UpdateListenerModel
+from app.db.model.read_model import ReadModel
 from fastapi.encoders import jsonable_encoder
 
 
@@ -10,18 +20,40 @@ class ListenerManager:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
 
-    async def get_profile(self, id: str):
-        profile = await self.db["listeners"].find_one({"_id": id})
-        return profile
+    async def get_profile(self, id: str, view: Optional[Type[ReadModel]] = None):
+        """Returns the raw document, or only the fields of view as that model."""
+        if view is None:
+            return await self.db["listeners"].find_one({"_id": id})
+        profile = await self.db["listeners"].find_one({"_id": id}, view.projection())
+        return view.from_document(profile) if profile else None
 
-    async def get_all_profiles(self, user_id: str):
+    async def get_all_profiles(
+        self,
+        user_id: Optional[str],
+        limit: int = 100,
+        after: Optional[str] = None,
+        view: Optional[Type[ReadModel]] = None,
+    ):
+        """
+        Returns up to limit profiles ordered by _id, starting right after the
+        _id given as cursor, so each page is a range scan on the _id index.
+        With a view only its fields are fetched and profiles come back as it.
+        """
+        query = {}
         if user_id is not None:
-            profiles = (
-                await self.db["listeners"].find({"user_id": user_id}).to_list(100)
-            )
-        else:
-            profiles = await self.db["listeners"].find().to_list(100)
+            query["user_id"] = user_id
+        if after is not None:
+            query["_id"] = {"$gt": after}
 
+        profiles = (
+            await self.db["listeners"]
+            .find(query, view.projection() if view else None)
+            .sort("_id", ASCENDING)
+            .limit(limit)
+            .to_list(limit)
+        )
+        if view is not None:
+            return [view.from_document(profile) for profile in profiles]
         return profiles
 
     async def add_profile(self, listener: ListenerModel):
@@ -29,16 +61,49 @@ class ListenerManager:
         await self.db["listeners"].insert_one(profile)
         return profile
 
+    async def add_profiles(
+        self, listeners: List[ListenerModel]
+    ) -> Tuple[List[dict], Dict[int, str]]:
+        """
+        Inserts unordered, so a failing profile does not stop the others.
+        Returns the stored profiles and the write error of each failed index.
+        """
+        profiles = [jsonable_encoder(listener) for listener in listeners]
+        if not profiles:
+            return profiles, {}
+        try:
+            await self.db["listeners"].insert_many(profiles, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            return profiles, {error["index"]: error["errmsg"] for error in errors}
+        except Exception as e:
+            # which profiles were written is unknown: all are reported failed,
+            # so callers can reconcile the users created for them
+            logging.error(f"[ADD_PROFILES] {len(profiles)} listeners error: {e}")
+            return profiles, {index: str(e) for index in range(len(profiles))}
+        return profiles, {}
+
     async def delete_profile(self, id: str):
         delete_result = await self.db["listeners"].delete_one({"_id": id})
         return delete_result
 
-    async def update_profile(self, id: str, profile: UpdateListenerModel):
+    async def update_profile(
+        self,
+        id: str,
+        profile: UpdateListenerModel,
+        expected_versions: Optional[Collection[int]] = None,
+    ):
+        """
+        With expected_versions the update only applies while the stored profile
+        is at one of them, else VersionConflictError is raised.
+        """
         try:
             profile = {k: v for k, v in profile.dict().items() if v is not None}
-            await self.db["listeners"].update_one({"_id": id}, {"$set": profile})
-            model = await self.get_profile(id)
-            return model
+            if not profile:
+                return check_version(await self.get_profile(id), expected_versions)
+            return await self._update(id, {"$set": profile}, expected_versions)
+        except VersionConflictError:
+            raise
         except Exception as e:
             msg = f"[UPDATE_PROFILE] Profile: {profile} error: {e}"
             logging.error(msg)
@@ -46,12 +111,26 @@ class ListenerManager:
 
     async def create_playlist(self, id: str, playlist_id: str):
         try:
-            await self.db["listeners"].update_one(
-                {"_id": id}, {"$addToSet": {"playlists": playlist_id}}
-            )
-            model = await self.get_profile(id)
-            return model
+            return await self._update(id, {"$addToSet": {"playlists": playlist_id}})
         except Exception as e:
             msg = f"[CREATE PLAYLIST] Fail with msg: {e}"
             logging.error(msg)
             raise RuntimeError(msg)
+
+    async def iter_profiles(self, batch_size: int = 500):
+        cursor = (
+            self.db["listeners"].find().sort("_id", ASCENDING).batch_size(batch_size)
+        )
+        async for document in cursor:
+            yield document
+
+    async def _update(
+        self,
+        id: str,
+        update: dict,
+        expected_versions: Optional[Collection[int]] = None,
+    ):
+        # returns the post-image, or None when no profile has this id
+        return await versioned_update(
+            self.db["listeners"], id, update, expected_versions
+        )
@@ -1,21 +1,31 @@
+import asyncio
 import logging
+from typing import Optional
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
 from app.db import DatabaseManager
+from app.db.indexes import apply_indexes
 
 
 class MongoManager(DatabaseManager):
     client: AsyncIOMotorClient = None
     db: AsyncIOMotorDatabase = None
+    indexes: Optional[asyncio.Task] = None
 
-    async def connect_to_database(self, path: str):
+    async def connect_to_database(self, path: str, ensure_indexes: bool = True):
         logging.info("Connecting to MongoDB.")
         self.client = AsyncIOMotorClient(path, maxPoolSize=10, minPoolSize=10)
         # Multimedia is main_db
         self.db = self.client.profiles
         logging.info("Connected to MongoDB.")
+        if ensure_indexes:
+            # index builds can be slow; serve requests meanwhile
+            self.indexes = asyncio.ensure_future(apply_indexes(self.db))
 
     async def close_database_connection(self):
         logging.info("Closing connection with MongoDB.")
+        if self.indexes is not None and not self.indexes.done():
+            self.indexes.cancel()
         self.client.close()
         logging.info("Closed connection with MongoDB.")
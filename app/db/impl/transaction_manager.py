@@ -1,35 +1,186 @@
 import logging
+from datetime import datetime
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, InsertOne, ReturnDocument
+from pymongo.errors import BulkWriteError
 from fastapi import Body
 
+from app.db.impl.versioning import (
+    VERSION,
+    VersionConflictError,
+    check_version,
+    document_version,
+    versioned_update,
+)
+from app.db.impl.wallet_stats_manager import WalletStatsManager
 from app.db.model.transaction import TransactionModel, UpdateTransactionModel
-from fastapi.encoders import jsonable_encoder
+
+DUPLICATE_KEY = 11000
+
+
+def to_document(transaction: TransactionModel) -> dict:
+    # dates stay datetimes so they are stored as BSON dates, not strings.
+    # jsonable_encoder's custom_encoder would do that by writing into the
+    # model's json_encoders, changing how every later TransactionModel encodes
+    document = transaction.dict(by_alias=True)
+    document["_id"] = str(document["_id"])
+    return document
 
 
 class TransactionManager:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
+        self.wallet_stats = WalletStatsManager(db)
 
     async def get(self, id: str):
         model = await self.db["transactions"].find_one({"_id": id})
         return model
 
     async def add(self, transaction: TransactionModel = Body(...)):
-        model = jsonable_encoder(transaction)
+        model = to_document(transaction)
         await self.db["transactions"].insert_one(model)
+        await self._record_stats([model])
         return model
 
-    async def update(self, id: str, transaction: UpdateTransactionModel = Body(...)):
+    async def add_many(
+        self, transactions: List[TransactionModel]
+    ) -> Tuple[List[dict], Dict[int, str], Dict[int, str]]:
+        """
+        Inserts unordered with one bulk_write. Returns the stored transactions,
+        the id already stored for each index whose idempotency key was seen
+        before, and the write error of each other failed index.
+        """
+        models = [to_document(transaction) for transaction in transactions]
+        if not models:
+            return models, {}, {}
+        write_errors = []
+        try:
+            await self.db["transactions"].bulk_write(
+                [InsertOne(model) for model in models], ordered=False
+            )
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+
+        errors = {}
+        replayed = {}
+        for error in write_errors:
+            key = models[error["index"]].get("idempotency_key")
+            if error["code"] == DUPLICATE_KEY and key is not None:
+                replayed[error["index"]] = key
+            else:
+                errors[error["index"]] = error["errmsg"]
+
+        stored = {}
+        if replayed:
+            cursor = self.db["transactions"].find(
+                {"idempotency_key": {"$in": list(set(replayed.values()))}},
+                {"idempotency_key": True},
+            )
+            async for model in cursor:
+                stored[model["idempotency_key"]] = model["_id"]
+        duplicates = {}
+        for index, key in replayed.items():
+            if key in stored:
+                duplicates[index] = stored[key]
+            else:
+                errors[index] = f"Duplicate idempotency_key {key}"
+
+        await self._record_stats(
+            model
+            for index, model in enumerate(models)
+            if index not in duplicates and index not in errors
+        )
+        return models, duplicates, errors
+
+    async def update(
+        self,
+        id: str,
+        transaction: UpdateTransactionModel = Body(...),
+        expected_versions: Optional[Collection[int]] = None,
+    ):
         try:
             model = {k: v for k, v in transaction.dict().items() if v is not None}
-            await self.db["transactions"].update_one({"_id": id}, {"$set": model})
-            model = await self.get(id)
-            return model
+            if not model:
+                return check_version(await self.get(id), expected_versions)
+            # the pre-image tells which totals to take the old values out of
+            before = await versioned_update(
+                self.db["transactions"],
+                id,
+                {"$set": model},
+                expected_versions,
+                return_document=ReturnDocument.BEFORE,
+            )
+            if before is None:
+                return None
+            after = {**before, **model, VERSION: document_version(before) + 1}
+            await self._record_stats([after], removed=[before])
+            return after
+        except VersionConflictError:
+            raise
         except Exception as e:
             msg = f"[UPDATE_TRANSACTION] transaction: {transaction} error: {e}"
             logging.error(msg)
             raise RuntimeError(msg)
 
-    async def get_all(self):
-        models = await self.db["transactions"].find().to_list(100)
+    async def _record_stats(self, added: Iterable[dict], removed: Iterable[dict] = ()):
+        # the transactions are stored already: failing the request now would
+        # make clients retry writes that happened, so totals are left to drift
+        # until `python -m app.db rebuild-wallet-stats`
+        try:
+            await self.wallet_stats.record(added, removed)
+        except Exception as e:
+            logging.error(f"[WALLET_STATS] could not record totals: {e}")
+
+    async def get_all(
+        self,
+        sender: Optional[str] = None,
+        receiver: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        descending: bool = True,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, str]] = None,
+    ):
+        """
+        Returns up to limit transactions ordered by (date, _id), resuming right
+        after the (date, _id) of the last transaction of the previous page.
+        date_from is inclusive and date_to exclusive.
+        """
+        query = {}
+        if sender is not None:
+            query["sender"] = sender
+        if receiver is not None:
+            query["receiver"] = receiver
+        dates = {}
+        if date_from is not None:
+            dates["$gte"] = date_from
+        if date_to is not None:
+            dates["$lt"] = date_to
+        if dates:
+            query["date"] = dates
+        if after is not None:
+            date, id = after
+            beyond = "$lt" if descending else "$gt"
+            query["$or"] = [
+                {"date": {beyond: date}},
+                {"date": date, "_id": {beyond: id}},
+            ]
+
+        direction = DESCENDING if descending else ASCENDING
+        models = (
+            await self.db["transactions"]
+            .find(query)
+            .sort([("date", direction), ("_id", direction)])
+            .limit(limit)
+            .to_list(limit)
+        )
         return models
+
+    async def iter_all(self, batch_size: int = 500):
+        cursor = (
+            self.db["transactions"].find().sort("_id", ASCENDING).batch_size(batch_size)
+        )
+        async for document in cursor:
+            yield document
@@ -0,0 +1,70 @@
+from typing import Collection, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+
+VERSION = "version"
+
+
+class VersionConflictError(RuntimeError):
+    def __init__(self, id: str, expected: Collection[int], current: int):
+        super().__init__(
+            f"Document {id} is at version {current}, expected one of {sorted(expected)}"
+        )
+        self.id = id
+        self.expected = expected
+        self.current = current
+
+
+def document_version(document: dict) -> int:
+    # documents written before versioning count as version 0
+    return document.get(VERSION, 0)
+
+
+def version_filter(id: str, expected: Optional[Collection[int]] = None) -> dict:
+    if expected is None:
+        return {"_id": id}
+    versions = list(expected)
+    if 0 in expected:
+        versions.append(None)
+    return {"_id": id, VERSION: {"$in": versions}}
+
+
+def check_version(
+    document: Optional[dict], expected: Optional[Collection[int]] = None
+) -> Optional[dict]:
+    """Returns document, unless it is at a version other than the expected."""
+    if document is not None and expected is not None:
+        if document_version(document) not in expected:
+            raise VersionConflictError(
+                document["_id"], expected, document_version(document)
+            )
+    return document
+
+
+def bump(update: dict) -> dict:
+    """Adds the version increment every mutation of a document carries."""
+    return {**update, "$inc": {**update.get("$inc", {}), VERSION: 1}}
+
+
+async def versioned_update(
+    collection: AsyncIOMotorCollection,
+    id: str,
+    update: dict,
+    expected: Optional[Collection[int]] = None,
+    return_document: bool = ReturnDocument.AFTER,
+) -> Optional[dict]:
+    """
+    Applies update and increments the version in one find_one_and_update.
+    With expected versions the write only happens when the stored version is
+    one of them; a document at another version raises VersionConflictError.
+    Returns None when no document has this id.
+    """
+    document = await collection.find_one_and_update(
+        version_filter(id, expected), bump(update), return_document=return_document
+    )
+    if document is None and expected is not None:
+        current = await collection.find_one({"_id": id}, {VERSION: True})
+        if current is not None:
+            raise VersionConflictError(id, expected, document_version(current))
+    return document
@@ -0,0 +1,105 @@
+from typing import Dict, Iterable, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+EMPTY_STATS = {"sent": 0.0, "received": 0.0, "sent_count": 0, "received_count": 0}
+
+# one entry per side of each transaction, summed per wallet in a single scan
+REBUILD_PIPELINE = [
+    {
+        "$project": {
+            "sides": [
+                {
+                    "wallet": "$sender",
+                    "sent": "$amount",
+                    "received": 0.0,
+                    "sent_count": 1,
+                    "received_count": 0,
+                },
+                {
+                    "wallet": "$receiver",
+                    "sent": 0.0,
+                    "received": "$amount",
+                    "sent_count": 0,
+                    "received_count": 1,
+                },
+            ]
+        }
+    },
+    {"$unwind": "$sides"},
+    {
+        "$group": {
+            "_id": "$sides.wallet",
+            "sent": {"$sum": "$sides.sent"},
+            "received": {"$sum": "$sides.received"},
+            "sent_count": {"$sum": "$sides.sent_count"},
+            "received_count": {"$sum": "$sides.received_count"},
+        }
+    },
+]
+
+
+class WalletStatsManager:
+    """
+    Per-wallet totals kept in wallet_stats, so reading them does not depend on
+    the number of transactions. Writers keep them current with $inc; rebuild
+    recomputes them from scratch should they drift.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+
+    async def get(self, wallet_addr: str) -> dict:
+        stats = await self.db["wallet_stats"].find_one({"_id": wallet_addr})
+        # documents upserted before $setOnInsert may only hold one side
+        return {"_id": wallet_addr, **EMPTY_STATS, **(stats or {})}
+
+    async def record(self, added: Iterable[dict], removed: Iterable[dict] = ()):
+        """Adds the added transactions to the totals and takes removed ones out."""
+        increments: Dict[str, Dict[str, float]] = {}
+        for transactions, sign in ((added, 1), (removed, -1)):
+            for transaction in transactions:
+                amount = sign * transaction["amount"]
+                sent = increments.setdefault(transaction["sender"], {})
+                sent["sent"] = sent.get("sent", 0) + amount
+                sent["sent_count"] = sent.get("sent_count", 0) + sign
+                received = increments.setdefault(transaction["receiver"], {})
+                received["received"] = received.get("received", 0) + amount
+                received["received_count"] = received.get("received_count", 0) + sign
+        if not increments:
+            return
+
+        await self.db["wallet_stats"].bulk_write(
+            [
+                UpdateOne(
+                    {"_id": wallet},
+                    {
+                        "$inc": increment,
+                        # a new wallet gets the other side's totals at zero
+                        "$setOnInsert": {
+                            field: zero
+                            for field, zero in EMPTY_STATS.items()
+                            if field not in increment
+                        },
+                    },
+                    upsert=True,
+                )
+                for wallet, increment in increments.items()
+            ],
+            ordered=False,
+        )
+
+    async def rebuild(self) -> int:
+        """
+        Recomputes every wallet into a side collection that then replaces
+        wallet_stats at once. Transactions written while it runs may be
+        missed, so run it when ingestion is quiet.
+        """
+        pipeline: List[dict] = REBUILD_PIPELINE + [{"$out": "wallet_stats_rebuild"}]
+        await self.db["transactions"].aggregate(pipeline).to_list(None)
+        if "wallet_stats_rebuild" not in await self.db.list_collection_names():
+            await self.db["wallet_stats"].drop()
+            return 0
+        await self.db["wallet_stats_rebuild"].rename("wallet_stats", dropTarget=True)
+        return await self.db["wallet_stats"].count_documents({})
@@ -0,0 +1,119 @@
+"""Declarative registry of the indexes every collection needs."""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+
+OK = "ok"
+MISSING = "missing"
+CREATED = "created"
+CONFLICT = "conflict"
+FAILED = "failed"
+
+
+class IndexSpec:
+    def __init__(
+        self,
+        collection: str,
+        keys: List[Tuple[str, int]],
+        name: str,
+        unique: bool = False,
+        background: bool = True,
+        hidden: bool = False,
+        partial_filter: Optional[Dict[str, Any]] = None,
+    ):
+        self.collection = collection
+        self.keys = keys
+        self.name = name
+        self.unique = unique
+        self.background = background
+        self.hidden = hidden
+        self.partial_filter = partial_filter
+
+    def options(self) -> Dict[str, Any]:
+        options = {"name": self.name, "background": self.background}
+        if self.unique:
+            options["unique"] = True
+        if self.hidden:
+            options["hidden"] = True
+        if self.partial_filter is not None:
+            options["partialFilterExpression"] = self.partial_filter
+        return options
+
+    def matches(self, info: Dict[str, Any]) -> bool:
+        # background only affects the build, so it is not compared
+        return (
+            [tuple(key) for key in info["key"]] == self.keys
+            and info.get("unique", False) == self.unique
+            and info.get("hidden", False) == self.hidden
+            and info.get("partialFilterExpression") == self.partial_filter
+        )
+
+
+INDEXES = [
+    IndexSpec("artists", [("user_id", ASCENDING)], "user_id_unique", unique=True),
+    IndexSpec("listeners", [("user_id", ASCENDING)], "user_id_unique", unique=True),
+    # ledger pages sort on (date, _id), so _id completes every date index
+    IndexSpec(
+        "transactions",
+        [("sender", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)],
+        "sender_date",
+    ),
+    IndexSpec(
+        "transactions",
+        [("receiver", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)],
+        "receiver_date",
+    ),
+    IndexSpec("transactions", [("date", DESCENDING), ("_id", DESCENDING)], "date"),
+    IndexSpec(
+        "transactions",
+        [("idempotency_key", ASCENDING)],
+        "idempotency_key_unique",
+        unique=True,
+        # transactions without a key are stored with null and must not collide
+        partial_filter={"idempotency_key": {"$type": "string"}},
+    ),
+]
+
+
+async def apply_indexes(
+    db: AsyncIOMotorDatabase,
+    specs: List[IndexSpec] = INDEXES,
+    dry_run: bool = False,
+) -> List[Dict[str, str]]:
+    """
+    Creates the missing indexes among specs and reports the status of each
+    one. Existing indexes are never dropped: one with the same name but a
+    different definition is reported as a conflict. Safe to run repeatedly.
+    """
+    report = []
+    existing: Dict[str, Dict[str, Any]] = {}
+    for spec in specs:
+        entry = {"collection": spec.collection, "name": spec.name}
+        try:
+            if spec.collection not in existing:
+                existing[spec.collection] = await db[
+                    spec.collection
+                ].index_information()
+            info = existing[spec.collection].get(spec.name)
+            if info is None and not dry_run:
+                await db[spec.collection].create_index(spec.keys, **spec.options())
+                entry["status"] = CREATED
+            elif info is None:
+                entry["status"] = MISSING
+            else:
+                entry["status"] = OK if spec.matches(info) else CONFLICT
+        except Exception as e:
+            logging.error(
+                f"[INDEXES] {spec.collection}.{spec.name} could not be applied: {e}"
+            )
+            entry["status"] = FAILED
+
+        if entry["status"] == CONFLICT:
+            logging.error(
+                f"[INDEXES] {spec.collection}.{spec.name} exists with another "
+                f"definition"
+            )
+        report.append(entry)
+    return report
@@ -0,0 +1,56 @@
+"""One-off data migrations, run through `python -m app.db`."""
+import logging
+from datetime import datetime
+from typing import Dict
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.db.model.transaction import parse_date
+
+
+async def migrate_transaction_dates(
+    db: AsyncIOMotorDatabase, batch_size: int = 1000, dry_run: bool = False
+) -> Dict[str, int]:
+    """
+    Converts transaction dates stored as strings into BSON datetimes. Each
+    update matches on the old value, so concurrent edits are never overwritten
+    and the migration can be rerun until nothing is left.
+    """
+    counts = {"migrated": 0, "invalid": 0}
+    updates = []
+    cursor = (
+        db["transactions"]
+        .find({"date": {"$type": "string"}}, {"date": True})
+        .batch_size(batch_size)
+    )
+    async for transaction in cursor:
+        date = parse_date(transaction["date"])
+        if not isinstance(date, datetime):
+            try:
+                date = datetime.fromisoformat(date)
+            except ValueError:
+                logging.error(
+                    f"[MIGRATE_DATES] transaction {transaction['_id']} "
+                    f"has an unparseable date {date!r}"
+                )
+                counts["invalid"] += 1
+                continue
+
+        counts["migrated"] += 1
+        updates.append(
+            UpdateOne(
+                {"_id": transaction["_id"], "date": transaction["date"]},
+                {"$set": {"date": date}},
+            )
+        )
+        if len(updates) == batch_size:
+            await _write(db, updates, dry_run)
+            updates = []
+    await _write(db, updates, dry_run)
+    return counts
+
+
+async def _write(db: AsyncIOMotorDatabase, updates: list, dry_run: bool):
+    if updates and not dry_run:
+        await db["transactions"].bulk_write(updates, ordered=False)
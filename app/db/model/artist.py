@@ -1,10 +1,11 @@
 from app.db.model.py_object_id import PyObjectId
+from app.db.model.read_model import ReadModel
 from pydantic import Field
 from app.rest.dtos.album import AlbumSongResponseDto
 from app.rest.dtos.song import SongResponseDto
 
 from pydantic.main import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 from bson import ObjectId
 
 
@@ -14,6 +15,7 @@ class ArtistModel(BaseModel):
     cover_picture: str = Field(...)
     albums: List[str] = []
     songs: List[str] = []
+    version: int = 0
 
     class Config:
         allow_population_by_field_name = True
@@ -29,6 +31,14 @@ class ArtistModel(BaseModel):
         }
 
 
+class ArtistListModel(ReadModel):
+    user_id: str
+    cover_picture: str = ""
+    albums: List[str] = []
+    songs: List[str] = []
+    version: int = 0
+
+
 class UpdateArtistModel(BaseModel):
     user_id: Optional[str]
     cover_picture: Optional[str]
@@ -50,8 +60,8 @@ class UpdateArtistModel(BaseModel):
 
 class CompleteArtistModel(BaseModel):
     user_id: Optional[str]
-    albums: Optional[List[AlbumSongResponseDto]]
-    songs: Optional[List[SongResponseDto]]
+    albums: Optional[List[Union[AlbumSongResponseDto, str]]]
+    songs: Optional[List[Union[SongResponseDto, str]]]
 
     class Config:
         arbitrary_types_allowed = True
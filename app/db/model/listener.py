@@ -1,9 +1,10 @@
 from app.db.model.py_object_id import PyObjectId
+from app.db.model.read_model import ReadModel
 from pydantic import Field
-from app.rest.dtos.playlist import PlaylistSongResponseDto
+from app.rest.dtos.playlist import PlaylistResponseDto, PlaylistSongResponseDto
 
 from pydantic.main import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 from bson import ObjectId
 
 
@@ -14,6 +15,7 @@ class ListenerModel(BaseModel):
     playlists: List[str] = []
     subscription: str = "free"
     wallet_addr: str = ""
+    version: int = 0
 
     class Config:
         allow_population_by_field_name = True
@@ -30,6 +32,20 @@ class ListenerModel(BaseModel):
         }
 
 
+class ListenerListModel(ReadModel):
+    user_id: str
+    interests: List[str] = []
+    playlists: List[str] = []
+    subscription: str = "free"
+    wallet_addr: str = ""
+    version: int = 0
+
+
+class ListenerPreferencesModel(ReadModel):
+    interests: List[str] = []
+    subscription: str = "free"
+
+
 class UpdateListenerModel(BaseModel):
     interests: Optional[List[str]]
     playlists: Optional[List[str]]
@@ -54,7 +70,7 @@ class CompleteListenerModel(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     user_id: str = Field(...)
     interests: List[str] = []
-    playlists: List[PlaylistSongResponseDto] = []
+    playlists: List[Union[PlaylistSongResponseDto, PlaylistResponseDto, str]] = []
     subscription: str = "free"
     wallet_addr: str = ""
 
@@ -0,0 +1,24 @@
+from typing import Any, Dict, Type, TypeVar
+
+from pydantic.main import BaseModel
+
+T = TypeVar("T", bound="ReadModel")
+
+
+class ReadModel(BaseModel):
+    """
+    Slim view over a stored document. Only the declared fields are fetched, and
+    since documents were validated when written, they are not validated again.
+    """
+
+    id: str
+
+    @classmethod
+    def projection(cls) -> Dict[str, bool]:
+        return {name: True for name in cls.__fields__ if name != "id"}
+
+    @classmethod
+    def from_document(cls: Type[T], document: Dict[str, Any]) -> T:
+        values = {name: document[name] for name in cls.__fields__ if name in document}
+        values["id"] = document["_id"]
+        return cls.construct(**values)
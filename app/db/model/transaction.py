@@ -1,16 +1,34 @@
-from pydantic import Field
+from datetime import datetime
+
+from pydantic import Field, validator
 from app.db.model.py_object_id import PyObjectId
 from pydantic.main import BaseModel
-from typing import Optional
+from typing import Any, Optional
 from bson import ObjectId
 
+LEGACY_DATE_FORMAT = "%d/%m/%Y"
+
+
+def parse_date(value: Any) -> Any:
+    """Accepts the legacy dd/mm/yyyy strings besides the formats pydantic parses."""
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, LEGACY_DATE_FORMAT)
+        except ValueError:
+            pass
+    return value
+
 
 class TransactionModel(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     sender: str = Field(...)
     receiver: str = Field(...)
     amount: float = Field(...)
-    date: str = Field(...)
+    date: datetime = Field(...)
+    idempotency_key: Optional[str] = None
+    version: int = 0
+
+    _parse_date = validator("date", pre=True, allow_reuse=True)(parse_date)
 
     class Config:
         allow_population_by_field_name = True
@@ -22,6 +40,7 @@ class TransactionModel(BaseModel):
                 "receiver": "wallet_addr",
                 "amount": 3.4,
                 "date": "20/07/2022",
+                "idempotency_key": "processor-batch-42-7",
             }
         }
 
@@ -30,4 +49,6 @@ class UpdateTransactionModel(BaseModel):
     sender: Optional[str]
     receiver: Optional[str]
     amount: Optional[float]
-    date: Optional[str]
+    date: Optional[datetime]
+
+    _parse_date = validator("date", pre=True, allow_reuse=True)(parse_date)
@@ -6,22 +6,30 @@ from app.adapters import listeners_controller
 from app.adapters import artists_controller
 from app.adapters import health_controller
 from app.adapters import transactions_controller
+from app.adapters import wallets_controller
 from app.conf.config import Settings
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.db import db
+from app.rest import rest
 
 logging.config.fileConfig('app/conf/logging.conf', disable_existing_loggers=False)
 logger = logging.getLogger(__name__)
 
 settings = Settings()
 
-app = FastAPI(version=settings.version, title=settings.title)
+app = FastAPI(
+    version=settings.version,
+    title=settings.title,
+    default_response_class=ORJSONResponse,
+)
 
 app.include_router(listeners_controller.router)
 app.include_router(artists_controller.router)
 app.include_router(health_controller.router)
 app.include_router(transactions_controller.router)
+app.include_router(wallets_controller.router)
 
 origins = ["*"]
 
@@ -36,12 +44,16 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup():
-    await db.connect_to_database(path=settings.db_path)
+    await db.connect_to_database(
+        path=settings.db_path, ensure_indexes=settings.db_ensure_indexes
+    )
+    await rest.connect_clients(settings)
 
 
 @app.on_event("shutdown")
 async def shutdown():
     await db.close_database_connection()
+    await rest.close_clients()
 
 
 if __name__ == "__main__":
@@ -1,14 +1,42 @@
 from fastapi import Depends
 from app.conf.config import Settings, get_settings
+from app.rest.rest_manager import RestManager
 from app.rest.users_client import UserClient
 from app.rest.multimedia_client import MultimediaClient
+from app.rest.multimedia_loader import MultimediaLoader
+from app.rest.recommendations import RecommendationEngine
+
+rest = RestManager()
 
 
 def get_restclient_user(settings: Settings = Depends(get_settings)) -> UserClient:
-    return UserClient(settings.users_api)
+    return UserClient(
+        settings.users_api,
+        rest.users,
+        cache=rest.user_cache,
+        batch_size=settings.users_batch_size,
+    )
 
 
 def get_restclient_multimedia(
     settings: Settings = Depends(get_settings),
 ) -> MultimediaClient:
-    return MultimediaClient(settings.multimedia_api)
+    return MultimediaClient(
+        settings.multimedia_api,
+        rest.multimedia,
+        max_concurrency=settings.multimedia_max_concurrency,
+        cache=rest.catalog_cache,
+        hedger=rest.multimedia_hedger,
+        batching=rest.multimedia_batching,
+        batch_size=settings.multimedia_batch_size,
+    )
+
+
+def get_multimedia_loader(
+    rest_media: MultimediaClient = Depends(get_restclient_multimedia),
+) -> MultimediaLoader:
+    return MultimediaLoader(rest_media)
+
+
+def get_recommendation_engine() -> RecommendationEngine:
+    return rest.recommendations
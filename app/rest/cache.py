@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from app.conf.config import Settings
+from app.rest.cache_backends import CacheBackend, CacheBackends, CacheEntry, Codec
+from app.rest.dtos.album import AlbumSongResponseDto
+from app.rest.dtos.playlist import PlaylistResponseDto
+from app.rest.dtos.song import SongResponseDto
+from app.rest.dtos.user import UserResponseDto
+
+
+class TTLCache:
+    """
+    TTL cache in front of a CacheBackend.
+
+    Concurrent misses for one key share a single load. Entries past their TTL
+    but still inside the stale window are served as-is while one background
+    load refreshes them. Backend failures degrade to misses.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        backend: CacheBackend,
+        ttl: float,
+        stale_ttl: float = 0,
+        codec: Optional[Codec] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.codec = codec
+        self.clock = clock
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        entry = await self._read(key)
+        if entry is not None:
+            if self.clock() < entry.expires_at:
+                self.hits += 1
+                return entry.value
+            self.stale_hits += 1
+            self._load(key, loader)
+            return entry.value
+
+        self.misses += 1
+        # shield: a cancelled caller must not cancel the load other callers share
+        return await asyncio.shield(self._load(key, loader))
+
+    async def get_or_load_many(
+        self, keys: List[str], loader: Callable[[List[str]], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Batched get_or_load. Keys nobody is loading yet go to a single loader
+        call, which returns the values it found by key; keys it leaves out, or
+        whose load failed, are left out of the result and are not cached.
+        """
+        entries = await self._read_many(keys)
+        now = self.clock()
+        found, stale, missing = {}, [], []
+        for key, entry in zip(keys, entries):
+            if entry is None:
+                missing.append(key)
+                continue
+            found[key] = entry.value
+            if now < entry.expires_at:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                stale.append(key)
+        self.misses += len(missing)
+        self._load_many(stale, loader)
+
+        futures = self._load_many(missing, loader)
+        values = await asyncio.shield(asyncio.gather(*futures, return_exceptions=True))
+        for key, value in zip(missing, values):
+            if not isinstance(value, BaseException):
+                found[key] = value
+        return found
+
+    async def get_fresh_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Returns the unexpired cached values among keys, without loading."""
+        entries = await self._read_many(keys)
+        now = self.clock()
+        found = {}
+        for key, entry in zip(keys, entries):
+            if entry is not None and now < entry.expires_at:
+                found[key] = entry.value
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set(self, key: str, value: Any):
+        now = self.clock()
+        entry = CacheEntry(value, now + self.ttl, now + self.ttl + self.stale_ttl)
+        try:
+            await self.backend.set(self._key(key), entry, self.codec)
+        except Exception as e:
+            logging.warning(f"[{self.name} cache] write of {key} failed: {e}")
+
+    async def invalidate(self, key: str):
+        # an in-flight load started before the write must not repopulate the key
+        self._inflight.pop(key, None)
+        try:
+            await self.backend.delete(self._key(key))
+        except Exception as e:
+            logging.warning(f"[{self.name} cache] delete of {key} failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            **self.backend.stats(),
+        }
+
+    def _key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    async def _read(self, key: str) -> Optional[CacheEntry]:
+        try:
+            return await self.backend.get(self._key(key), self.codec)
+        except Exception as e:
+            logging.warning(f"[{self.name} cache] read of {key} failed: {e}")
+            return None
+
+    async def _read_many(self, keys: List[str]) -> List[Optional[CacheEntry]]:
+        try:
+            return await self.backend.get_many(
+                [self._key(key) for key in keys], self.codec
+            )
+        except Exception as e:
+            logging.warning(f"[{self.name} cache] bulk read failed: {e}")
+            return [None] * len(keys)
+
+    def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fill(key, loader))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._done(key, f))
+        return future
+
+    async def _fill(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        value = await loader()
+        if self._inflight.get(key) is asyncio.current_task():
+            await self.set(key, value)
+        return value
+
+    def _load_many(
+        self, keys: List[str], loader: Callable[[List[str]], Awaitable[Dict[str, Any]]]
+    ) -> List[asyncio.Future]:
+        # keys already loading, alone or in another batch, join that load
+        futures, pending = [], {}
+        for key in keys:
+            future = self._inflight.get(key)
+            if future is None:
+                future = pending[key] = asyncio.get_running_loop().create_future()
+                self._inflight[key] = future
+                future.add_done_callback(lambda f, key=key: self._done(key, f))
+            futures.append(future)
+        if pending:
+            asyncio.ensure_future(self._fill_many(pending, loader))
+        return futures
+
+    async def _fill_many(
+        self,
+        pending: Dict[str, asyncio.Future],
+        loader: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+    ):
+        try:
+            values = await loader(list(pending))
+        except Exception as e:
+            for future in pending.values():
+                future.set_exception(e)
+            return
+        for key, future in pending.items():
+            if key not in values:
+                future.set_exception(LookupError(f"{key} not found"))
+                continue
+            if self._inflight.get(key) is future:
+                await self.set(key, values[key])
+            future.set_result(values[key])
+
+    def _done(self, key: str, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled() and future.exception() is not None:
+            logging.warning(
+                f"[{self.name} cache] load of {key} failed: {future.exception()}"
+            )
+
+
+class Representation(NamedTuple):
+    """A rendered response body and the validators it was rendered under."""
+
+    version: str
+    variant: str
+    etag: str
+    body: bytes
+
+
+REPRESENTATION_CODEC = Codec(
+    lambda r: {**r._asdict(), "body": r.body.decode()},
+    lambda data: Representation(**{**data, "body": data["body"].encode()}),
+)
+
+
+class ProfileCache:
+    """Last rendered representation of each profile, keyed by profile id."""
+
+    def __init__(self, settings: Settings, backends: CacheBackends):
+        ttl = settings.cache_profile_ttl
+        self.listeners = TTLCache(
+            "listener_views", backends(), ttl, codec=REPRESENTATION_CODEC
+        )
+        self.artists = TTLCache(
+            "artist_views", backends(), ttl, codec=REPRESENTATION_CODEC
+        )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [self.listeners.stats(), self.artists.stats()]
+
+
+class CatalogCache:
+    def __init__(self, settings: Settings, backends: CacheBackends):
+        stale = settings.cache_stale_ttl
+        self.songs = TTLCache(
+            "songs",
+            backends(),
+            settings.cache_song_ttl,
+            stale,
+            Codec.for_model(SongResponseDto),
+        )
+        self.albums = TTLCache(
+            "albums",
+            backends(),
+            settings.cache_album_ttl,
+            stale,
+            Codec.for_model(AlbumSongResponseDto),
+        )
+        self.playlists = TTLCache(
+            "playlists",
+            backends(),
+            settings.cache_playlist_ttl,
+            stale,
+            Codec.for_model(PlaylistResponseDto),
+        )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [cache.stats() for cache in (self.songs, self.albums, self.playlists)]
+
+
+class UserCache:
+    def __init__(self, settings: Settings, backends: CacheBackends):
+        self.users = TTLCache(
+            "users",
+            backends(),
+            settings.cache_user_ttl,
+            settings.cache_stale_ttl,
+            Codec.for_model(UserResponseDto),
+        )
+        self.user_lists = TTLCache(
+            "user_lists",
+            backends(),
+            settings.cache_user_ttl,
+            settings.cache_stale_ttl,
+            Codec.for_model_list(UserResponseDto),
+        )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [self.users.stats(), self.user_lists.stats()]
@@ -0,0 +1,188 @@
+import math
+import time
+from abc import abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Type
+
+import orjson
+from pydantic.main import BaseModel
+from redis import asyncio as aioredis
+
+from app.conf.config import Settings
+
+
+class CacheEntry:
+    __slots__ = ("value", "expires_at", "stale_until")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class Codec:
+    """Converts cached values to JSON-compatible data and back."""
+
+    def __init__(self, dump: Callable[[Any], Any], load: Callable[[Any], Any]):
+        self.dump = dump
+        self.load = load
+
+    @staticmethod
+    def for_model(model: Type[BaseModel]) -> "Codec":
+        return Codec(lambda value: value.dict(), model.parse_obj)
+
+    @staticmethod
+    def for_model_list(model: Type[BaseModel]) -> "Codec":
+        return Codec(
+            lambda values: [value.dict() for value in values],
+            lambda data: [model.parse_obj(item) for item in data],
+        )
+
+
+class CacheBackend(object):
+    @abstractmethod
+    async def get(self, key: str, codec: Codec) -> Optional[CacheEntry]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, entry: CacheEntry, codec: Codec):
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str):
+        pass
+
+    async def get_many(
+        self, keys: List[str], codec: Codec
+    ) -> List[Optional[CacheEntry]]:
+        return [await self.get(key, codec) for key in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    async def close(self):
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process bounded LRU. Values are kept as objects, never encoded."""
+
+    def __init__(self, max_size: int, clock: Callable[[], float] = time.time):
+        self.max_size = max_size
+        self.clock = clock
+        self.evictions = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+    async def get(self, key: str, codec: Codec) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.stale_until <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry, codec: Codec):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "evictions": self.evictions,
+        }
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache shared by every worker through a Redis-protocol server.
+
+    Entries are stored as orjson documents and expire in Redis when their
+    stale window ends; size and eviction are left to the server's policy.
+    """
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        prefix: str = "profiles:",
+        clock: Callable[[], float] = time.time,
+    ):
+        self.redis = redis
+        self.prefix = prefix
+        self.clock = clock
+
+    @staticmethod
+    def from_url(url: str) -> "RedisCacheBackend":
+        return RedisCacheBackend(aioredis.from_url(url))
+
+    async def get(self, key: str, codec: Codec) -> Optional[CacheEntry]:
+        raw = await self.redis.get(self.prefix + key)
+        if raw is None:
+            return None
+        return self._decode(raw, codec)
+
+    async def get_many(
+        self, keys: List[str], codec: Codec
+    ) -> List[Optional[CacheEntry]]:
+        if not keys:
+            return []
+        raws = await self.redis.mget([self.prefix + key for key in keys])
+        return [None if raw is None else self._decode(raw, codec) for raw in raws]
+
+    @staticmethod
+    def _decode(raw: bytes, codec: Codec) -> CacheEntry:
+        data = orjson.loads(raw)
+        return CacheEntry(codec.load(data["v"]), data["e"], data["s"])
+
+    async def set(self, key: str, entry: CacheEntry, codec: Codec):
+        ttl_ms = math.ceil((entry.stale_until - self.clock()) * 1000)
+        if ttl_ms <= 0:
+            return
+        raw = orjson.dumps(
+            {
+                "v": codec.dump(entry.value),
+                "e": entry.expires_at,
+                "s": entry.stale_until,
+            }
+        )
+        await self.redis.set(self.prefix + key, raw, px=ttl_ms)
+
+    async def delete(self, key: str):
+        await self.redis.delete(self.prefix + key)
+
+    async def close(self):
+        await self.redis.close()
+
+
+class CacheBackends:
+    """
+    Hands out the configured backend to each cache. Memory backends are per
+    cache so each keeps its own LRU bound; Redis is one shared connection pool.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._shared: Optional[CacheBackend] = None
+        self._created: List[CacheBackend] = []
+
+    def __call__(self) -> CacheBackend:
+        if self.settings.cache_backend == "redis":
+            if self._shared is None:
+                self._shared = RedisCacheBackend.from_url(self.settings.redis_url)
+                self._created.append(self._shared)
+            return self._shared
+        backend = MemoryCacheBackend(self.settings.cache_max_entries)
+        self._created.append(backend)
+        return backend
+
+    async def close(self):
+        for backend in self._created:
+            await backend.close()
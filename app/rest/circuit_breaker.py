@@ -0,0 +1,213 @@
+import asyncio
+import bisect
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} upstream is unavailable")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class LatencyTracker:
+    """Latency percentiles over the last window successful requests."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._sorted = []
+
+    def record(self, seconds: float):
+        if len(self._samples) == self._samples.maxlen:
+            oldest = self._samples[0]
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._samples.append(seconds)
+        bisect.insort(self._sorted, seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """None until min_samples latencies have been seen."""
+        if len(self._sorted) < self.min_samples:
+            return None
+        index = min(len(self._sorted) - 1, int(q * len(self._sorted)))
+        return self._sorted[index]
+
+
+class CircuitBreaker:
+    """
+    Per-upstream breaker over a rolling window of outcomes.
+
+    Closed, it lets every call through and opens once the window holds at
+    least min_requests calls with an error rate of failure_threshold or more.
+    Open, it rejects calls for reset_timeout seconds and then goes half-open,
+    letting a single trial call through: success closes it, failure reopens it.
+    Transitions happen synchronously between awaits, so coroutines sharing
+    a breaker never see a torn state.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: float = 0.5,
+        min_requests: int = 20,
+        window: float = 30,
+        reset_timeout: float = 15,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._trial = False
+
+    def before_call(self):
+        """Raises CircuitOpenError when the call must not reach the upstream."""
+        if self.state == OPEN:
+            waited = self.clock() - self.opened_at
+            if waited < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.reset_timeout - waited)
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._trial:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._trial = True
+
+    def record(self, ok: bool):
+        if self.state == HALF_OPEN:
+            self._trial = False
+            self._transition(CLOSED if ok else OPEN)
+            return
+
+        now = self.clock()
+        self._outcomes.append((now, ok))
+        self._failures += not ok
+        self._expire(now)
+        if self.state == CLOSED and self._should_open():
+            self._transition(OPEN)
+
+    def release(self):
+        """Gives back a half-open trial whose call ended without an outcome."""
+        if self.state == HALF_OPEN:
+            self._trial = False
+
+    def error_rate(self) -> float:
+        self._expire(self.clock())
+        return self._failures / len(self._outcomes) if self._outcomes else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "requests": len(self._outcomes),
+            "error_rate": self.error_rate(),
+            "rejected": self.rejected,
+        }
+
+    def _should_open(self) -> bool:
+        return (
+            len(self._outcomes) >= self.min_requests
+            and self._failures / len(self._outcomes) >= self.failure_threshold
+        )
+
+    def _expire(self, now: float):
+        while self._outcomes and self._outcomes[0][0] <= now - self.window:
+            _, ok = self._outcomes.popleft()
+            self._failures -= not ok
+
+    def _transition(self, state: str):
+        logging.warning(f"[{self.name} upstream] circuit {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self.opened_at = self.clock()
+        if state == CLOSED:
+            self._outcomes.clear()
+            self._failures = 0
+
+
+class UpstreamTransport(httpx.AsyncBaseTransport):
+    """
+    Guards every request to one upstream with its CircuitBreaker and bounds
+    the read timeout by the latencies it has observed: factor times the
+    timeout percentile, clamped to [min_timeout, max_timeout]. Until enough
+    latencies are known the configured max_timeout applies.
+
+    Transport errors, timeouts and 5xx responses count as failures.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        breaker: CircuitBreaker,
+        latency: LatencyTracker,
+        max_timeout: float,
+        min_timeout: float = 0.5,
+        percentile: float = 0.99,
+        factor: float = 3.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.transport = transport
+        self.breaker = breaker
+        self.latency = latency
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.percentile = percentile
+        self.factor = factor
+        self.clock = clock
+
+    def timeout(self) -> float:
+        observed = self.latency.percentile(self.percentile)
+        if observed is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, observed * self.factor))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.breaker.before_call()
+        timeouts = dict(request.extensions.get("timeout", {}))
+        timeouts["read"] = min(timeouts.get("read") or self.max_timeout, self.timeout())
+        request.extensions["timeout"] = timeouts
+
+        started = self.clock()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record(False)
+            raise
+        ok = response.status_code < 500
+        self.breaker.record(ok)
+        if ok:
+            self.latency.record(self.clock() - started)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.breaker.stats(),
+            "p50": self.latency.percentile(0.5),
+            "p99": self.latency.percentile(0.99),
+            "timeout": self.timeout(),
+        }
+
+    async def aclose(self):
+        await self.transport.aclose()
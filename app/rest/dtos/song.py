@@ -1,5 +1,5 @@
 from pydantic.main import BaseModel
-from typing import List
+from typing import List, Optional
 from app.rest.dtos.artist import ArtistModel
 
 
@@ -10,6 +10,7 @@ class SongResponseDto(BaseModel):
     description: str
     song_file: str
     genre: str
+    subscription: Optional[str] = None
 
     def __getitem__(self, item):
         return getattr(self, item)
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from app.rest.circuit_breaker import LatencyTracker
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """
+    Hedges idempotent calls against slow responses: once a call has been
+    outstanding for the observed percentile latency, a duplicate is fired and
+    whichever succeeds first is used; the other one is cancelled.
+
+    Every call earns `budget` hedge tokens (up to max_tokens) and each hedge
+    spends one, so hedges stay at about budget times the call rate.
+    """
+
+    def __init__(
+        self,
+        latency: LatencyTracker,
+        percentile: float = 0.95,
+        budget: float = 0.1,
+        max_tokens: float = 10,
+    ):
+        self.latency = latency
+        self.percentile = percentile
+        self.budget = budget
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_exhausted = 0
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        self.tokens = min(self.max_tokens, self.tokens + self.budget)
+        delay = self.latency.percentile(self.percentile)
+        primary = asyncio.ensure_future(call())
+        if delay is None:
+            return await primary
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+            if self.tokens < 1:
+                self.budget_exhausted += 1
+                return await primary
+        except BaseException:
+            primary.cancel()
+            raise
+
+        self.tokens -= 1
+        self.hedges += 1
+        hedge = asyncio.ensure_future(call())
+        winner = await self._first_success(primary, hedge)
+        if winner is hedge:
+            self.hedge_wins += 1
+        return winner.result()
+
+    @staticmethod
+    async def _first_success(*futures: asyncio.Future) -> asyncio.Future:
+        # a fast failure must not beat a slower success
+        pending = set(futures)
+        try:
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    if future.exception() is None or not pending:
+                        return future
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "budget_exhausted": self.budget_exhausted,
+            "delay": self.latency.percentile(self.percentile),
+        }
@@ -1,65 +1,166 @@
+import asyncio
 import httpx
 import json
 import logging
 
-from typing import List
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+from pydantic.main import BaseModel
 from app.rest.dtos.album import AlbumResponseDto, AlbumSongResponseDto
 from app.rest.dtos.request.album import AlbumRequestDto
 from app.rest.dtos.playlist import PlaylistResponseDto, PlaylistSongResponseDto
 from app.rest.dtos.request.playlist import PlaylistRequestDto
 from app.rest.dtos.song import SongResponseDto
 from app.rest.dtos.request.song import SongRequestDto
+from app.rest.cache import CatalogCache, TTLCache
+from app.rest.hedging import Hedger
+
+T = TypeVar("T")
+M = TypeVar("M", bound=BaseModel)
+
+# collection endpoints that may answer ?ids=a,b,c with just those entities
+BATCH_PATHS = {"songs": "/songs", "albums": "/albums", "playlists": "/playlists/"}
+
+
+async def gather_ids(
+    fetch: Callable[[str], Awaitable[T]], ids: List[str], kind: str
+) -> List[T]:
+    async def fetch_one(item_id: str):
+        try:
+            return await fetch(item_id)
+        except Exception as e:
+            logging.error(f"Error getting {kind} {item_id}. Exception {e}")
+            return None
+
+    results = await asyncio.gather(*[fetch_one(i) for i in ids])
+    return [r for r in results if r is not None]
+
+
+def with_songs(
+    info: PlaylistResponseDto, songs: Dict[str, SongResponseDto]
+) -> PlaylistSongResponseDto:
+    playlist = PlaylistSongResponseDto(**info.dict(exclude={"songs"}))
+    playlist.set_songs([songs[s] for s in info.songs if s in songs])
+    return playlist
+
+
+class BatchSupport:
+    """
+    Remembers, per collection, whether the upstream answers `ids=` queries.
+    Shared by every client so each collection is probed once per process.
+    """
+
+    def __init__(self):
+        self.modes: Dict[str, bool] = {}
+
+    def supports(self, kind: str) -> Optional[bool]:
+        return self.modes.get(kind)
+
+    def set(self, kind: str, supported: bool):
+        if self.modes.get(kind) != supported:
+            mode = "ids= queries" if supported else "single fetches"
+            logging.info(f"[multimedia] {kind} batches use {mode}")
+        self.modes[kind] = supported
 
 
 class MultimediaClient:
-    def __init__(self, api_url: str):
+    def __init__(
+        self,
+        api_url: str,
+        client: httpx.AsyncClient,
+        max_concurrency: int = 10,
+        cache: Optional[CatalogCache] = None,
+        hedger: Optional[Hedger] = None,
+        batching: Optional[BatchSupport] = None,
+        batch_size: int = 50,
+    ):
         self.api_url = api_url
+        self.client = client
+        self.cache = cache
+        self.hedger = hedger
+        self.batching = batching or BatchSupport()
+        self.batch_size = batch_size
+        # Only leaf GETs take a slot, so nested fan-outs cannot deadlock.
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _get(self, url: str) -> httpx.Response:
+        if self.hedger:
+            r = await self.hedger.run(lambda: self._send_hedged_get(url))
+        else:
+            r = await self._send_get(url)
+        if r.status_code != httpx.codes.OK:
+            r.raise_for_status()
+        return r
+
+    async def _send_hedged_get(self, url: str) -> httpx.Response:
+        r = await self._send_get(url)
+        # raising makes a fast 5xx lose the race against a slower success
+        if r.status_code >= httpx.codes.INTERNAL_SERVER_ERROR:
+            r.raise_for_status()
+        return r
+
+    async def _send_get(self, url: str) -> httpx.Response:
+        async with self.semaphore:
+            return await self.client.get(url)
 
-    def create_album(self, request: AlbumRequestDto) -> (AlbumResponseDto, str):
-        r = httpx.post(f'{self.api_url}/albums', json=request.dict())
+    async def create_album(self, request: AlbumRequestDto) -> (AlbumResponseDto, str):
+        r = await self.client.post(f'{self.api_url}/albums', json=request.dict())
 
         if r.status_code != httpx.codes.CREATED:
             r.raise_for_status()
 
         d = r.json()
         logging.info(f"[album] {d}")
+        if self.cache:
+            await self.cache.albums.invalidate(d["id"])
         return AlbumResponseDto(**d), d["id"]
 
-    def create_song(self, request: SongRequestDto) -> (SongResponseDto, str):
-        r = httpx.post(f'{self.api_url}/songs', json=request.dict())
+    async def create_song(self, request: SongRequestDto) -> (SongResponseDto, str):
+        r = await self.client.post(f'{self.api_url}/songs', json=request.dict())
         if r.status_code != httpx.codes.CREATED:
             r.raise_for_status()
 
         d = r.json()
+        if self.cache:
+            await self.cache.songs.invalidate(d["id"])
 
         return SongResponseDto(**d), d["id"]
 
-    def create_playlist(
+    async def create_playlist(
         self, request: PlaylistRequestDto
     ) -> (PlaylistResponseDto, str):
-        r = httpx.post(f'{self.api_url}/playlists/', json=request.dict())
+        r = await self.client.post(f'{self.api_url}/playlists/', json=request.dict())
 
         if r.status_code != httpx.codes.CREATED:
             r.raise_for_status()
 
         d = r.json()
         logging.info(f"[PLAYLIST JSON] {d}")
+        if self.cache:
+            await self.cache.playlists.invalidate(d["id"])
         return PlaylistResponseDto(**d), d["id"]
 
-    def get_song(self, song_id: str) -> SongResponseDto:
-        r = httpx.get(f'{self.api_url}/songs/{song_id}')
-        if r.status_code != httpx.codes.OK:
-            r.raise_for_status()
+    async def get_song(self, song_id: str) -> SongResponseDto:
+        if self.cache:
+            return await self.cache.songs.get_or_load(
+                song_id, lambda: self._fetch_song(song_id)
+            )
+        return await self._fetch_song(song_id)
 
+    async def _fetch_song(self, song_id: str) -> SongResponseDto:
+        r = await self._get(f'{self.api_url}/songs/{song_id}')
         d = r.json()
 
         return SongResponseDto(**d)
 
-    def get_album(self, album_id: str) -> AlbumSongResponseDto:
-        r = httpx.get(f'{self.api_url}/albums/{album_id}')
-        if r.status_code != httpx.codes.OK:
-            r.raise_for_status()
+    async def get_album(self, album_id: str) -> AlbumSongResponseDto:
+        if self.cache:
+            return await self.cache.albums.get_or_load(
+                album_id, lambda: self._fetch_album(album_id)
+            )
+        return await self._fetch_album(album_id)
 
+    async def _fetch_album(self, album_id: str) -> AlbumSongResponseDto:
+        r = await self._get(f'{self.api_url}/albums/{album_id}')
         s = r.json()
         logging.info(s)
         # songs_list = self.get_songs(s["songs"])
@@ -70,64 +171,215 @@ class MultimediaClient:
 
         return album
 
-    def get_playlist(self, playlist_id: str) -> PlaylistSongResponseDto:
-        r = httpx.get(f'{self.api_url}/playlists/{playlist_id}')
-        if r.status_code != httpx.codes.OK:
-            r.raise_for_status()
-
-        s = r.json()
-        songs_list = self.get_songs(s["songs"])
-
-        del s["songs"]
-        playlist = PlaylistSongResponseDto(**s)
-        playlist.set_songs(songs_list)
-
-        return playlist
-
-    def get_songs(self, songs: List[str]) -> List[SongResponseDto]:
-        songs_list = []
-        for song_id in songs:
-            try:
-                s = self.get_song(song_id)
-                songs_list.append(s)
-            except Exception as e:
-                logging.error(f"Error getting song {song_id}. Exception {e}")
-
-        return songs_list
-
-    def get_playlists(self, playlist_ids: List[str]) -> List[PlaylistSongResponseDto]:
-        list_playlists = []
-
-        for playlist_id in playlist_ids:
-            try:
-                play = self.get_playlist(playlist_id)
-                list_playlists.append(play)
-            except Exception as e:
-                logging.error(f"Error getting playlist {playlist_id}. Exception {e}")
-
-        return list_playlists
-
-    def get_albums(self, album_ids: List[str]) -> List[AlbumSongResponseDto]:
-        list_albums = []
+    async def get_playlist_info(self, playlist_id: str) -> PlaylistResponseDto:
+        if self.cache:
+            return await self.cache.playlists.get_or_load(
+                playlist_id, lambda: self._fetch_playlist_info(playlist_id)
+            )
+        return await self._fetch_playlist_info(playlist_id)
+
+    async def _fetch_playlist_info(self, playlist_id: str) -> PlaylistResponseDto:
+        r = await self._get(f'{self.api_url}/playlists/{playlist_id}')
+        return PlaylistResponseDto(**r.json())
+
+    async def get_playlist(self, playlist_id: str) -> PlaylistSongResponseDto:
+        info = await self.get_playlist_info(playlist_id)
+        return with_songs(info, await self.get_songs_by_id(info.songs))
+
+    async def get_songs(self, songs: List[str]) -> List[SongResponseDto]:
+        return await self.get_songs_batch(songs)
+
+    async def get_playlists(
+        self, playlist_ids: List[str]
+    ) -> List[PlaylistSongResponseDto]:
+        return await self.get_playlists_batch(playlist_ids)
+
+    async def get_albums(self, album_ids: List[str]) -> List[AlbumSongResponseDto]:
+        return await self.get_albums_batch(album_ids)
+
+    async def get_songs_batch(self, song_ids: List[str]) -> List[SongResponseDto]:
+        found = await self.get_songs_by_id(song_ids)
+        return [found[i] for i in song_ids if i in found]
+
+    async def get_albums_batch(
+        self, album_ids: List[str]
+    ) -> List[AlbumSongResponseDto]:
+        found = await self.get_albums_by_id(album_ids)
+        return [found[i] for i in album_ids if i in found]
+
+    async def get_playlists_batch(
+        self, playlist_ids: List[str]
+    ) -> List[PlaylistSongResponseDto]:
+        """Resolves the songs of every playlist in one songs batch."""
+        infos = await self.get_playlist_infos_by_id(playlist_ids)
+        songs = await self.get_songs_by_id(
+            [song_id for info in infos.values() for song_id in info.songs]
+        )
+        return [with_songs(infos[i], songs) for i in playlist_ids if i in infos]
+
+    async def get_songs_by_id(self, song_ids: List[str]) -> Dict[str, SongResponseDto]:
+        return await self._get_many(
+            "songs",
+            song_ids,
+            SongResponseDto,
+            self._fetch_song,
+            self.cache and self.cache.songs,
+        )
 
-        for album_id in album_ids:
-            alb = self.get_album(album_id)
-            list_albums.append(alb)
+    async def get_albums_by_id(
+        self, album_ids: List[str]
+    ) -> Dict[str, AlbumSongResponseDto]:
+        return await self._get_many(
+            "albums",
+            album_ids,
+            AlbumSongResponseDto,
+            self._fetch_album,
+            self.cache and self.cache.albums,
+        )
 
-        return list_albums
+    async def get_playlist_infos_by_id(
+        self, playlist_ids: List[str]
+    ) -> Dict[str, PlaylistResponseDto]:
+        return await self._get_many(
+            "playlists",
+            playlist_ids,
+            PlaylistResponseDto,
+            self._fetch_playlist_info,
+            self.cache and self.cache.playlists,
+        )
 
-    def add_song_to_album(self, album_id: str, song_id=str) -> bool:
+    async def _get_many(
+        self,
+        kind: str,
+        ids: List[str],
+        model: Type[M],
+        fetch_one: Callable[[str], Awaitable[M]],
+        cache: Optional[TTLCache],
+    ) -> Dict[str, M]:
+        """
+        Resolves ids into a map by id. Cached entities are served locally, the
+        same way get_* serves them; the rest are fetched through _fetch_many,
+        sharing loads with concurrent requests for the same ids. Ids that
+        cannot be fetched are left out.
+        """
+        unique = list(dict.fromkeys(ids))
+        if cache:
+            return await cache.get_or_load_many(
+                unique, lambda misses: self._fetch_many(kind, misses, model, fetch_one)
+            )
+        return await self._fetch_many(kind, unique, model, fetch_one)
+
+    async def _fetch_many(
+        self,
+        kind: str,
+        ids: List[str],
+        model: Type[M],
+        fetch_one: Callable[[str], Awaitable[M]],
+    ) -> Dict[str, M]:
+        """
+        Fetches ids in ids= batches of batch_size when the upstream supports
+        them, or one by one otherwise.
+        """
+        found = {}
+        if ids and self.batching.supports(kind) is None:
+            probed = await self._probe(kind, ids[0], model)
+            if probed is not None:
+                found.update((item.id, item) for item in probed)
+                ids = ids[1:]
+
+        fetched = []
+        if ids and self.batching.supports(kind):
+            chunks = []
+            for start in range(0, len(ids), self.batch_size):
+                end = start + self.batch_size
+                chunks.append(ids[start:end])
+            results = await asyncio.gather(
+                *[self._fetch_chunk(kind, c, model, fetch_one) for c in chunks]
+            )
+            for items in results:
+                fetched.extend(items)
+        elif ids:
+            fetched.extend(await self._fetch_singles(ids, fetch_one, kind))
+
+        found.update(fetched)
+        return found
+
+    async def _probe(
+        self, kind: str, item_id: str, model: Type[M]
+    ) -> Optional[List[M]]:
+        """
+        Asks for one entity through ids= and records whether the upstream
+        honoured the filter. Returns the entity list when it did; a failed
+        probe, or an empty answer, decides nothing and is retried on the next
+        batch.
+        """
+        try:
+            r = await self._send_get(self._batch_url(kind, [item_id]))
+        except Exception as e:
+            logging.warning(f"[multimedia] {kind} batch probe failed: {e}")
+            return None
+        if r.status_code >= httpx.codes.INTERNAL_SERVER_ERROR:
+            logging.warning(f"[multimedia] {kind} batch probe got {r.status_code}")
+            return None
+
+        try:
+            data = r.json() if r.status_code == httpx.codes.OK else None
+        except ValueError:
+            data = None
+        if data == []:
+            # an unknown id, or a filter that matched nothing; either way
+            return None
+        # an upstream ignoring ids= answers with some other listing
+        supported = isinstance(data, list) and all(
+            isinstance(d, dict) and d.get("id") == item_id for d in data
+        )
+        self.batching.set(kind, supported)
+        return [model(**d) for d in data] if supported else None
+
+    async def _fetch_chunk(
+        self,
+        kind: str,
+        ids: List[str],
+        model: Type[M],
+        fetch_one: Callable[[str], Awaitable[M]],
+    ) -> List[Tuple[str, M]]:
+        try:
+            r = await self._get(self._batch_url(kind, ids))
+            items = [model(**d) for d in r.json()]
+        except Exception as e:
+            logging.error(f"Error getting {kind} {ids} in batch. Exception {e}")
+            return await self._fetch_singles(ids, fetch_one, kind)
+
+        wanted = set(ids)
+        items = [item for item in items if item.id in wanted]
+        missing = wanted - {item.id for item in items}
+        if missing:
+            logging.error(f"Error getting {kind} {sorted(missing)}. Not found")
+        return [(item.id, item) for item in items]
+
+    @staticmethod
+    async def _fetch_singles(
+        ids: List[str], fetch_one: Callable[[str], Awaitable[M]], kind: str
+    ) -> List[Tuple[str, M]]:
+        async def keyed(item_id: str) -> Tuple[str, M]:
+            return item_id, await fetch_one(item_id)
+
+        return await gather_ids(keyed, ids, kind)
+
+    def _batch_url(self, kind: str, ids: List[str]) -> str:
+        return f"{self.api_url}{BATCH_PATHS[kind]}?ids={','.join(ids)}"
+
+    async def add_song_to_album(self, album_id: str, song_id=str) -> bool:
         song = {"songs": [song_id]}
-        r = httpx.patch(
-            f'{self.api_url}/albums/{album_id}/songs', data=json.dumps(song)
+        r = await self.client.patch(
+            f'{self.api_url}/albums/{album_id}/songs', content=json.dumps(song)
         )
+        if self.cache:
+            await self.cache.albums.invalidate(album_id)
         return r.status_code == 200
 
-    def get_songs_by_genre(self, genre: str) -> List[SongResponseDto]:
-        r = httpx.get(f'{self.api_url}/songs?genre={genre}')
-        if r.status_code != httpx.codes.OK:
-            r.raise_for_status()
-
+    async def get_songs_by_genre(self, genre: str) -> List[SongResponseDto]:
+        r = await self._get(f'{self.api_url}/songs?genre={genre}')
         logging.debug(f"RECOMMENDATION: --> {r}")
         response = r.json()
 
@@ -135,11 +387,3 @@ class MultimediaClient:
         for s in response:
             songs_list.append(SongResponseDto(**s))
         return songs_list
-
-    def get_recomendation_by_genre(self, interests: List[str]) -> List[SongResponseDto]:
-        songs_list = []
-        for genre in interests[:2]:
-            songs = self.get_songs_by_genre(genre)
-            for song in songs[:3]:
-                songs_list.append(song)
-        return songs_list[:10]
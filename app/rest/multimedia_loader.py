@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+from app.rest.dtos.album import AlbumSongResponseDto
+from app.rest.dtos.playlist import PlaylistResponseDto, PlaylistSongResponseDto
+from app.rest.dtos.song import SongResponseDto
+from app.rest.multimedia_client import MultimediaClient, with_songs
+
+
+class MultimediaLoader:
+    """
+    Request-scoped front for MultimediaClient lookups.
+
+    Every id is fetched at most once per request: concurrent and repeated
+    callers for the same song, album or playlist share one in-flight fetch.
+    Lists of ids are resolved through the client's batch calls, and the
+    songs of a list of playlists are resolved together in one songs batch.
+    Ids that could not be loaded are left out of the results and recorded in
+    misses, so callers can tell a partial result from a complete one.
+    """
+
+    def __init__(self, client: MultimediaClient):
+        self.client = client
+        self._songs: Dict[str, asyncio.Future] = {}
+        self._albums: Dict[str, asyncio.Future] = {}
+        self._playlists: Dict[str, asyncio.Future] = {}
+        self._playlist_infos: Dict[str, asyncio.Future] = {}
+        self.misses: Set[str] = set()
+
+    async def _load_many(
+        self,
+        futures: Dict[str, asyncio.Future],
+        ids: List[str],
+        fetch_batch: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+        kind: str,
+    ) -> List:
+        new = [i for i in dict.fromkeys(ids) if i not in futures]
+        if new:
+            loop = asyncio.get_running_loop()
+            for item_id in new:
+                futures[item_id] = loop.create_future()
+            found = {}
+            try:
+                found = await fetch_batch(new)
+            finally:
+                for item_id in new:
+                    if item_id in found:
+                        futures[item_id].set_result(found[item_id])
+                    else:
+                        self.misses.add(f"{kind} {item_id}")
+                        futures[item_id].set_exception(
+                            LookupError(f"{kind} {item_id} not found")
+                        )
+
+        results = await asyncio.gather(
+            *[futures[i] for i in ids], return_exceptions=True
+        )
+        return [r for r in results if not isinstance(r, Exception)]
+
+    async def get_song(self, song_id: str) -> SongResponseDto:
+        if song_id not in self._songs:
+            self._songs[song_id] = asyncio.ensure_future(self.client.get_song(song_id))
+        return await self._songs[song_id]
+
+    async def get_album(self, album_id: str) -> AlbumSongResponseDto:
+        albums = await self.get_albums([album_id])
+        if not albums:
+            raise LookupError(f"album {album_id} not found")
+        return albums[0]
+
+    async def get_playlist(self, playlist_id: str) -> PlaylistSongResponseDto:
+        playlists = await self.get_playlists([playlist_id])
+        if not playlists:
+            raise LookupError(f"playlist {playlist_id} not found")
+        return playlists[0]
+
+    async def get_songs(self, song_ids: List[str]) -> List[SongResponseDto]:
+        return await self._load_many(
+            self._songs, song_ids, self.client.get_songs_by_id, "song"
+        )
+
+    async def get_albums(self, album_ids: List[str]) -> List[AlbumSongResponseDto]:
+        return await self._load_many(
+            self._albums, album_ids, self.client.get_albums_by_id, "album"
+        )
+
+    async def get_playlists(
+        self, playlist_ids: List[str]
+    ) -> List[PlaylistSongResponseDto]:
+        return await self._load_many(
+            self._playlists, playlist_ids, self._fetch_playlists, "playlist"
+        )
+
+    async def get_playlist_infos(
+        self, playlist_ids: List[str]
+    ) -> List[PlaylistResponseDto]:
+        """Playlists with their song ids, without resolving the songs."""
+        return await self._load_many(
+            self._playlist_infos,
+            playlist_ids,
+            self.client.get_playlist_infos_by_id,
+            "playlist",
+        )
+
+    async def _fetch_playlists(
+        self, playlist_ids: List[str]
+    ) -> Dict[str, PlaylistSongResponseDto]:
+        infos = {info.id: info for info in await self.get_playlist_infos(playlist_ids)}
+        song_ids = [song_id for info in infos.values() for song_id in info.songs]
+        await self.get_songs(song_ids)
+        songs = {
+            song_id: self._songs[song_id].result()
+            for song_id in song_ids
+            if not self._songs[song_id].exception()
+        }
+        return {
+            playlist_id: with_songs(info, songs) for playlist_id, info in infos.items()
+        }
@@ -0,0 +1,102 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.db.model.subscription import Subscription
+from app.rest.dtos.song import SongResponseDto
+
+# a song without a tier is free to every listener
+DEFAULT_TIER = Subscription.free.value
+TIERS = {tier.value: code for code, tier in enumerate(Subscription)}
+UNKNOWN_TIER = -1
+
+# each later interest weighs a bit less than the one before it
+INTEREST_DECAY = 0.01
+# penalty per position a song sits below the top of its best genre pool
+POSITION_PENALTY = 0.02
+# penalty per higher-ranked catalog song by the same main artist
+ARTIST_PENALTY = 0.1
+
+
+def tier_code(tier: Optional[str]) -> int:
+    return TIERS.get(tier or DEFAULT_TIER, UNKNOWN_TIER)
+
+
+class Catalog:
+    """
+    Every pooled song as one row of precomputed matrices, so ranking a
+    listener is a single vectorized pass:
+
+    score = matches @ interest_weights
+            - POSITION_PENALTY * position - ARTIST_PENALTY * artist_rank
+
+    Songs matching none of the interests, or whose tier the listener's
+    subscription does not allow, are never returned.
+    """
+
+    def __init__(self, pools: Dict[str, List[SongResponseDto]]):
+        self.genres = {genre: column for column, genre in enumerate(pools)}
+        rows: Dict[str, int] = {}
+        songs: List[SongResponseDto] = []
+        positions: List[int] = []
+        memberships = []
+        for genre, pool in pools.items():
+            for position, song in enumerate(pool):
+                row = rows.get(song.id)
+                if row is None:
+                    row = rows[song.id] = len(songs)
+                    songs.append(song)
+                    positions.append(position)
+                positions[row] = min(positions[row], position)
+                memberships.append((row, self.genres[genre]))
+
+        self.songs = songs
+        self.matches = np.zeros((len(songs), len(self.genres)), dtype=np.float32)
+        if memberships:
+            self.matches[tuple(np.array(memberships).T)] = 1
+        self.position = np.array(positions, dtype=np.float32)
+        self.tiers = np.array(
+            [tier_code(song.subscription) for song in songs], dtype=np.int8
+        )
+        self.artist_rank = self._artist_rank()
+        self.base_score = (
+            -POSITION_PENALTY * self.position - ARTIST_PENALTY * self.artist_rank
+        )
+
+    def rank(
+        self, interests: List[str], allowed: List[str], k: int
+    ) -> List[SongResponseDto]:
+        weights = np.zeros(len(self.genres), dtype=np.float32)
+        for position, genre in enumerate(interests):
+            column = self.genres.get(genre)
+            if column is not None:
+                weights[column] = max(weights[column], 1 - INTEREST_DECAY * position)
+
+        relevance = self.matches @ weights
+        eligible = (relevance > 0) & np.isin(
+            self.tiers, [tier_code(tier) for tier in allowed if tier in TIERS]
+        )
+        candidates = np.flatnonzero(eligible)
+        if k <= 0 or len(candidates) == 0:
+            return []
+
+        scores = relevance[candidates] + self.base_score[candidates]
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+        # catalog order breaks ties, so equal scores rank deterministically
+        order = np.lexsort((candidates, -scores))
+        return [self.songs[row] for row in candidates[order]]
+
+    def _artist_rank(self) -> np.ndarray:
+        # walk songs best position first so the top song of each artist is free
+        ranks = np.zeros(len(self.songs), dtype=np.float32)
+        seen: Dict[str, int] = {}
+        for row in np.argsort(self.position, kind="stable"):
+            artists = self.songs[row].artists
+            if not artists:
+                continue
+            count = seen.get(artists[0].artist_id, 0)
+            ranks[row] = count
+            seen[artists[0].artist_id] = count + 1
+        return ranks
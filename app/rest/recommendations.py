@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set
+
+import orjson
+
+from app.db.model.subscription import Subscription
+from app.rest.dtos.song import SongResponseDto
+from app.rest.multimedia_client import MultimediaClient
+from app.rest.ranking import Catalog
+
+
+class ListenerRecommendations(NamedTuple):
+    preferences_hash: str
+    generation: int
+    songs: List[SongResponseDto]
+
+
+def preferences_hash(interests: List[str], subscription: str) -> str:
+    return hashlib.sha1(orjson.dumps([interests, subscription])).hexdigest()
+
+
+class RecommendationEngine:
+    """
+    Serves listener recommendations from memory.
+
+    Candidate songs are pooled per genre and refreshed by a background task;
+    every refresh bumps the generation. Interests are free-form, so at most
+    max_genres pools are kept, least recently requested first out, and a
+    refresh drops the pools nobody requested since the previous one. The
+    pools are scored together through a Catalog, rebuilt only when a pool
+    changes. Each listener's ranked list
+    is kept under the hash of their interests and subscription and the
+    generation it was ranked from, so it is recomputed only when one changes.
+    """
+
+    def __init__(
+        self,
+        client: MultimediaClient,
+        pool_size: int = 100,
+        refresh_interval: float = 300,
+        max_limit: int = 50,
+        max_listeners: int = 10000,
+        max_genres: int = 1000,
+    ):
+        self.client = client
+        self.pool_size = pool_size
+        self.refresh_interval = refresh_interval
+        self.max_limit = max_limit
+        self.max_listeners = max_listeners
+        self.max_genres = max_genres
+        self.pools: "OrderedDict[str, List[SongResponseDto]]" = OrderedDict()
+        self._requested: Set[str] = set()
+        self.generation = 0
+        self._catalog: Optional[Catalog] = None
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._listeners: "OrderedDict[str, ListenerRecommendations]" = OrderedDict()
+        self._refresher: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._refresher = asyncio.ensure_future(self._refresh_forever())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+
+    async def recommend(
+        self,
+        listener_id: str,
+        interests: List[str],
+        subscription: str,
+        limit: int,
+    ) -> List[SongResponseDto]:
+        key = preferences_hash(interests, subscription)
+        generation = self.generation
+        cached = self._listeners.get(listener_id)
+        if cached and (cached.preferences_hash, cached.generation) == (
+            key,
+            generation,
+        ):
+            self._listeners.move_to_end(listener_id)
+            return cached.songs[:limit]
+
+        pools = await asyncio.gather(
+            *[self._pool(genre) for genre in interests], return_exceptions=True
+        )
+        loaded = [
+            genre
+            for genre, pool in zip(interests, pools)
+            if not isinstance(pool, Exception)
+        ]
+        songs = self.catalog().rank(
+            loaded, Subscription.get_allowed(subscription), self.max_limit
+        )
+        # a genre that failed to load, or was evicted by a concurrent load, is
+        # retried on the next request
+        if len(loaded) == len(pools) and all(g in self.pools for g in loaded):
+            self._remember(listener_id, ListenerRecommendations(key, generation, songs))
+        return songs[:limit]
+
+    def invalidate(self, listener_id: str):
+        self._listeners.pop(listener_id, None)
+
+    def catalog(self) -> Catalog:
+        if self._catalog is None:
+            self._catalog = Catalog(self.pools)
+        return self._catalog
+
+    async def refresh(self):
+        for genre in [g for g in self.pools if g not in self._requested]:
+            del self.pools[genre]
+        self._requested = set()
+        genres = list(self.pools)
+        results = await asyncio.gather(
+            *[self.client.get_songs_by_genre(genre) for genre in genres],
+            return_exceptions=True,
+        )
+        for genre, songs in zip(genres, results):
+            if isinstance(songs, Exception):
+                logging.warning(f"[RECOMMENDATIONS] refresh of {genre} failed: {songs}")
+                continue
+            self.pools[genre] = songs[: self.pool_size]
+        self._catalog = None
+        self.generation += 1
+
+    def _remember(self, listener_id: str, recommendations: ListenerRecommendations):
+        self._listeners[listener_id] = recommendations
+        self._listeners.move_to_end(listener_id)
+        while len(self._listeners) > self.max_listeners:
+            self._listeners.popitem(last=False)
+
+    async def _pool(self, genre: str) -> List[SongResponseDto]:
+        self._requested.add(genre)
+        if genre in self.pools:
+            self.pools.move_to_end(genre)
+            return self.pools[genre]
+        future = self._loading.get(genre)
+        if future is None:
+            future = asyncio.ensure_future(self._load(genre))
+            self._loading[genre] = future
+            future.add_done_callback(lambda _: self._loading.pop(genre, None))
+        return await asyncio.shield(future)
+
+    async def _load(self, genre: str) -> List[SongResponseDto]:
+        try:
+            songs = await self.client.get_songs_by_genre(genre)
+        except Exception as e:
+            logging.warning(f"[RECOMMENDATIONS] load of {genre} failed: {e}")
+            raise
+        pool = self.pools[genre] = songs[: self.pool_size]
+        while len(self.pools) > self.max_genres:
+            self.pools.popitem(last=False)
+        self._catalog = None
+        return pool
+
+    async def _refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error(f"[RECOMMENDATIONS] refresh failed: {e}")
@@ -0,0 +1,109 @@
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from app.conf.config import Settings
+from app.rest.cache import CatalogCache, ProfileCache, UserCache
+from app.rest.cache_backends import CacheBackends
+from app.rest.circuit_breaker import CircuitBreaker, LatencyTracker, UpstreamTransport
+from app.rest.hedging import Hedger
+from app.rest.multimedia_client import BatchSupport, MultimediaClient
+from app.rest.recommendations import RecommendationEngine
+
+
+class RestManager:
+    users: httpx.AsyncClient = None
+    multimedia: httpx.AsyncClient = None
+    cache_backends: CacheBackends = None
+    catalog_cache: CatalogCache = None
+    user_cache: UserCache = None
+    profile_cache: ProfileCache = None
+    recommendations: RecommendationEngine = None
+    upstreams: Dict[str, UpstreamTransport] = {}
+    multimedia_hedger: Optional[Hedger] = None
+    multimedia_batching: BatchSupport = None
+
+    async def connect_clients(self, settings: Settings):
+        logging.info("Opening HTTP clients.")
+        self.upstreams = {
+            name: self._build_upstream(name, settings)
+            for name in ("users", "multimedia")
+        }
+        self.users = self._build_client(settings, self.upstreams["users"])
+        self.multimedia = self._build_client(settings, self.upstreams["multimedia"])
+        if settings.multimedia_hedging:
+            self.multimedia_hedger = Hedger(
+                self.upstreams["multimedia"].latency,
+                percentile=settings.hedge_percentile,
+                budget=settings.hedge_budget,
+            )
+        self.multimedia_batching = BatchSupport()
+        self.cache_backends = CacheBackends(settings)
+        self.catalog_cache = CatalogCache(settings, self.cache_backends)
+        self.user_cache = UserCache(settings, self.cache_backends)
+        self.profile_cache = ProfileCache(settings, self.cache_backends)
+        self.recommendations = RecommendationEngine(
+            MultimediaClient(
+                settings.multimedia_api,
+                self.multimedia,
+                max_concurrency=settings.multimedia_max_concurrency,
+                cache=self.catalog_cache,
+                hedger=self.multimedia_hedger,
+                batching=self.multimedia_batching,
+                batch_size=settings.multimedia_batch_size,
+            ),
+            pool_size=settings.recommendation_pool_size,
+            refresh_interval=settings.recommendation_refresh_interval,
+            max_limit=settings.recommendation_max_limit,
+            max_listeners=settings.recommendation_max_listeners,
+            max_genres=settings.recommendation_max_genres,
+        )
+        self.recommendations.start()
+        logging.info("Opened HTTP clients.")
+
+    async def close_clients(self):
+        logging.info("Closing HTTP clients.")
+        await self.recommendations.stop()
+        await self.users.aclose()
+        await self.multimedia.aclose()
+        await self.cache_backends.close()
+        logging.info("Closed HTTP clients.")
+
+    def upstream_stats(self):
+        stats = {name: upstream.stats() for name, upstream in self.upstreams.items()}
+        if self.multimedia_hedger:
+            stats["multimedia"]["hedging"] = self.multimedia_hedger.stats()
+        return list(stats.values())
+
+    @staticmethod
+    def _build_upstream(name: str, settings: Settings) -> UpstreamTransport:
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        return UpstreamTransport(
+            httpx.AsyncHTTPTransport(limits=limits, http2=settings.http2),
+            CircuitBreaker(
+                name,
+                failure_threshold=settings.upstream_failure_threshold,
+                min_requests=settings.upstream_min_requests,
+                window=settings.upstream_window,
+                reset_timeout=settings.upstream_reset_timeout,
+            ),
+            LatencyTracker(),
+            max_timeout=settings.http_timeout,
+            min_timeout=settings.upstream_min_timeout,
+            percentile=settings.upstream_timeout_percentile,
+            factor=settings.upstream_timeout_factor,
+        )
+
+    @staticmethod
+    def _build_client(
+        settings: Settings, transport: UpstreamTransport
+    ) -> httpx.AsyncClient:
+        timeout = httpx.Timeout(
+            settings.http_timeout, connect=settings.http_connect_timeout
+        )
+        return httpx.AsyncClient(transport=transport, timeout=timeout)
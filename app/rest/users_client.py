@@ -1,42 +1,124 @@
-from typing import List
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple, Union
 
 import httpx
 from pydantic.tools import parse_obj_as
 
 from app.rest.dtos.request.user import UserRequestDto, UpdateUserRequestDto
 from app.rest.dtos.user import UserResponseDto
+from app.rest.cache import UserCache
+
+ALL_USERS = ""
 
 
 class UserClient:
-    def __init__(self, api_url: str):
+    def __init__(
+        self,
+        api_url: str,
+        client: httpx.AsyncClient,
+        cache: Optional[UserCache] = None,
+        batch_size: int = 50,
+    ):
         self.api_url = api_url
+        self.client = client
+        self.cache = cache
+        self.batch_size = batch_size
 
-    def create_user(self, request: UserRequestDto) -> UserResponseDto:
-        print(request.dict())
-        r = httpx.post(f'{self.api_url}/users', json=request.dict())
+    async def create_user(self, request: UserRequestDto) -> UserResponseDto:
+        r = await self.client.post(f'{self.api_url}/users', json=request.dict())
         if r.status_code != httpx.codes.CREATED:
             r.raise_for_status()
 
         return UserResponseDto(**r.json())
 
-    def get(self, user_id: str) -> UserResponseDto:
-        r = httpx.get(f'{self.api_url}/users/{user_id}')
+    async def create_users(
+        self, requests: List[UserRequestDto], max_concurrency: int
+    ) -> List[Union[UserResponseDto, Exception]]:
+        """Creates users with at most max_concurrency requests in flight."""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def create(request: UserRequestDto) -> UserResponseDto:
+            async with semaphore:
+                return await self.create_user(request)
+
+        return await asyncio.gather(
+            *[create(request) for request in requests], return_exceptions=True
+        )
+
+    async def get(self, user_id: str) -> UserResponseDto:
+        if self.cache:
+            return await self.cache.users.get_or_load(
+                user_id, lambda: self._fetch(user_id)
+            )
+        return await self._fetch(user_id)
+
+    async def _fetch(self, user_id: str) -> UserResponseDto:
+        r = await self.client.get(f'{self.api_url}/users/{user_id}')
         if r.status_code != httpx.codes.OK:
             r.raise_for_status()
 
         return UserResponseDto(**r.json())
 
-    def all(self, user_ids: str = None) -> List[UserResponseDto]:
+    async def all(self, user_ids: str = None) -> List[UserResponseDto]:
+        # only the unfiltered list is cached: an entry per id list could not be
+        # found again when one of its users is updated
+        if self.cache and not user_ids:
+            return await self.cache.user_lists.get_or_load(
+                ALL_USERS, lambda: self._fetch_all()
+            )
+        return await self._fetch_all(user_ids)
+
+    async def _fetch_all(self, user_ids: str = None) -> List[UserResponseDto]:
         qp = f"?user_ids={user_ids}" if user_ids else ""
-        r = httpx.get(f'{self.api_url}/users{qp}')
+        r = await self.client.get(f'{self.api_url}/users{qp}')
         if r.status_code != httpx.codes.OK:
             r.raise_for_status()
 
         return parse_obj_as(List[UserResponseDto], r.json())
 
-    def update(self, user_id: str, request: UpdateUserRequestDto) -> UserResponseDto:
-        r = httpx.put(f'{self.api_url}/users/{user_id}', json=request.dict())
+    async def get_many(
+        self, user_ids: List[str]
+    ) -> Tuple[Dict[str, UserResponseDto], List[str]]:
+        """
+        Resolves user_ids into a map by id plus the ids that could not be found.
+        Cached users are served locally; the rest are fetched in concurrent
+        chunks of at most batch_size ids, and a failing chunk only loses its ids.
+        """
+        ids = list(dict.fromkeys(user_ids))
+        users = await self.cache.users.get_fresh_many(ids) if self.cache else {}
+
+        misses = [user_id for user_id in ids if user_id not in users]
+        chunks = []
+        for start in range(0, len(misses), self.batch_size):
+            end = start + self.batch_size
+            chunks.append(misses[start:end])
+        for fetched in await asyncio.gather(*[self._fetch_chunk(c) for c in chunks]):
+            for user in fetched:
+                users[user.id] = user
+                if self.cache:
+                    await self.cache.users.set(user.id, user)
+
+        missing = [user_id for user_id in ids if user_id not in users]
+        return users, missing
+
+    async def _fetch_chunk(self, user_ids: List[str]) -> List[UserResponseDto]:
+        try:
+            return await self._fetch_all(','.join(user_ids))
+        except Exception as e:
+            logging.error(f"Error getting users {user_ids}. Exception {e}")
+            return []
+
+    async def update(
+        self, user_id: str, request: UpdateUserRequestDto
+    ) -> UserResponseDto:
+        r = await self.client.put(
+            f'{self.api_url}/users/{user_id}', json=request.dict()
+        )
         if r.status_code != httpx.codes.ACCEPTED:
             r.raise_for_status()
 
+        if self.cache:
+            await self.cache.users.invalidate(user_id)
+            await self.cache.user_lists.invalidate(ALL_USERS)
         return UserResponseDto(**r.json())
@@ -0,0 +1,125 @@
+"""
+Compares the ways a CompleteListenerResponseDto can be serialized by the API:
+returning the model through response_model with JSONResponse or
+ORJSONResponse, against returning a DtoResponse. The listener has 20 playlists
+of 50 songs each; requests go through the ASGI app in process.
+
+    PYTHONPATH=. python benchmarks/response_serialization.py [--requests 500]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.adapters.dtos.listeners import CompleteListenerResponseDto
+from app.adapters.responses import DtoResponse
+from app.rest.dtos.artist import ArtistModel
+from app.rest.dtos.playlist import PlaylistSongResponseDto
+from app.rest.dtos.song import SongResponseDto
+
+
+def listener(playlists: int, songs: int) -> CompleteListenerResponseDto:
+    return CompleteListenerResponseDto(
+        id="listener",
+        user_id="user",
+        firebase_id="firebase",
+        email="user@mail.com",
+        first_name="Juan",
+        last_name="Perez",
+        location="Argentina",
+        status="ACTIVE",
+        role="LISTENER",
+        playlists=[
+            PlaylistSongResponseDto(
+                id=f"playlist{p}",
+                title=f"Playlist {p}",
+                description="description",
+                is_collaborative=False,
+                owner_id="user",
+                songs=[
+                    SongResponseDto(
+                        id=f"song{p}-{s}",
+                        title=f"Song {s}",
+                        artists=[ArtistModel(artist_id="artist", artist_name="Name")],
+                        description="description",
+                        song_file="https://files/song.mp3",
+                        genre="rock",
+                        subscription="free",
+                    )
+                    for s in range(songs)
+                ],
+            )
+            for p in range(playlists)
+        ],
+    )
+
+
+def build_app(dto: CompleteListenerResponseDto) -> FastAPI:
+    app = FastAPI()
+
+    @app.get(
+        "/json",
+        response_model=CompleteListenerResponseDto,
+        response_class=JSONResponse,
+    )
+    async def json_response():
+        return dto
+
+    @app.get(
+        "/orjson",
+        response_model=CompleteListenerResponseDto,
+        response_class=ORJSONResponse,
+    )
+    async def orjson_response():
+        return dto
+
+    @app.get("/dto", response_model=CompleteListenerResponseDto)
+    async def dto_response():
+        return DtoResponse(dto)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int) -> List[float]:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: List[float]):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    throughput = len(latencies) / (sum(latencies) / 1000)
+    print(
+        f"{name:<28} {throughput:7.1f} req/s  "
+        f"mean {statistics.mean(latencies):7.3f} ms  p95 {p95:7.3f} ms"
+    )
+
+
+async def main(requests: int, playlists: int, songs: int):
+    app = build_app(listener(playlists, songs))
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        for path in ("/json", "/orjson", "/dto"):
+            # warm up
+            await measure(client, path, min(requests, 20))
+        report("response_model + JSON", await measure(client, "/json", requests))
+        report("response_model + ORJSON", await measure(client, "/orjson", requests))
+        report("DtoResponse", await measure(client, "/dto", requests))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--playlists", type=int, default=20)
+    parser.add_argument("--songs", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.playlists, args.songs))
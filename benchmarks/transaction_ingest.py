@@ -0,0 +1,73 @@
+"""
+Measures bulk transaction ingestion through TransactionManager.add_many
+against a local mongod, first with fresh idempotency keys and then replaying
+the same batches. Uses a throwaway database that is dropped at the end.
+
+    PYTHONPATH=. python benchmarks/transaction_ingest.py [--url mongodb://...]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.db.impl.transaction_manager import TransactionManager
+from app.db.indexes import INDEXES, apply_indexes
+from app.db.model.transaction import TransactionModel
+
+TARGET = 10_000
+
+
+async def ingest(manager: TransactionManager, batches) -> float:
+    start = time.perf_counter()
+    for batch in batches:
+        await manager.add_many(batch)
+    return time.perf_counter() - start
+
+
+def report(name: str, count: int, elapsed: float):
+    rate = count / elapsed
+    verdict = "ok" if rate >= TARGET else f"below {TARGET} tx/s"
+    print(f"{name:<10} {count} tx in {elapsed:6.2f} s  {rate:9.0f} tx/s  {verdict}")
+
+
+async def main(url: str, count: int, batch_size: int):
+    client = AsyncIOMotorClient(url)
+    db = client.profiles_benchmark
+    await db["transactions"].drop()
+    await apply_indexes(
+        db, [spec for spec in INDEXES if spec.collection == "transactions"]
+    )
+    manager = TransactionManager(db)
+
+    transactions = [
+        TransactionModel(
+            sender=f"wallet{i % 500}",
+            receiver=f"wallet{(i + 1) % 500}",
+            amount=1.5,
+            date="20/07/2022",
+            idempotency_key=str(uuid.uuid4()),
+        )
+        for i in range(count)
+    ]
+    batches = []
+    for start in range(0, count, batch_size):
+        end = start + batch_size
+        batches.append(transactions[start:end])
+
+    try:
+        report("fresh", count, await ingest(manager, batches))
+        report("replayed", count, await ingest(manager, batches))
+    finally:
+        await client.drop_database(db)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="mongodb://localhost:27017")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.count, args.batch_size))
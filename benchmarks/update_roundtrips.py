@@ -0,0 +1,77 @@
+"""
+Compares update_one + find_one against a single find_one_and_update against a
+local mongod. Uses a throwaway database that is dropped at the end.
+
+    python benchmarks/update_roundtrips.py [--url mongodb://localhost:27017]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+
+
+async def measure(
+    operation: Callable[[int], Awaitable], iterations: int
+) -> List[float]:
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await operation(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: List[float]):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:<28} mean {statistics.mean(latencies):7.3f} ms  "
+        f"p50 {statistics.median(latencies):7.3f} ms  p95 {p95:7.3f} ms"
+    )
+
+
+async def main(url: str, iterations: int, profiles: int):
+    client = AsyncIOMotorClient(url)
+    db = client.profiles_benchmark
+    collection = db["listeners"]
+    await collection.drop()
+    await collection.insert_many(
+        [
+            {"_id": str(i), "user_id": f"user{i}", "playlists": []}
+            for i in range(profiles)
+        ]
+    )
+
+    async def update_then_find(i: int):
+        id = str(i % profiles)
+        await collection.update_one({"_id": id}, {"$addToSet": {"playlists": str(i)}})
+        return await collection.find_one({"_id": id})
+
+    async def find_one_and_update(i: int):
+        return await collection.find_one_and_update(
+            {"_id": str(i % profiles)},
+            {"$addToSet": {"playlists": str(i)}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    try:
+        # warm up the pool and the working set
+        await measure(find_one_and_update, min(iterations, 100))
+        report("update_one + find_one", await measure(update_then_find, iterations))
+        report("find_one_and_update", await measure(find_one_and_update, iterations))
+    finally:
+        await client.drop_database(db)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="mongodb://localhost:27017")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--profiles", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.iterations, args.profiles))
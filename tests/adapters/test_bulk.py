@@ -0,0 +1,181 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pymongo.errors import BulkWriteError
+
+from app.adapters import listeners_controller, transactions_controller
+from app.conf.config import Settings, get_settings
+from app.db import get_database
+from app.rest import get_multimedia_loader, get_restclient_user
+from app.rest.dtos.user import UserResponseDto
+from tests.db.imp.test_transaction_manager import AsyncCursor, fake_db
+
+
+def user(user_id: str) -> UserResponseDto:
+    return UserResponseDto(
+        firebase_id="asd",
+        id=user_id,
+        email="mail@mail.com",
+        first_name="name",
+        last_name="lastname",
+        role="LISTENER",
+        location="Buenos Aires",
+        status="ACTIVE",
+    )
+
+
+def listener_request(index: int) -> dict:
+    return {
+        "firebase_id": f"firebase{index}",
+        "email": f"user{index}@mail.com",
+        "first_name": "Juan",
+        "last_name": "Perez",
+        "location": "Argentina",
+        "playlists": ["playlist"],
+    }
+
+
+class TestBulkListeners(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.rest_user = MagicMock()
+        self.loader = MagicMock()
+        settings = Settings(
+            title="test",
+            version="1",
+            db_path="",
+            users_api="",
+            multimedia_api="",
+            bulk_max_items=3,
+        )
+
+        app = FastAPI()
+        app.include_router(listeners_controller.router)
+        app.dependency_overrides[get_database] = lambda: self.db
+        app.dependency_overrides[get_restclient_user] = lambda: self.rest_user
+        app.dependency_overrides[get_multimedia_loader] = lambda: self.loader
+        app.dependency_overrides[get_settings] = lambda: settings
+        self.client = TestClient(app)
+
+    def test_reports_status_per_item(self):
+        self.rest_user.create_users = AsyncMock(
+            return_value=[user("a"), RuntimeError("users down"), user("c")]
+        )
+        # the second profile reaching Mongo is the third request
+        self.db.db["listeners"].insert_many = AsyncMock(
+            side_effect=BulkWriteError(
+                {"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate"}]}
+            )
+        )
+
+        response = self.client.post(
+            "/listeners:bulk", json=[listener_request(i) for i in range(3)]
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["created"], body["failed"]) == (1, 2)
+        first, second, third = body["items"]
+        assert first["status"] == "created" and first["user_id"] == "a"
+        assert first["id"] is not None and first["profile"] is None
+        assert second["status"] == "failed" and "users down" in second["error"]
+        assert third["status"] == "failed" and "duplicate" in third["error"]
+        inserted = self.db.db["listeners"].insert_many.call_args
+        assert len(inserted.args[0]) == 2
+        assert inserted.kwargs == {"ordered": False}
+        self.loader.get_playlists.assert_not_called()
+
+    def test_database_failure_reports_created_users(self):
+        self.rest_user.create_users = AsyncMock(return_value=[user("a"), user("b")])
+        self.db.db["listeners"].insert_many = AsyncMock(
+            side_effect=RuntimeError("connection reset")
+        )
+
+        response = self.client.post(
+            "/listeners:bulk", json=[listener_request(i) for i in range(2)]
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["created"], body["failed"]) == (0, 2)
+        assert [item["user_id"] for item in body["items"]] == ["a", "b"]
+        assert all("connection reset" in item["error"] for item in body["items"])
+
+    def test_enriches_created_profiles_on_request(self):
+        self.rest_user.create_users = AsyncMock(return_value=[user("a")])
+        self.db.db["listeners"].insert_many = AsyncMock()
+        self.loader.get_playlists = AsyncMock(return_value=[])
+
+        response = self.client.post(
+            "/listeners:bulk?enrich=true", json=[listener_request(0)]
+        )
+
+        profile = response.json()["items"][0]["profile"]
+        assert profile["user_id"] == "a"
+        self.loader.get_playlists.assert_awaited_once_with(["playlist"])
+
+    def test_rejects_too_many_profiles(self):
+        response = self.client.post(
+            "/listeners:bulk", json=[listener_request(i) for i in range(4)]
+        )
+
+        assert response.status_code == 413
+
+
+class TestBulkTransactions(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        settings = Settings(
+            title="test", version="1", db_path="", users_api="", multimedia_api=""
+        )
+
+        app = FastAPI()
+        app.include_router(transactions_controller.router)
+        app.dependency_overrides[get_database] = lambda: self.db
+        app.dependency_overrides[get_settings] = lambda: settings
+        self.client = TestClient(app)
+
+    def test_accepts_ndjson_and_reports_each_record(self):
+        self.db.db = fake_db("transactions", "wallet_stats")
+        self.db.db["wallet_stats"].bulk_write = AsyncMock()
+        self.db.db["transactions"].bulk_write = AsyncMock(
+            side_effect=BulkWriteError(
+                {"writeErrors": [{"index": 1, "code": 11000, "errmsg": "dup"}]}
+            )
+        )
+        self.db.db["transactions"].find = MagicMock(
+            return_value=AsyncCursor([{"_id": "stored", "idempotency_key": "k1"}])
+        )
+        record = {"sender": "a", "receiver": "b", "amount": 1, "date": "01/01/2022"}
+        lines = [
+            dict(record, idempotency_key="k0"),
+            dict(record, amount="not a number"),
+            dict(record, idempotency_key="k1"),
+        ]
+
+        response = self.client.post(
+            "/transactions:bulk",
+            data=b"\n".join(orjson.dumps(line) for line in lines),
+            headers={"content-type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["created"], body["duplicates"], body["failed"]) == (1, 1, 1)
+        created, invalid, replayed = body["items"]
+        assert created["status"] == "created" and created["id"] is not None
+        assert invalid["status"] == "failed" and "amount" in invalid["error"]
+        assert replayed == {
+            "index": 2,
+            "status": "duplicate",
+            "id": "stored",
+            "error": None,
+        }
+
+    def test_rejects_a_body_that_is_not_an_array(self):
+        response = self.client.post("/transactions:bulk", json={"sender": "a"})
+
+        assert response.status_code == 400
@@ -0,0 +1,213 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.adapters import artists_controller, listeners_controller
+from app.adapters.conditional import (
+    ProfileViews,
+    etag_matches,
+    get_artist_views,
+    get_listener_views,
+    if_match_versions,
+    profile_version,
+)
+from app.db import get_database
+from app.rest import (
+    get_multimedia_loader,
+    get_recommendation_engine,
+    get_restclient_user,
+)
+from app.rest.cache import REPRESENTATION_CODEC, Representation, TTLCache
+from app.rest.cache_backends import MemoryCacheBackend
+from tests.adapters.test_bulk import user
+from tests.adapters.test_expand import LISTENER, playlist_info
+
+UPDATE = {
+    "firebase_id": "firebase",
+    "email": "user@mail.com",
+    "first_name": "Other",
+    "last_name": "Perez",
+}
+
+
+class TestEtags(unittest.TestCase):
+    def test_version_is_the_document_version(self):
+        assert profile_version({**LISTENER, "version": 3}) == "3"
+        assert profile_version(LISTENER) == "0"
+
+    def test_if_match_allows_the_versions_of_strong_tags(self):
+        assert if_match_versions('"3-abc", W/"4-def", "5"') == [3, 5]
+        assert if_match_versions("*") is None
+        assert if_match_versions(None) is None
+
+    def test_if_match_without_versions_fails_the_precondition(self):
+        with self.assertRaises(HTTPException) as raised:
+            if_match_versions('W/"3-abc"')
+
+        assert raised.exception.status_code == 412
+
+    def test_if_none_match_uses_weak_comparison(self):
+        assert etag_matches('"a", W/"b"', '"b"')
+        assert etag_matches("*", '"b"')
+        assert not etag_matches('"a"', '"b"')
+        assert not etag_matches(None, '"b"')
+
+    def test_representation_codec_round_trips(self):
+        representation = Representation("v", "playlists", '"v-1"', b'{"id":"l1"}')
+
+        data = REPRESENTATION_CODEC.dump(representation)
+
+        assert REPRESENTATION_CODEC.load(data) == representation
+
+
+class TestConditionalGet(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.db.db["listeners"].find_one = AsyncMock(return_value=dict(LISTENER))
+        self.rest_user = MagicMock()
+        self.rest_user.get = AsyncMock(return_value=user("u1"))
+        self.rest_user.update = AsyncMock(return_value=user("u1"))
+        self.loader = MagicMock()
+        self.loader.get_playlist_infos = AsyncMock(
+            side_effect=lambda ids: [playlist_info(i) for i in ids]
+        )
+        self.loader.misses = set()
+        self.views = ProfileViews(TTLCache("views", MemoryCacheBackend(10), 30))
+
+        app = FastAPI()
+        app.include_router(listeners_controller.router)
+        app.include_router(artists_controller.router)
+        app.dependency_overrides[get_database] = lambda: self.db
+        app.dependency_overrides[get_restclient_user] = lambda: self.rest_user
+        app.dependency_overrides[get_multimedia_loader] = lambda: self.loader
+        app.dependency_overrides[get_recommendation_engine] = lambda: MagicMock()
+        app.dependency_overrides[get_listener_views] = lambda: self.views
+        app.dependency_overrides[get_artist_views] = lambda: self.views
+        self.client = TestClient(app)
+
+    def test_unchanged_profile_is_not_modified_without_enrichment(self):
+        first = self.client.get("/listeners/l1?expand=playlists")
+        etag = first.headers["ETag"]
+
+        second = self.client.get(
+            "/listeners/l1?expand=playlists", headers={"If-None-Match": etag}
+        )
+
+        assert second.status_code == 304
+        assert second.headers["ETag"] == etag
+        assert second.content == b""
+        self.rest_user.get.assert_awaited_once()
+        self.loader.get_playlist_infos.assert_awaited_once()
+
+    def test_partial_expansion_is_not_cached(self):
+        async def partial(ids):
+            self.loader.misses.add(f"playlist {ids[0]}")
+            return [playlist_info(i) for i in ids[1:]]
+
+        self.db.db["listeners"].find_one = AsyncMock(
+            return_value={**LISTENER, "playlists": ["p1", "p2"]}
+        )
+        self.loader.get_playlist_infos = AsyncMock(side_effect=partial)
+
+        first = self.client.get("/listeners/l1?expand=playlists")
+        second = self.client.get(
+            "/listeners/l1?expand=playlists",
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+
+        assert [p["id"] for p in first.json()["playlists"]] == ["p2"]
+        assert second.status_code == 304
+        assert self.loader.get_playlist_infos.await_count == 2
+
+    def test_cached_representation_is_served_on_etag_mismatch(self):
+        first = self.client.get("/listeners/l1")
+
+        second = self.client.get("/listeners/l1", headers={"If-None-Match": '"old"'})
+
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert second.headers["ETag"] == first.headers["ETag"]
+        self.rest_user.get.assert_awaited_once()
+
+    def test_changed_profile_gets_a_new_etag(self):
+        etag = self.client.get("/listeners/l1").headers["ETag"]
+        self.db.db["listeners"].find_one = AsyncMock(
+            return_value={**LISTENER, "playlists": ["p1"], "version": 1}
+        )
+
+        response = self.client.get("/listeners/l1", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert response.json()["playlists"] == ["p1"]
+
+    def test_expand_variants_have_distinct_etags(self):
+        ids = self.client.get("/listeners/l1")
+        expanded = self.client.get(
+            "/listeners/l1?expand=playlists",
+            headers={"If-None-Match": ids.headers["ETag"]},
+        )
+
+        assert expanded.status_code == 200
+        assert expanded.headers["ETag"] != ids.headers["ETag"]
+
+    def test_update_invalidates_cached_representation(self):
+        self.client.get("/listeners/l1")
+        self.db.db["listeners"].find_one_and_update = AsyncMock(
+            return_value=dict(LISTENER)
+        )
+        self.loader.get_playlists = AsyncMock(return_value=[])
+
+        assert self.client.put("/listeners/l1", json=UPDATE).status_code == 200
+        self.client.get("/listeners/l1")
+
+        assert self.rest_user.get.await_count == 2
+
+    def test_update_with_stale_if_match_is_rejected(self):
+        self.db.db["listeners"].find_one_and_update = AsyncMock(return_value=None)
+        self.db.db["listeners"].find_one = AsyncMock(
+            return_value={**LISTENER, "version": 2}
+        )
+        etag = '"1-abc"'
+
+        response = self.client.put(
+            "/listeners/l1", json=UPDATE, headers={"If-Match": etag}
+        )
+
+        assert response.status_code == 412
+        query = self.db.db["listeners"].find_one_and_update.call_args.args[0]
+        assert query == {"_id": "l1", "version": {"$in": [1]}}
+        self.rest_user.update.assert_not_called()
+
+    def test_update_returns_the_new_etag(self):
+        self.db.db["listeners"].find_one_and_update = AsyncMock(
+            return_value={**LISTENER, "version": 2}
+        )
+        self.loader.get_playlists = AsyncMock(return_value=[])
+
+        response = self.client.put(
+            "/listeners/l1", json=UPDATE, headers={"If-Match": '"1-abc"'}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["version"] == 2
+        assert response.headers["ETag"].startswith('"2-')
+
+    def test_artist_profile_gets_an_etag(self):
+        self.db.db["artists"].find_one = AsyncMock(
+            return_value={
+                "_id": "62a0c3f1e4b0a1b2c3d4e5f3",
+                "user_id": "u1",
+                "cover_picture": "image.png",
+                "albums": ["album"],
+                "songs": ["song"],
+            }
+        )
+
+        etag = self.client.get("/artists/a1").headers["ETag"]
+        response = self.client.get("/artists/a1", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        self.rest_user.get.assert_awaited_once()
@@ -0,0 +1,130 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.adapters import artists_controller, listeners_controller
+from app.db import get_database
+from app.rest import get_multimedia_loader, get_restclient_user
+from app.rest.dtos.playlist import PlaylistResponseDto, PlaylistSongResponseDto
+from tests.adapters.test_bulk import user
+from tests.rest.test_multimedia_client import (
+    get_album_response_mock,
+    get_song_response_mock,
+)
+
+
+def playlist_info(playlist_id: str) -> PlaylistResponseDto:
+    return PlaylistResponseDto(
+        id=playlist_id,
+        title="title",
+        description="description",
+        songs=["song"],
+        is_collaborative=False,
+        owner_id="owner",
+    )
+
+
+def playlist(playlist_id: str) -> PlaylistSongResponseDto:
+    return PlaylistSongResponseDto(
+        **playlist_info(playlist_id).dict(exclude={"songs"}),
+        songs=[get_song_response_mock()],
+    )
+
+
+LISTENER = {
+    "_id": "62a0c3f1e4b0a1b2c3d4e5f1",
+    "user_id": "u1",
+    "interests": [],
+    "playlists": ["p1", "p2"],
+    "subscription": "free",
+    "wallet_addr": "",
+}
+
+
+class TestExpand(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.rest_user = MagicMock()
+        self.rest_user.get = AsyncMock(return_value=user("u1"))
+        self.loader = MagicMock()
+        self.loader.get_playlists = AsyncMock(
+            side_effect=lambda ids: [playlist(i) for i in ids]
+        )
+        self.loader.get_playlist_infos = AsyncMock(
+            side_effect=lambda ids: [playlist_info(i) for i in ids]
+        )
+
+        app = FastAPI()
+        app.include_router(listeners_controller.router)
+        app.include_router(artists_controller.router)
+        app.dependency_overrides[get_database] = lambda: self.db
+        app.dependency_overrides[get_restclient_user] = lambda: self.rest_user
+        app.dependency_overrides[get_multimedia_loader] = lambda: self.loader
+        self.client = TestClient(app)
+
+    def test_listener_defaults_to_ids(self):
+        self.db.db["listeners"].find_one = AsyncMock(return_value=LISTENER)
+
+        response = self.client.get("/listeners/l1")
+
+        assert response.status_code == 200
+        assert response.json()["playlists"] == ["p1", "p2"]
+        self.loader.get_playlists.assert_not_called()
+        self.loader.get_playlist_infos.assert_not_called()
+
+    def test_listener_playlists_without_songs(self):
+        self.db.db["listeners"].find_one = AsyncMock(return_value=LISTENER)
+
+        response = self.client.get("/listeners/l1?expand=playlists")
+
+        playlists = response.json()["playlists"]
+        assert [p["songs"] for p in playlists] == [["song"], ["song"]]
+        self.loader.get_playlists.assert_not_called()
+
+    def test_nested_expansion_resolves_songs(self):
+        self.db.db["listeners"].find_one = AsyncMock(return_value=LISTENER)
+
+        response = self.client.get("/listeners/l1?expand=playlists.songs")
+
+        playlists = response.json()["playlists"]
+        assert playlists[0]["songs"][0]["title"] == "title"
+        self.loader.get_playlists.assert_awaited_once_with(["p1", "p2"])
+
+    def test_unknown_expansion_is_rejected(self):
+        response = self.client.get("/listeners/l1?expand=albums")
+
+        assert response.status_code == 422
+
+    def test_listing_loads_every_listeners_playlists_in_one_call(self):
+        other = {**LISTENER, "_id": "62a0c3f1e4b0a1b2c3d4e5f2", "playlists": ["p3"]}
+        cursor = self.db.db["listeners"].find.return_value.sort.return_value
+        cursor.limit.return_value.to_list = AsyncMock(return_value=[LISTENER, other])
+        self.rest_user.get_many = AsyncMock(return_value=({"u1": user("u1")}, []))
+
+        response = self.client.get("/listeners?expand=playlists&limit=2")
+
+        assert [len(p["playlists"]) for p in response.json()] == [2, 1]
+        assert response.headers["X-Next-Cursor"] == other["_id"]
+        first = self.loader.get_playlist_infos.await_args_list[0]
+        assert first.args == (["p1", "p2", "p3"],)
+
+    def test_artist_expands_only_requested_collections(self):
+        self.db.db["artists"].find_one = AsyncMock(
+            return_value={
+                "_id": "62a0c3f1e4b0a1b2c3d4e5f3",
+                "user_id": "u1",
+                "cover_picture": "image.png",
+                "albums": ["album"],
+                "songs": ["song"],
+            }
+        )
+        self.loader.get_albums = AsyncMock(return_value=[get_album_response_mock()])
+        self.loader.get_songs = AsyncMock()
+
+        body = self.client.get("/artists/a1?expand=albums").json()
+
+        assert body["albums"][0]["title"] == "title"
+        assert body["songs"] == ["song"]
+        self.loader.get_songs.assert_not_called()
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+import orjson
+
+from app.adapters.export import ndjson_lines, users_enricher
+from app.rest.dtos.user import UserResponseDto
+
+
+async def documents(count: int):
+    for i in range(count):
+        yield {"_id": str(i), "user_id": f"user{i}"}
+
+
+async def collect(lines):
+    return [block async for block in lines]
+
+
+class TestExport(unittest.IsolatedAsyncioTestCase):
+    async def test_ndjson_lines_are_chunked(self):
+        blocks = await collect(ndjson_lines(documents(5), chunk_size=2))
+
+        assert len(blocks) == 3
+        lines = b"".join(blocks).splitlines()
+        assert [orjson.loads(line)["_id"] for line in lines] == list("01234")
+
+    async def test_ndjson_lines_without_documents(self):
+        assert await collect(ndjson_lines(documents(0), chunk_size=2)) == []
+
+    async def test_users_enricher_resolves_each_chunk(self):
+        user = UserResponseDto(
+            firebase_id="asd",
+            id="user0",
+            email="mail@mail.com",
+            first_name="name",
+            last_name="lastname",
+            role="LISTENER",
+            location="Buenos Aires",
+            status="ACTIVE",
+        )
+        rest_user = MagicMock()
+        rest_user.get_many = AsyncMock(return_value=({"user0": user}, ["user1"]))
+
+        blocks = await collect(
+            ndjson_lines(documents(2), chunk_size=2, enrich=users_enricher(rest_user))
+        )
+
+        rest_user.get_many.assert_awaited_once_with(["user0", "user1"])
+        first, second = [orjson.loads(line) for line in blocks[0].splitlines()]
+        assert first["user"]["id"] == "user0"
+        assert second["user"] is None
@@ -0,0 +1,48 @@
+import unittest
+from datetime import datetime
+
+import orjson
+from bson import ObjectId
+from pydantic.main import BaseModel
+
+from app.adapters.responses import DtoResponse
+from app.db.model.listener import ListenerModel
+from tests.rest.test_multimedia_client import get_song_response_mock
+
+
+class Event(BaseModel):
+    id: ObjectId
+    date: datetime
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class TestDtoResponse(unittest.TestCase):
+    def test_renders_nested_models_once_with_orjson(self):
+        song = get_song_response_mock()
+
+        response = DtoResponse([song], status_code=201)
+
+        assert response.status_code == 201
+        assert response.media_type == "application/json"
+        assert orjson.loads(response.body) == [song.dict()]
+
+    def test_renders_object_ids_and_dates(self):
+        event = Event(id=ObjectId("62a0c3f1e4b0a1b2c3d4e5f1"), date=datetime(2022, 1, 1))
+
+        body = orjson.loads(DtoResponse(event).body)
+
+        assert body == {"id": "62a0c3f1e4b0a1b2c3d4e5f1", "date": "2022-01-01T00:00:00"}
+
+    def test_rejects_unknown_types(self):
+        with self.assertRaises(TypeError):
+            DtoResponse({"value": object()})
+
+    def test_keeps_aliases(self):
+        listener = ListenerModel(_id=ObjectId("62a0c3f1e4b0a1b2c3d4e5f1"), user_id="u")
+
+        body = orjson.loads(DtoResponse({"profile": listener}).body)
+
+        assert body["profile"]["_id"] == "62a0c3f1e4b0a1b2c3d4e5f1"
+        assert body["profile"]["user_id"] == "u"
@@ -0,0 +1,57 @@
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.adapters import transactions_controller
+from app.db import get_database
+
+
+class TestTransactionsLedger(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.cursor = self.db.db["transactions"].find.return_value
+        self.cursor.sort.return_value = self.cursor
+        self.cursor.limit.return_value = self.cursor
+
+        app = FastAPI()
+        app.include_router(transactions_controller.router)
+        app.dependency_overrides[get_database] = lambda: self.db
+        self.client = TestClient(app)
+
+    def test_full_page_returns_a_cursor_to_resume_from(self):
+        self.cursor.to_list = AsyncMock(
+            return_value=[{"_id": "id", "date": datetime(2022, 7, 20)}]
+        )
+
+        first = self.client.get("/transactions?limit=1&sort=date")
+        cursor = first.headers["X-Next-Cursor"]
+        self.client.get(f"/transactions?limit=1&sort=date&after={cursor}")
+
+        assert first.json() == [{"_id": "id", "date": "2022-07-20T00:00:00"}]
+        query = self.db.db["transactions"].find.call_args.args[0]
+        assert query["$or"] == [
+            {"date": {"$gt": datetime(2022, 7, 20)}},
+            {"date": datetime(2022, 7, 20), "_id": {"$gt": "id"}},
+        ]
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/transactions?after=nope")
+
+        assert response.status_code == 400
+
+    def test_update_with_stale_if_match_is_rejected(self):
+        self.db.db["transactions"].find_one_and_update = AsyncMock(return_value=None)
+        self.db.db["transactions"].find_one = AsyncMock(
+            return_value={"_id": "id", "version": 3}
+        )
+
+        response = self.client.put(
+            "/transactions/id", json={"amount": 2}, headers={"If-Match": '"2"'}
+        )
+
+        assert response.status_code == 412
+        query = self.db.db["transactions"].find_one_and_update.call_args.args[0]
+        assert query == {"_id": "id", "version": {"$in": [2]}}
@@ -1,9 +1,12 @@
 import unittest
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
+
+from pymongo import ReturnDocument
 
 from app.db.impl.artist_manager import ArtistManager
-from app.db.model.artist import ArtistModel
+from app.db.impl.versioning import VersionConflictError
+from app.db.model.artist import ArtistModel, UpdateArtistModel
 from app.db.model.py_object_id import PyObjectId
 
 
@@ -56,3 +59,75 @@ class TestArtistManager(unittest.TestCase):
         artist_manager = ArtistManager(self.db)
         result = await artist_manager.delete_profile("id")
         self.assertTrue(result)
+
+
+class TestArtistManagerUpdates(unittest.IsolatedAsyncioTestCase):
+    async def test_add_album_returns_post_image_in_one_call(self):
+        db = MagicMock()
+        updated = {"_id": "id", "user_id": "user_id", "albums": ["album"]}
+        db["artists"].find_one_and_update = AsyncMock(return_value=updated)
+        db["artists"].find_one = AsyncMock()
+
+        result = await ArtistManager(db).add_album("id", "album")
+
+        self.assertEqual(result, updated)
+        args, kwargs = db["artists"].find_one_and_update.call_args
+        self.assertEqual(
+            args,
+            (
+                {"_id": "id"},
+                {"$addToSet": {"albums": "album"}, "$inc": {"version": 1}},
+            ),
+        )
+        self.assertEqual(kwargs, {"return_document": ReturnDocument.AFTER})
+        db["artists"].find_one.assert_not_awaited()
+
+    async def test_update_profile_not_found(self):
+        db = MagicMock()
+        db["artists"].find_one_and_update = AsyncMock(return_value=None)
+
+        result = await ArtistManager(db).update_profile(
+            "missing", UpdateArtistModel(albums=["album"])
+        )
+
+        self.assertIsNone(result)
+
+    async def test_update_profile_only_applies_at_expected_version(self):
+        db = MagicMock()
+        updated = {"_id": "id", "user_id": "user_id", "albums": [], "version": 3}
+        db["artists"].find_one_and_update = AsyncMock(return_value=updated)
+
+        result = await ArtistManager(db).update_profile(
+            "id", UpdateArtistModel(albums=[]), expected_versions=[2]
+        )
+
+        self.assertEqual(result, updated)
+        query, update = db["artists"].find_one_and_update.call_args.args
+        self.assertEqual(query, {"_id": "id", "version": {"$in": [2]}})
+        self.assertEqual(update, {"$set": {"albums": []}, "$inc": {"version": 1}})
+
+    async def test_update_profile_conflicts_with_another_version(self):
+        db = MagicMock()
+        db["artists"].find_one_and_update = AsyncMock(return_value=None)
+        db["artists"].find_one = AsyncMock(return_value={"_id": "id", "version": 4})
+
+        with self.assertRaises(VersionConflictError) as raised:
+            await ArtistManager(db).update_profile(
+                "id", UpdateArtistModel(albums=[]), expected_versions=[2]
+            )
+
+        self.assertEqual(raised.exception.current, 4)
+
+    async def test_unversioned_profiles_match_version_zero(self):
+        db = MagicMock()
+        db["artists"].find_one = AsyncMock(return_value={"_id": "id"})
+
+        result = await ArtistManager(db).update_profile(
+            "id", UpdateArtistModel(), expected_versions=[0]
+        )
+
+        self.assertEqual(result, {"_id": "id"})
+        with self.assertRaises(VersionConflictError):
+            await ArtistManager(db).update_profile(
+                "id", UpdateArtistModel(), expected_versions=[1]
+            )
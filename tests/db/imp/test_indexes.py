@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.db.indexes import (
+    CONFLICT,
+    CREATED,
+    FAILED,
+    MISSING,
+    OK,
+    IndexSpec,
+    apply_indexes,
+)
+
+USER_ID = IndexSpec("listeners", [("user_id", 1)], "user_id_unique", unique=True)
+SENDER = IndexSpec("transactions", [("sender", 1), ("date", -1)], "sender_date")
+
+
+def fake_db(indexes):
+    collections = {}
+    for name, info in indexes.items():
+        collection = MagicMock()
+        if isinstance(info, Exception):
+            collection.index_information = AsyncMock(side_effect=info)
+        else:
+            collection.index_information = AsyncMock(return_value=info)
+        collection.create_index = AsyncMock()
+        collections[name] = collection
+    db = MagicMock()
+    db.__getitem__.side_effect = collections.__getitem__
+    return db, collections
+
+
+class TestIndexes(unittest.IsolatedAsyncioTestCase):
+    async def test_creates_missing_and_keeps_existing(self):
+        db, collections = fake_db(
+            {
+                "listeners": {
+                    "user_id_unique": {"key": [("user_id", 1)], "unique": True}
+                },
+                "transactions": {},
+            }
+        )
+
+        report = await apply_indexes(db, [USER_ID, SENDER])
+
+        assert [entry["status"] for entry in report] == [OK, CREATED]
+        collections["listeners"].create_index.assert_not_awaited()
+        collections["transactions"].create_index.assert_awaited_once_with(
+            [("sender", 1), ("date", -1)], name="sender_date", background=True
+        )
+
+    async def test_dry_run_reports_without_creating(self):
+        db, collections = fake_db({"listeners": {}, "transactions": {}})
+
+        report = await apply_indexes(db, [USER_ID, SENDER], dry_run=True)
+
+        assert [entry["status"] for entry in report] == [MISSING, MISSING]
+        collections["listeners"].create_index.assert_not_awaited()
+
+    async def test_reports_conflicts_and_failures(self):
+        db, collections = fake_db(
+            {
+                "listeners": {"user_id_unique": {"key": [("user_id", 1)]}},
+                "transactions": RuntimeError("unreachable"),
+            }
+        )
+
+        report = await apply_indexes(db, [USER_ID, SENDER])
+
+        assert [entry["status"] for entry in report] == [CONFLICT, FAILED]
+        collections["listeners"].create_index.assert_not_awaited()
@@ -1,9 +1,13 @@
 import unittest
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 from app.db.impl.listener_manager import ListenerManager
-from app.db.model.listener import ListenerModel
+from app.db.model.listener import (
+    ListenerPreferencesModel,
+    ListenerListModel,
+    ListenerModel,
+)
 from app.db.model.py_object_id import PyObjectId
 
 
@@ -56,3 +60,65 @@ class TestListenerManager(unittest.TestCase):
         listener_manager = ListenerManager(self.db)
         result = await listener_manager.delete_profile("id")
         self.assertTrue(result)
+
+
+class TestListenerManagerPagination(unittest.IsolatedAsyncioTestCase):
+    async def test_get_all_profiles_resumes_after_cursor(self):
+        db = MagicMock()
+        cursor = db["listeners"].find.return_value
+        cursor.sort.return_value = cursor
+        cursor.limit.return_value = cursor
+        cursor.to_list = AsyncMock(return_value=[{"_id": "b", "user_id": "user_id"}])
+
+        listener_manager = ListenerManager(db)
+        result = await listener_manager.get_all_profiles("user_id", limit=1, after="a")
+
+        db["listeners"].find.assert_called_once_with(
+            {"user_id": "user_id", "_id": {"$gt": "a"}}, None
+        )
+        cursor.sort.assert_called_once_with("_id", 1)
+        cursor.limit.assert_called_once_with(1)
+        self.assertEqual(result, [{"_id": "b", "user_id": "user_id"}])
+
+    async def test_get_all_profiles_with_view(self):
+        db = MagicMock()
+        cursor = db["listeners"].find.return_value
+        cursor.sort.return_value = cursor
+        cursor.limit.return_value = cursor
+        cursor.to_list = AsyncMock(
+            return_value=[{"_id": "b", "user_id": "user_id", "playlists": ["p"]}]
+        )
+
+        listener_manager = ListenerManager(db)
+        result = await listener_manager.get_all_profiles(
+            None, view=ListenerListModel
+        )
+
+        query, projection = db["listeners"].find.call_args.args
+        self.assertEqual(query, {})
+        self.assertEqual(
+            set(projection),
+            {
+                "user_id",
+                "interests",
+                "playlists",
+                "subscription",
+                "wallet_addr",
+                "version",
+            },
+        )
+        self.assertEqual(result[0].id, "b")
+        self.assertEqual(result[0].playlists, ["p"])
+        self.assertEqual(result[0].subscription, "free")
+
+    async def test_get_profile_view_not_found(self):
+        db = MagicMock()
+        db["listeners"].find_one = AsyncMock(return_value=None)
+
+        listener_manager = ListenerManager(db)
+        result = await listener_manager.get_profile("id", view=ListenerPreferencesModel)
+
+        db["listeners"].find_one.assert_awaited_once_with(
+            {"_id": "id"}, {"interests": True, "subscription": True}
+        )
+        self.assertIsNone(result)
@@ -0,0 +1,49 @@
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from app.db.migrations import migrate_transaction_dates
+from tests.db.imp.test_transaction_manager import AsyncCursor
+
+
+class TestMigrateTransactionDates(unittest.IsolatedAsyncioTestCase):
+    def fake_db(self, transactions):
+        db = MagicMock()
+        cursor = AsyncCursor(transactions)
+        db["transactions"].find.return_value.batch_size.return_value = cursor
+        db["transactions"].bulk_write = AsyncMock()
+        return db
+
+    async def test_converts_string_dates_in_batches(self):
+        db = self.fake_db(
+            [
+                {"_id": "a", "date": "20/07/2022"},
+                {"_id": "b", "date": "2022-07-21T10:30:00"},
+                {"_id": "c", "date": "yesterday"},
+            ]
+        )
+
+        counts = await migrate_transaction_dates(db, batch_size=1)
+
+        self.assertEqual(counts, {"migrated": 2, "invalid": 1})
+        writes = [
+            call.args[0][0] for call in db["transactions"].bulk_write.call_args_list
+        ]
+        self.assertEqual(
+            [write._filter for write in writes],
+            [
+                {"_id": "a", "date": "20/07/2022"},
+                {"_id": "b", "date": "2022-07-21T10:30:00"},
+            ],
+        )
+        self.assertEqual(
+            writes[1]._doc, {"$set": {"date": datetime(2022, 7, 21, 10, 30)}}
+        )
+
+    async def test_dry_run_does_not_write(self):
+        db = self.fake_db([{"_id": "a", "date": "20/07/2022"}])
+
+        counts = await migrate_transaction_dates(db, dry_run=True)
+
+        self.assertEqual(counts, {"migrated": 1, "invalid": 0})
+        db["transactions"].bulk_write.assert_not_awaited()
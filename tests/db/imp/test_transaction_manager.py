@@ -1,9 +1,14 @@
 import unittest
+from datetime import datetime
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
-from app.db.impl.transaction_manager import TransactionManager
-from app.db.model.transaction import TransactionModel
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import BulkWriteError
+
+from app.db.impl.transaction_manager import TransactionManager, to_document
+from app.db.model.transaction import TransactionModel, UpdateTransactionModel
 from app.db.model.py_object_id import PyObjectId
 
 
@@ -46,3 +51,173 @@ class TestTransactionManager(unittest.TestCase):
         transaction_manager = TransactionManager(self.db)
         result = await transaction_manager.get_all_profiles(user_id=None)
         self.assertTrue(len(result) == 2)
+
+
+class AsyncCursor:
+    def __init__(self, documents):
+        self.documents = iter(documents)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def fake_db(*names):
+    """A db whose collections are distinct mocks, unlike MagicMock's __getitem__."""
+    collections = {name: MagicMock() for name in names}
+    db = MagicMock()
+    db.__getitem__.side_effect = collections.__getitem__
+    return db
+
+
+def transaction(key=None):
+    return TransactionModel(
+        sender="asd", receiver="fgh", amount=1, date="01/01/2022", idempotency_key=key
+    )
+
+
+class TestTransactionManagerBulk(unittest.IsolatedAsyncioTestCase):
+    async def test_add_many_reports_replays_and_errors(self):
+        db = fake_db("transactions", "wallet_stats")
+        db["wallet_stats"].bulk_write = AsyncMock()
+        db["transactions"].bulk_write = AsyncMock(
+            side_effect=BulkWriteError(
+                {
+                    "writeErrors": [
+                        {"index": 1, "code": 11000, "errmsg": "duplicate key"},
+                        {"index": 2, "code": 121, "errmsg": "validation failed"},
+                    ]
+                }
+            )
+        )
+        db["transactions"].find = MagicMock(
+            return_value=AsyncCursor([{"_id": "stored", "idempotency_key": "k1"}])
+        )
+
+        models, duplicates, errors = await TransactionManager(db).add_many(
+            [transaction("k0"), transaction("k1"), transaction()]
+        )
+
+        self.assertEqual(len(models), 3)
+        self.assertEqual(duplicates, {1: "stored"})
+        self.assertEqual(errors, {2: "validation failed"})
+        requests, = db["transactions"].bulk_write.call_args.args
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(
+            db["transactions"].bulk_write.call_args.kwargs, {"ordered": False}
+        )
+        # only the created transaction counts towards the wallet totals
+        stats, = db["wallet_stats"].bulk_write.call_args.args
+        self.assertEqual(
+            [(update._filter, update._doc["$inc"]) for update in stats],
+            [
+                ({"_id": "asd"}, {"sent": 1.0, "sent_count": 1}),
+                ({"_id": "fgh"}, {"received": 1.0, "received_count": 1}),
+            ],
+        )
+
+    async def test_add_many_without_transactions(self):
+        db = MagicMock()
+        db["transactions"].bulk_write = AsyncMock()
+
+        self.assertEqual(await TransactionManager(db).add_many([]), ([], {}, {}))
+        db["transactions"].bulk_write.assert_not_awaited()
+
+
+class TestTransactionManagerLedger(unittest.IsolatedAsyncioTestCase):
+    def test_legacy_dates_are_stored_as_datetimes(self):
+        document = to_document(transaction())
+
+        self.assertEqual(document["date"], datetime(2022, 1, 1))
+        self.assertIsInstance(document["_id"], str)
+
+    def test_to_document_leaves_model_encoding_alone(self):
+        to_document(transaction())
+
+        later = transaction()
+        self.assertEqual(jsonable_encoder(later)["date"], "2022-01-01T00:00:00")
+        self.assertEqual(orjson.loads(later.json())["date"], "2022-01-01T00:00:00")
+
+    async def test_get_all_filters_and_resumes_after_cursor(self):
+        db = MagicMock()
+        cursor = db["transactions"].find.return_value
+        cursor.sort.return_value = cursor
+        cursor.limit.return_value = cursor
+        cursor.to_list = AsyncMock(return_value=[])
+        last_date = datetime(2022, 7, 20)
+
+        await TransactionManager(db).get_all(
+            sender="wallet",
+            date_from=datetime(2022, 7, 1),
+            limit=10,
+            after=(last_date, "id"),
+        )
+
+        db["transactions"].find.assert_called_once_with(
+            {
+                "sender": "wallet",
+                "date": {"$gte": datetime(2022, 7, 1)},
+                "$or": [
+                    {"date": {"$lt": last_date}},
+                    {"date": last_date, "_id": {"$lt": "id"}},
+                ],
+            }
+        )
+        cursor.sort.assert_called_once_with([("date", -1), ("_id", -1)])
+        cursor.limit.assert_called_once_with(10)
+
+    async def test_update_moves_amounts_between_wallet_totals(self):
+        db = fake_db("transactions", "wallet_stats")
+        before = {"_id": "id", "sender": "a", "receiver": "b", "amount": 5.0}
+        db["transactions"].find_one_and_update = AsyncMock(return_value=before)
+        db["wallet_stats"].bulk_write = AsyncMock()
+
+        result = await TransactionManager(db).update(
+            "id", UpdateTransactionModel(receiver="c", amount=7)
+        )
+
+        self.assertEqual(result, dict(before, receiver="c", amount=7.0, version=1))
+        stats, = db["wallet_stats"].bulk_write.call_args.args
+        self.assertEqual(
+            {update._filter["_id"]: update._doc["$inc"] for update in stats},
+            {
+                "a": {"sent": 2.0, "sent_count": 0},
+                "b": {"received": -5.0, "received_count": -1},
+                "c": {"received": 7.0, "received_count": 1},
+            },
+        )
+
+    async def test_stats_failures_do_not_fail_stored_writes(self):
+        db = fake_db("transactions", "wallet_stats")
+        db["transactions"].insert_one = AsyncMock()
+        db["transactions"].bulk_write = AsyncMock()
+        before = {"_id": "id", "sender": "a", "receiver": "b", "amount": 5.0}
+        db["transactions"].find_one_and_update = AsyncMock(return_value=before)
+        db["wallet_stats"].bulk_write = AsyncMock(side_effect=RuntimeError("down"))
+        manager = TransactionManager(db)
+
+        added = await manager.add(transaction())
+        models, duplicates, errors = await manager.add_many([transaction("k")])
+        updated = await manager.update("id", UpdateTransactionModel(amount=7))
+
+        self.assertEqual(added["sender"], "asd")
+        self.assertEqual((len(models), duplicates, errors), (1, {}, {}))
+        self.assertEqual(updated["amount"], 7.0)
+        self.assertEqual(db["wallet_stats"].bulk_write.await_count, 3)
+
+    async def test_update_not_found(self):
+        db = fake_db("transactions", "wallet_stats")
+        db["transactions"].find_one_and_update = AsyncMock(return_value=None)
+        db["wallet_stats"].bulk_write = AsyncMock()
+
+        result = await TransactionManager(db).update(
+            "missing", UpdateTransactionModel(amount=1)
+        )
+
+        self.assertIsNone(result)
+        db["wallet_stats"].bulk_write.assert_not_awaited()
@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import AsyncMock
+
+from app.adapters.dtos.wallets import WalletStatsResponseDto
+from app.db.impl.wallet_stats_manager import REBUILD_PIPELINE, WalletStatsManager
+from tests.db.imp.test_transaction_manager import fake_db
+
+
+class TestWalletStatsManager(unittest.IsolatedAsyncioTestCase):
+    async def test_get_unknown_wallet_has_empty_totals(self):
+        db = fake_db("wallet_stats")
+        db["wallet_stats"].find_one = AsyncMock(return_value=None)
+
+        stats = await WalletStatsManager(db).get("wallet")
+
+        self.assertEqual(
+            stats,
+            {
+                "_id": "wallet",
+                "sent": 0.0,
+                "received": 0.0,
+                "sent_count": 0,
+                "received_count": 0,
+            },
+        )
+
+    async def test_get_one_sided_wallets_have_zero_other_side(self):
+        db = fake_db("wallet_stats")
+        manager = WalletStatsManager(db)
+
+        db["wallet_stats"].find_one = AsyncMock(
+            return_value={"_id": "a", "sent": 3.0, "sent_count": 1}
+        )
+        sender = WalletStatsResponseDto.from_stats(await manager.get("a"))
+        db["wallet_stats"].find_one = AsyncMock(
+            return_value={"_id": "b", "received": 3.0, "received_count": 1}
+        )
+        receiver = WalletStatsResponseDto.from_stats(await manager.get("b"))
+
+        self.assertEqual((sender.received, sender.received_count), (0.0, 0))
+        self.assertEqual(sender.net, -3.0)
+        self.assertEqual((receiver.sent, receiver.sent_count), (0.0, 0))
+        self.assertEqual(receiver.net, 3.0)
+
+    async def test_record_inserts_the_other_side_at_zero(self):
+        db = fake_db("wallet_stats")
+        db["wallet_stats"].bulk_write = AsyncMock()
+
+        await WalletStatsManager(db).record(
+            [{"sender": "a", "receiver": "b", "amount": 3.0}]
+        )
+
+        updates, = db["wallet_stats"].bulk_write.call_args.args
+        documents = {update._filter["_id"]: update._doc for update in updates}
+        self.assertEqual(
+            documents["a"],
+            {
+                "$inc": {"sent": 3.0, "sent_count": 1},
+                "$setOnInsert": {"received": 0.0, "received_count": 0},
+            },
+        )
+        self.assertEqual(
+            documents["b"]["$setOnInsert"], {"sent": 0.0, "sent_count": 0}
+        )
+
+    async def test_record_nothing_does_not_write(self):
+        db = fake_db("wallet_stats")
+        db["wallet_stats"].bulk_write = AsyncMock()
+
+        await WalletStatsManager(db).record([])
+
+        db["wallet_stats"].bulk_write.assert_not_awaited()
+
+    async def test_rebuild_swaps_in_recomputed_totals(self):
+        db = fake_db("transactions", "wallet_stats", "wallet_stats_rebuild")
+        db["transactions"].aggregate.return_value.to_list = AsyncMock(return_value=[])
+        db.list_collection_names = AsyncMock(return_value=["wallet_stats_rebuild"])
+        db["wallet_stats_rebuild"].rename = AsyncMock()
+        db["wallet_stats"].count_documents = AsyncMock(return_value=3)
+
+        wallets = await WalletStatsManager(db).rebuild()
+
+        self.assertEqual(wallets, 3)
+        pipeline, = db["transactions"].aggregate.call_args.args
+        self.assertEqual(
+            pipeline, REBUILD_PIPELINE + [{"$out": "wallet_stats_rebuild"}]
+        )
+        db["wallet_stats_rebuild"].rename.assert_awaited_once_with(
+            "wallet_stats", dropTarget=True
+        )
@@ -0,0 +1,153 @@
+import asyncio
+import unittest
+
+from app.rest.cache import TTLCache
+from app.rest.cache_backends import MemoryCacheBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.calls = 0
+
+    def cache(self, max_size=10, **kwargs) -> TTLCache:
+        backend = MemoryCacheBackend(max_size, clock=self.clock)
+        return TTLCache("test", backend, clock=self.clock, **kwargs)
+
+    async def load(self, value="value", delay=0):
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return f"{value}-{self.calls}"
+
+    async def test_hit_after_miss(self):
+        cache = self.cache(ttl=10)
+
+        first = await cache.get_or_load("k", self.load)
+        second = await cache.get_or_load("k", self.load)
+
+        assert first == second == "value-1"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    async def test_concurrent_misses_share_one_load(self):
+        cache = self.cache(ttl=10)
+
+        results = await asyncio.gather(
+            *[cache.get_or_load("k", lambda: self.load(delay=0.01)) for _ in range(5)]
+        )
+
+        assert results == ["value-1"] * 5
+        assert self.calls == 1
+
+    async def test_expired_entry_is_reloaded(self):
+        cache = self.cache(ttl=10)
+        await cache.get_or_load("k", self.load)
+
+        self.clock.now = 11
+        value = await cache.get_or_load("k", self.load)
+
+        assert value == "value-2"
+
+    async def test_stale_entry_is_served_while_revalidating(self):
+        cache = self.cache(ttl=10, stale_ttl=5)
+        await cache.get_or_load("k", self.load)
+
+        self.clock.now = 12
+        stale = await cache.get_or_load("k", self.load)
+        await asyncio.sleep(0.01)
+        fresh = await cache.get_or_load("k", self.load)
+
+        assert stale == "value-1"
+        assert fresh == "value-2"
+        assert cache.stats()["stale_hits"] == 1
+
+    async def test_lru_eviction(self):
+        cache = self.cache(max_size=2, ttl=10)
+        await cache.get_or_load("a", self.load)
+        await cache.get_or_load("b", self.load)
+        await cache.get_or_load("a", self.load)
+        await cache.get_or_load("c", self.load)
+
+        assert await cache.get_or_load("a", self.load) == "value-1"
+        assert await cache.get_or_load("b", self.load) == "value-4"
+        assert cache.stats()["evictions"] == 2
+
+    async def test_invalidate_during_load_does_not_repopulate(self):
+        cache = self.cache(ttl=10)
+
+        pending = asyncio.ensure_future(
+            cache.get_or_load("k", lambda: self.load(delay=0.01))
+        )
+        await asyncio.sleep(0)
+        await cache.invalidate("k")
+
+        assert await pending == "value-1"
+        assert cache.stats()["size"] == 0
+
+    async def test_failed_load_is_not_cached(self):
+        cache = self.cache(ttl=10)
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            await cache.get_or_load("k", fail)
+
+        assert await cache.get_or_load("k", self.load) == "value-1"
+
+    async def load_many(self, keys, delay=0):
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return {key: f"{key}-{self.calls}" for key in keys if key != "missing"}
+
+    async def test_many_loads_only_misses_in_one_call(self):
+        cache = self.cache(ttl=10)
+        await cache.get_or_load("a", self.load)
+
+        found = await cache.get_or_load_many(["a", "b", "missing"], self.load_many)
+
+        assert found == {"a": "value-1", "b": "b-2"}
+        assert await cache.get_or_load("b", self.load) == "b-2"
+        assert cache.stats()["size"] == 2
+
+    async def test_concurrent_many_share_loads_with_single_gets(self):
+        cache = self.cache(ttl=10)
+
+        single, *batches = await asyncio.gather(
+            cache.get_or_load("a", lambda: self.load(delay=0.01)),
+            cache.get_or_load_many(["a", "b"], lambda k: self.load_many(k, 0.01)),
+            cache.get_or_load_many(["a", "b"], lambda k: self.load_many(k, 0.01)),
+        )
+
+        assert batches[0] == batches[1] == {"a": single, "b": batches[0]["b"]}
+        assert self.calls == 2
+
+    async def test_many_serves_stale_entries_while_revalidating(self):
+        cache = self.cache(ttl=10, stale_ttl=5)
+        await cache.get_or_load_many(["a"], self.load_many)
+
+        self.clock.now = 12
+        stale = await cache.get_or_load_many(["a"], self.load_many)
+        await asyncio.sleep(0.01)
+        fresh = await cache.get_or_load_many(["a"], self.load_many)
+
+        assert stale == {"a": "a-1"}
+        assert fresh == {"a": "a-2"}
+        assert cache.stats()["stale_hits"] == 1
+
+    async def test_failed_many_load_is_left_out(self):
+        cache = self.cache(ttl=10)
+
+        async def fail(keys):
+            raise RuntimeError("boom")
+
+        assert await cache.get_or_load_many(["a"], fail) == {}
+        assert await cache.get_or_load_many(["a"], self.load_many) == {"a": "a-1"}
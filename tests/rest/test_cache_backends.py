@@ -0,0 +1,89 @@
+import unittest
+
+from fakeredis import aioredis
+
+from app.rest.cache import TTLCache
+from app.rest.cache_backends import (
+    CacheEntry,
+    Codec,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+)
+from app.rest.dtos.user import UserResponseDto
+
+
+def get_user_response_mock(user_id: str = "id") -> UserResponseDto:
+    return UserResponseDto(
+        firebase_id="asd",
+        id=user_id,
+        email="mail@mail.com",
+        first_name="name",
+        last_name="lastname",
+        role="LISTENER",
+        location="Buenos Aires",
+        status="ACTIVE",
+    )
+
+
+class TestMemoryCacheBackend(unittest.IsolatedAsyncioTestCase):
+    async def test_drops_entries_after_stale_window(self):
+        now = [0.0]
+        backend = MemoryCacheBackend(10, clock=lambda: now[0])
+        await backend.set("k", CacheEntry("value", 5, 10), None)
+
+        now[0] = 9
+        assert (await backend.get("k", None)).value == "value"
+        now[0] = 10
+        assert await backend.get("k", None) is None
+
+
+class TestRedisCacheBackend(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.redis = aioredis.FakeRedis()
+
+    async def asyncTearDown(self):
+        await self.redis.flushall()
+        await self.redis.close()
+
+    async def test_round_trips_models(self):
+        backend = RedisCacheBackend(self.redis, clock=lambda: 0)
+        codec = Codec.for_model_list(UserResponseDto)
+        users = [get_user_response_mock("a"), get_user_response_mock("b")]
+
+        await backend.set("k", CacheEntry(users, 5, 10), codec)
+        entry = await backend.get("k", codec)
+
+        assert entry.value == users
+        assert entry.expires_at == 5
+        assert 0 < await self.redis.pttl("profiles:k") <= 10000
+
+    async def test_caches_share_entries_through_redis(self):
+        calls = []
+
+        async def load():
+            calls.append(1)
+            return get_user_response_mock()
+
+        codec = Codec.for_model(UserResponseDto)
+        worker_a = TTLCache("users", RedisCacheBackend(self.redis), 60, codec=codec)
+        worker_b = TTLCache("users", RedisCacheBackend(self.redis), 60, codec=codec)
+
+        first = await worker_a.get_or_load("id", load)
+        second = await worker_b.get_or_load("id", load)
+
+        assert first == second
+        assert len(calls) == 1
+        assert worker_b.stats()["hits"] == 1
+
+    async def test_backend_failure_degrades_to_miss(self):
+        backend = RedisCacheBackend(self.redis)
+        await self.redis.close()
+        backend.redis = None
+        cache = TTLCache("users", backend, 60, codec=Codec.for_model(UserResponseDto))
+
+        async def load():
+            return get_user_response_mock()
+
+        user = await cache.get_or_load("id", load)
+
+        assert user.id == "id"
@@ -0,0 +1,159 @@
+import unittest
+
+import httpx
+import respx
+
+from app.rest.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    UpstreamTransport,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            "multimedia",
+            failure_threshold=0.5,
+            min_requests=4,
+            window=10,
+            reset_timeout=5,
+            clock=self.clock,
+        )
+
+    def fail(self, times: int):
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record(False)
+
+    def test_opens_on_error_rate_once_window_has_enough_calls(self):
+        self.breaker.record(True)
+        self.fail(2)
+        assert self.breaker.state == CLOSED
+
+        self.fail(1)
+
+        assert self.breaker.state == OPEN
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        assert self.breaker.rejected == 1
+
+    def test_old_outcomes_leave_the_window(self):
+        self.fail(3)
+        self.clock.now += 11
+
+        self.fail(1)
+
+        assert self.breaker.state == CLOSED
+        assert self.breaker.error_rate() == 1.0
+
+    def test_half_open_lets_one_trial_through(self):
+        self.fail(4)
+        self.clock.now += 5
+
+        self.breaker.before_call()
+        assert self.breaker.state == HALF_OPEN
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record(True)
+        assert self.breaker.state == CLOSED
+        assert self.breaker.stats()["requests"] == 0
+
+    def test_failed_trial_reopens(self):
+        self.fail(4)
+        self.clock.now += 5
+        self.breaker.before_call()
+
+        self.breaker.record(False)
+
+        assert self.breaker.state == OPEN
+        with self.assertRaises(CircuitOpenError) as error:
+            self.breaker.before_call()
+        assert error.exception.retry_after == 5
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_percentiles_over_a_sliding_window(self):
+        latency = LatencyTracker(window=10, min_samples=5)
+        for seconds in range(4):
+            latency.record(seconds)
+        assert latency.percentile(0.5) is None
+
+        for seconds in range(4, 20):
+            latency.record(seconds)
+
+        assert latency.percentile(0.5) == 15
+        assert latency.percentile(0.99) == 19
+
+
+class TestUpstreamTransport(unittest.IsolatedAsyncioTestCase):
+    test_url = "https://test-api.com"
+
+    async def asyncSetUp(self):
+        self.breaker = CircuitBreaker("users", min_requests=2, reset_timeout=60)
+        self.latency = LatencyTracker(min_samples=1)
+        self.transport = UpstreamTransport(
+            httpx.AsyncHTTPTransport(),
+            self.breaker,
+            self.latency,
+            max_timeout=10,
+            min_timeout=0.5,
+            factor=3,
+        )
+        self.http = httpx.AsyncClient(transport=self.transport)
+
+    async def asyncTearDown(self):
+        await self.http.aclose()
+
+    @respx.mock
+    async def test_server_errors_open_the_circuit_and_fast_fail(self, respx_mock):
+        route = respx_mock.get(f"{self.test_url}/users/1").mock(
+            return_value=httpx.Response(503)
+        )
+        for _ in range(2):
+            await self.http.get(f"{self.test_url}/users/1")
+
+        with self.assertRaises(CircuitOpenError):
+            await self.http.get(f"{self.test_url}/users/1")
+
+        assert route.call_count == 2
+        assert self.transport.stats()["state"] == OPEN
+
+    @respx.mock
+    async def test_not_found_is_not_a_failure(self, respx_mock):
+        respx_mock.get(f"{self.test_url}/users/1").mock(
+            return_value=httpx.Response(404)
+        )
+        for _ in range(3):
+            await self.http.get(f"{self.test_url}/users/1")
+
+        assert self.breaker.state == CLOSED
+
+    @respx.mock
+    async def test_read_timeout_follows_observed_latency(self, respx_mock):
+        route = respx_mock.get(f"{self.test_url}/users/1").mock(
+            return_value=httpx.Response(200, json={})
+        )
+        assert self.transport.timeout() == 10
+
+        self.latency.record(0.1)
+        await self.http.get(f"{self.test_url}/users/1")
+
+        assert route.calls.last.request.extensions["timeout"]["read"] == 0.5
+        self.latency.record(2)
+        self.latency.record(2)
+        assert self.transport.timeout() == 6
@@ -0,0 +1,126 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+
+from app.rest.circuit_breaker import LatencyTracker
+from app.rest.hedging import Hedger
+from app.rest.multimedia_client import MultimediaClient
+from tests.rest.test_multimedia_client import get_song_response_mock
+
+
+def latency(seconds: float) -> LatencyTracker:
+    tracker = LatencyTracker(min_samples=1)
+    tracker.record(seconds)
+    return tracker
+
+
+class Upstream:
+    """Answers each call after the next delay in line."""
+
+    def __init__(self, *delays: float, error: Exception = None):
+        self.delays = list(delays)
+        self.error = error
+        self.started = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        call = self.started
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delays[call])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None and call == 0:
+            raise self.error
+        return call
+
+
+class TestHedger(unittest.IsolatedAsyncioTestCase):
+    async def test_fast_calls_are_not_hedged(self):
+        hedger = Hedger(latency(0.05))
+        upstream = Upstream(0)
+
+        assert await hedger.run(upstream) == 0
+        assert upstream.started == 1
+        assert hedger.stats()["hedges"] == 0
+
+    async def test_slow_call_is_hedged_and_the_loser_cancelled(self):
+        hedger = Hedger(latency(0.01))
+        upstream = Upstream(1, 0)
+
+        assert await hedger.run(upstream) == 1
+        await asyncio.sleep(0)
+        assert upstream.cancelled == 1
+        assert hedger.stats()["hedge_wins"] == 1
+
+    async def test_primary_can_still_win_after_hedging(self):
+        hedger = Hedger(latency(0.01))
+        upstream = Upstream(0.02, 1)
+
+        assert await hedger.run(upstream) == 0
+        assert hedger.stats()["hedges"] == 1
+        assert hedger.stats()["hedge_wins"] == 0
+
+    async def test_fast_failure_does_not_beat_a_success(self):
+        hedger = Hedger(latency(0.01))
+        upstream = Upstream(0.02, 0.05, error=httpx.ConnectError("reset"))
+
+        assert await hedger.run(upstream) == 1
+
+    async def test_budget_caps_hedges(self):
+        hedger = Hedger(latency(0.01), budget=0.5, max_tokens=1)
+        hedger.tokens = 0
+
+        await hedger.run(Upstream(0.02, 0))
+        await hedger.run(Upstream(0.02, 0))
+
+        assert hedger.stats()["hedges"] == 1
+        assert hedger.stats()["budget_exhausted"] == 1
+
+    async def test_no_hedging_without_latency_samples(self):
+        hedger = Hedger(LatencyTracker(min_samples=1))
+        upstream = Upstream(0.02)
+
+        assert await hedger.run(upstream) == 0
+        assert hedger.stats()["calls"] == 1
+        assert hedger.stats()["hedges"] == 0
+
+
+class TestHedgedMultimediaClient(unittest.IsolatedAsyncioTestCase):
+    async def test_get_song_takes_the_first_response(self):
+        song = get_song_response_mock()
+        delays = [1, 0]
+
+        async def get(url):
+            await asyncio.sleep(delays.pop(0))
+            return httpx.Response(200, json=song.dict())
+
+        http = MagicMock()
+        http.get = AsyncMock(side_effect=get)
+        hedger = Hedger(latency(0.01))
+        client = MultimediaClient("https://test-api.com", http, hedger=hedger)
+
+        assert await client.get_song("id") == song
+        assert http.get.await_count == 2
+        assert hedger.stats()["hedge_wins"] == 1
+
+    async def test_fast_server_error_does_not_beat_a_success(self):
+        song = get_song_response_mock()
+        responses = [(0.02, 503), (0.05, 200)]
+
+        async def get(url):
+            delay, status = responses.pop(0)
+            await asyncio.sleep(delay)
+            request = httpx.Request("GET", url)
+            return httpx.Response(status, json=song.dict(), request=request)
+
+        http = MagicMock()
+        http.get = AsyncMock(side_effect=get)
+        hedger = Hedger(latency(0.01))
+        client = MultimediaClient("https://test-api.com", http, hedger=hedger)
+
+        assert await client.get_song("id") == song
+        assert hedger.stats()["hedge_wins"] == 1
@@ -1,8 +1,13 @@
+import asyncio
 import unittest
 import httpx
 import respx
 
+from app.conf.config import Settings
 from app.rest import MultimediaClient
+from app.rest.cache import CatalogCache
+from app.rest.cache_backends import CacheBackends
+from app.rest.multimedia_client import BatchSupport
 from app.rest.dtos.album import AlbumResponseDto
 from app.rest.dtos.artist import ArtistModel
 from app.rest.dtos.playlist import PlaylistResponseDto
@@ -67,117 +72,147 @@ def get_playlist_response_mock() -> PlaylistResponseDto:
     )
 
 
-class TestMultimediaClient(unittest.TestCase):
+class TestMultimediaClient(unittest.IsolatedAsyncioTestCase):
     test_url = "https://test-api.com"
 
+    async def asyncSetUp(self):
+        self.http = httpx.AsyncClient()
+
+    async def asyncTearDown(self):
+        await self.http.aclose()
+
     @respx.mock
-    def test_create_album(self, respx_mock):
+    async def test_create_album(self, respx_mock):
         mock = get_album_response_mock()
         req = AlbumRequestDto(**mock.dict())
         respx_mock.post(f"{self.test_url}/albums", json=req.dict()).mock(
             return_value=get_mocked_album_response(201, mock))
-        client = MultimediaClient(self.test_url)
-        dto, album_id = client.create_album(req)
+        client = MultimediaClient(self.test_url, self.http)
+        dto, album_id = await client.create_album(req)
 
         assert dto.title == "title"
         assert album_id == "id"
 
     @respx.mock
-    def test_create_album_error(self, respx_mock):
+    async def test_create_album_error(self, respx_mock):
         mock = get_album_response_mock()
         req = AlbumRequestDto(**mock.dict())
         respx_mock.post(f"{self.test_url}/albums", json=req.dict()).mock(
             return_value=get_mocked_album_response(500, mock))
-        client = MultimediaClient(self.test_url)
-        self.assertRaises(
-            Exception, client.create_album, req
-        )
+        client = MultimediaClient(self.test_url, self.http)
+        with self.assertRaises(Exception):
+            await client.create_album(req)
 
     @respx.mock
-    def test_create_song(self, respx_mock):
+    async def test_create_song(self, respx_mock):
         mock = get_song_response_mock()
         req = SongRequestDto(**mock.dict())
         respx_mock.post(f"{self.test_url}/songs", json=req.dict()).mock(
             return_value=get_mocked_song_response(201, mock))
-        client = MultimediaClient(self.test_url)
-        dto, album_id = client.create_song(req)
+        client = MultimediaClient(self.test_url, self.http)
+        dto, album_id = await client.create_song(req)
 
         assert dto.title == "title"
         assert album_id == "id"
 
     @respx.mock
-    def test_create_song_error(self, respx_mock):
+    async def test_create_song_error(self, respx_mock):
         mock = get_song_response_mock()
         req = SongRequestDto(**mock.dict())
         respx_mock.post(f"{self.test_url}/songs", json=req.dict()).mock(
             return_value=get_mocked_song_response(500, mock))
-        client = MultimediaClient(self.test_url)
-        self.assertRaises(
-            Exception, client.create_song, req
-        )
+        client = MultimediaClient(self.test_url, self.http)
+        with self.assertRaises(Exception):
+            await client.create_song(req)
 
     @respx.mock
-    def test_create_playlist(self, respx_mock):
+    async def test_create_playlist(self, respx_mock):
         mock = get_playlist_response_mock()
         req = PlaylistRequestDto(**mock.dict())
         respx_mock.post(f"{self.test_url}/playlists/", json=req.dict()).mock(
             return_value=get_mocked_playlist_response(201, mock))
-        client = MultimediaClient(self.test_url)
-        dto, album_id = client.create_playlist(req)
+        client = MultimediaClient(self.test_url, self.http)
+        dto, album_id = await client.create_playlist(req)
 
         assert dto.title == "title"
         assert album_id == "id"
 
     @respx.mock
-    def test_create_playlist_error(self, respx_mock):
+    async def test_create_playlist_error(self, respx_mock):
         mock = get_playlist_response_mock()
         req = PlaylistRequestDto(**mock.dict())
         respx_mock.post(f"{self.test_url}/playlists/", json=req.dict()).mock(
             return_value=get_mocked_playlist_response(500, mock))
-        client = MultimediaClient(self.test_url)
-        self.assertRaises(
-            Exception, client.create_playlist, req
-        )
+        client = MultimediaClient(self.test_url, self.http)
+        with self.assertRaises(Exception):
+            await client.create_playlist(req)
 
     @respx.mock
-    def test_get_song(self, respx_mock):
+    async def test_get_song(self, respx_mock):
         mock = get_song_response_mock()
         respx_mock.get(f"{self.test_url}/songs/id").mock(
             return_value=get_mocked_song_response(200, mock))
-        client = MultimediaClient(self.test_url)
-        dto = client.get_song("id")
+        client = MultimediaClient(self.test_url, self.http)
+        dto = await client.get_song("id")
 
         assert dto.title == "title"
 
     @respx.mock
-    def test_create_song_error(self, respx_mock):
+    async def test_get_song_error(self, respx_mock):
         mock = get_song_response_mock()
         respx_mock.get(f"{self.test_url}/songs/id").mock(
             return_value=get_mocked_song_response(500, mock))
-        client = MultimediaClient(self.test_url)
-        self.assertRaises(
-            Exception, client.get_song, "id"
-        )
+        client = MultimediaClient(self.test_url, self.http)
+        with self.assertRaises(Exception):
+            await client.get_song("id")
 
     @respx.mock
-    def test_get_album(self, respx_mock):
+    async def test_get_album(self, respx_mock):
         mock = get_album_response_mock()
         respx_mock.get(f"{self.test_url}/albums/id").mock(
             return_value=get_mocked_album_response(200, mock))
-        client = MultimediaClient(self.test_url)
-        dto = client.get_album("id")
+        client = MultimediaClient(self.test_url, self.http)
+        dto = await client.get_album("id")
 
         assert dto.title == "title"
 
     @respx.mock
-    def test_get_album_error(self, respx_mock):
+    async def test_get_album_error(self, respx_mock):
         mock = get_album_response_mock()
         respx_mock.get(f"{self.test_url}/albums/id").mock(
             return_value=get_mocked_album_response(500, mock))
-        client = MultimediaClient(self.test_url)
-        self.assertRaises(
-            Exception, client.get_album, "id"
-        )
+        client = MultimediaClient(self.test_url, self.http)
+        with self.assertRaises(Exception):
+            await client.get_album("id")
+
+    @respx.mock
+    async def test_get_songs_keeps_order_and_skips_errors(self, respx_mock):
+        for song_id in ["a", "c", "d"]:
+            mock = get_song_response_mock()
+            mock.id = song_id
+            respx_mock.get(f"{self.test_url}/songs/{song_id}").mock(
+                return_value=get_mocked_song_response(200, mock))
+        respx_mock.get(f"{self.test_url}/songs/b").mock(
+            return_value=httpx.Response(status_code=500))
+        client = MultimediaClient(self.test_url, self.http, max_concurrency=2)
+        dtos = await client.get_songs(["d", "a", "b", "c"])
+
+        assert [dto.id for dto in dtos] == ["d", "a", "c"]
+
+    @respx.mock
+    async def test_get_playlists(self, respx_mock):
+        playlist = get_playlist_response_mock()
+        respx_mock.get(f"{self.test_url}/playlists/id").mock(
+            return_value=get_mocked_playlist_response(200, playlist))
+        respx_mock.get(f"{self.test_url}/playlists/missing").mock(
+            return_value=httpx.Response(status_code=404))
+        respx_mock.get(f"{self.test_url}/songs/song_id").mock(
+            return_value=get_mocked_song_response(200, get_song_response_mock()))
+        client = MultimediaClient(self.test_url, self.http, max_concurrency=1)
+        dtos = await client.get_playlists(["missing", "id"])
+
+        assert len(dtos) == 1
+        assert dtos[0].songs[0].title == "title"
 
     # @respx.mock
     # def test_get_playlist(self, respx_mock):
@@ -199,3 +234,132 @@ class TestMultimediaClient(unittest.TestCase):
     #         Exception, client.get_playlist, "id"
     #     )
 
+
+
+def song_json(song_id: str) -> dict:
+    mock = get_song_response_mock()
+    mock.id = song_id
+    return mock.dict()
+
+
+class TestMultimediaClientBatches(unittest.IsolatedAsyncioTestCase):
+    test_url = "https://test-api.com"
+
+    async def asyncSetUp(self):
+        self.http = httpx.AsyncClient()
+
+    async def asyncTearDown(self):
+        await self.http.aclose()
+
+    @respx.mock
+    async def test_probe_then_batches_with_ids(self, respx_mock):
+        probe = respx_mock.get(f"{self.test_url}/songs", params={"ids": "c"}).mock(
+            return_value=httpx.Response(200, json=[song_json("c")]))
+        batch = respx_mock.get(f"{self.test_url}/songs", params={"ids": "a,b"}).mock(
+            return_value=httpx.Response(200, json=[song_json("a")]))
+        batching = BatchSupport()
+        client = MultimediaClient(
+            self.test_url, self.http, batching=batching, batch_size=2)
+
+        dtos = await client.get_songs_batch(["c", "a", "b", "a"])
+
+        assert [dto.id for dto in dtos] == ["c", "a", "a"]
+        assert probe.call_count == 1
+        assert batch.call_count == 1
+        assert batching.supports("songs") is True
+
+    @respx.mock
+    async def test_falls_back_to_single_fetches(self, respx_mock):
+        # an upstream without ids= support answers with its whole listing
+        probe = respx_mock.get(f"{self.test_url}/albums", params={"ids": "x"}).mock(
+            return_value=httpx.Response(200, json=[{"id": "other"}]))
+        for album_id in ["x", "y"]:
+            album = get_album_response_mock()
+            album.id = album_id
+            respx_mock.get(f"{self.test_url}/albums/{album_id}").mock(
+                return_value=get_mocked_album_response(200, album))
+        batching = BatchSupport()
+        client = MultimediaClient(self.test_url, self.http, batching=batching)
+
+        dtos = await client.get_albums_batch(["x", "y"])
+        await client.get_albums_batch(["y"])
+
+        assert [dto.id for dto in dtos] == ["x", "y"]
+        assert probe.call_count == 1
+        assert batching.supports("albums") is False
+
+    @respx.mock
+    async def test_empty_probe_answer_decides_nothing(self, respx_mock):
+        probe = respx_mock.get(f"{self.test_url}/songs", params={"ids": "a"}).mock(
+            return_value=httpx.Response(200, json=[]))
+        respx_mock.get(f"{self.test_url}/songs/a").mock(
+            return_value=httpx.Response(200, json=song_json("a")))
+        batching = BatchSupport()
+        client = MultimediaClient(self.test_url, self.http, batching=batching)
+
+        dtos = await client.get_songs_batch(["a"])
+
+        assert [dto.id for dto in dtos] == ["a"]
+        assert probe.call_count == 1
+        assert batching.supports("songs") is None
+
+    @respx.mock
+    async def test_batches_keep_only_the_requested_ids(self, respx_mock):
+        respx_mock.get(f"{self.test_url}/songs", params={"ids": "a,b"}).mock(
+            return_value=httpx.Response(
+                200, json=[song_json("a"), song_json("b"), song_json("z")]))
+        batching = BatchSupport()
+        batching.set("songs", True)
+        client = MultimediaClient(self.test_url, self.http, batching=batching)
+
+        found = await client.get_songs_by_id(["a", "b"])
+
+        assert sorted(found) == ["a", "b"]
+
+    @respx.mock
+    async def test_cached_batches_share_loads_and_serve_stale(self, respx_mock):
+        route = respx_mock.get(f"{self.test_url}/songs", params={"ids": "s1"}).mock(
+            return_value=httpx.Response(200, json=[song_json("s1")]))
+        settings = Settings(
+            title="test", version="1", db_path="", users_api="", multimedia_api="",
+            cache_song_ttl=0, cache_stale_ttl=60,
+        )
+        cache = CatalogCache(settings, CacheBackends(settings))
+        batching = BatchSupport()
+        batching.set("songs", True)
+        client = MultimediaClient(
+            self.test_url, self.http, cache=cache, batching=batching)
+
+        results = await asyncio.gather(*[client.get_songs(["s1"]) for _ in range(3)])
+        assert route.call_count == 1
+
+        # with no TTL the entry is stale at once: served, then refreshed
+        stale = await client.get_songs(["s1"])
+        await asyncio.sleep(0.01)
+
+        assert [[s.id for s in songs] for songs in results] == [["s1"]] * 3
+        assert [s.id for s in stale] == ["s1"]
+        assert cache.songs.stats()["stale_hits"] == 1
+        assert route.call_count == 2
+
+    @respx.mock
+    async def test_playlists_resolve_all_songs_in_one_batch(self, respx_mock):
+        playlists = []
+        for playlist_id, songs in [("p1", ["a", "b"]), ("p2", ["b", "c"])]:
+            playlist = get_playlist_response_mock()
+            playlist.id, playlist.songs = playlist_id, songs
+            playlists.append(playlist.dict())
+        respx_mock.get(f"{self.test_url}/playlists/", params={"ids": "p2,p1"}).mock(
+            return_value=httpx.Response(200, json=playlists))
+        songs = respx_mock.get(f"{self.test_url}/songs", params={"ids": "a,b,c"}).mock(
+            return_value=httpx.Response(200, json=[song_json(i) for i in "abc"]))
+        batching = BatchSupport()
+        batching.set("playlists", True)
+        batching.set("songs", True)
+        client = MultimediaClient(self.test_url, self.http, batching=batching)
+
+        dtos = await client.get_playlists_batch(["p2", "p1"])
+
+        assert [dto.id for dto in dtos] == ["p2", "p1"]
+        assert [s.id for s in dtos[0].songs] == ["b", "c"]
+        assert songs.call_count == 1
@@ -0,0 +1,108 @@
+import unittest
+import httpx
+import respx
+
+from app.rest import MultimediaClient, MultimediaLoader
+from app.rest.dtos.artist import ArtistModel
+from app.rest.multimedia_client import BatchSupport
+from app.rest.dtos.playlist import PlaylistResponseDto
+from app.rest.dtos.song import SongResponseDto
+
+
+def get_song_response_mock(song_id: str) -> SongResponseDto:
+    return SongResponseDto(
+        id=song_id,
+        title="title",
+        artists=[ArtistModel(artist_id="id", artist_name="name")],
+        description="description",
+        genre="genre",
+        song_file="file",
+    )
+
+
+def get_playlist_response_mock(playlist_id: str, songs) -> PlaylistResponseDto:
+    return PlaylistResponseDto(
+        id=playlist_id,
+        title="title",
+        songs=songs,
+        description="description",
+        owner_id="user-id",
+        is_collaborative=True,
+    )
+
+
+class TestMultimediaLoader(unittest.IsolatedAsyncioTestCase):
+    test_url = "https://test-api.com"
+
+    async def asyncSetUp(self):
+        self.http = httpx.AsyncClient()
+
+    async def asyncTearDown(self):
+        await self.http.aclose()
+
+    @respx.mock
+    async def test_get_playlists_fetches_shared_songs_once(self, respx_mock):
+        for playlist_id, songs in [("p1", ["a", "b"]), ("p2", ["b", "a"])]:
+            respx_mock.get(f"{self.test_url}/playlists/{playlist_id}").mock(
+                return_value=httpx.Response(
+                    status_code=200,
+                    json=get_playlist_response_mock(playlist_id, songs).dict(),
+                ))
+        routes = {}
+        for song_id in ["a", "b"]:
+            routes[song_id] = respx_mock.get(f"{self.test_url}/songs/{song_id}").mock(
+                return_value=httpx.Response(
+                    status_code=200, json=get_song_response_mock(song_id).dict()
+                ))
+        loader = MultimediaLoader(MultimediaClient(self.test_url, self.http))
+
+        playlists = await loader.get_playlists(["p1", "p2", "p1"])
+        songs = await loader.get_songs(["a"])
+
+        assert [p.id for p in playlists] == ["p1", "p2", "p1"]
+        assert [s.id for s in playlists[1].songs] == ["b", "a"]
+        assert songs[0].id == "a"
+        assert routes["a"].call_count == 1
+        assert routes["b"].call_count == 1
+        assert not loader.misses
+
+    @respx.mock
+    async def test_get_songs_skips_errors(self, respx_mock):
+        route = respx_mock.get(f"{self.test_url}/songs/missing").mock(
+            return_value=httpx.Response(status_code=404))
+        loader = MultimediaLoader(MultimediaClient(self.test_url, self.http))
+
+        songs = await loader.get_songs(["missing", "missing"])
+
+        assert songs == []
+        assert route.call_count == 1
+        assert loader.misses == {"song missing"}
+
+    @respx.mock
+    async def test_get_playlists_batches_songs_across_playlists(self, respx_mock):
+        playlists = [
+            get_playlist_response_mock("p1", ["a", "b"]).dict(),
+            get_playlist_response_mock("p2", ["b", "c"]).dict(),
+        ]
+        respx_mock.get(
+            f"{self.test_url}/playlists/", params={"ids": "p1,p2,missing"}
+        ).mock(
+            return_value=httpx.Response(status_code=200, json=playlists))
+        songs = respx_mock.get(f"{self.test_url}/songs", params={"ids": "a,b,c"}).mock(
+            return_value=httpx.Response(
+                status_code=200,
+                json=[get_song_response_mock(i).dict() for i in ["a", "b", "c"]],
+            ))
+        batching = BatchSupport()
+        batching.set("playlists", True)
+        batching.set("songs", True)
+        loader = MultimediaLoader(
+            MultimediaClient(self.test_url, self.http, batching=batching))
+
+        playlists = await loader.get_playlists(["p1", "p2", "missing"])
+        cached = await loader.get_songs(["c"])
+
+        assert [[s.id for s in p.songs] for p in playlists] == [["a", "b"], ["b", "c"]]
+        assert cached[0].id == "c"
+        assert songs.call_count == 1
+        assert loader.misses == {"playlist missing"}
@@ -0,0 +1,164 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.rest.dtos.artist import ArtistModel
+from app.rest.dtos.song import SongResponseDto
+from app.rest.ranking import Catalog
+from app.rest.recommendations import RecommendationEngine
+
+
+def song(song_id: str, genre: str, tier=None, artist=None) -> SongResponseDto:
+    artists = [ArtistModel(artist_id=artist, artist_name=artist)] if artist else []
+    return SongResponseDto(
+        id=song_id,
+        title=song_id,
+        artists=artists,
+        description="",
+        song_file="file",
+        genre=genre,
+        subscription=tier,
+    )
+
+
+CATALOG = {
+    "rock": [song("r1", "rock"), song("r2", "rock"), song("shared", "rock")],
+    "pop": [song("p1", "pop"), song("shared", "pop")],
+}
+
+
+class TestRecommendationEngine(unittest.IsolatedAsyncioTestCase):
+    def engine(self, **kwargs) -> RecommendationEngine:
+        self.client = MagicMock()
+
+        async def songs_by_genre(genre):
+            await asyncio.sleep(0)
+            return CATALOG[genre]
+
+        self.client.get_songs_by_genre = AsyncMock(side_effect=songs_by_genre)
+        return RecommendationEngine(self.client, **kwargs)
+
+    async def test_scores_across_all_interests(self):
+        engine = self.engine()
+
+        songs = await engine.recommend("listener", ["rock", "pop"], "free", limit=10)
+
+        # shared matches both interests, then pool positions interleave genres
+        assert [s.id for s in songs] == ["shared", "r1", "p1", "r2"]
+
+    async def test_serves_from_memory_until_interests_change(self):
+        engine = self.engine()
+
+        await engine.recommend("listener", ["rock"], "free", limit=10)
+        await engine.recommend("listener", ["rock"], "free", limit=2)
+        assert self.client.get_songs_by_genre.await_count == 1
+
+        songs = await engine.recommend("listener", ["pop"], "free", limit=10)
+        assert [s.id for s in songs] == ["p1", "shared"]
+
+    async def test_concurrent_listeners_share_one_pool_load(self):
+        engine = self.engine()
+
+        await asyncio.gather(
+            *[
+                engine.recommend(f"listener{i}", ["rock"], "free", limit=1)
+                for i in range(5)
+            ]
+        )
+
+        assert self.client.get_songs_by_genre.await_count == 1
+
+    async def test_refresh_reranks_cached_listeners(self):
+        engine = self.engine()
+        await engine.recommend("listener", ["rock"], "free", limit=10)
+        CATALOG["rock"].insert(0, song("new", "rock"))
+        try:
+            await engine.refresh()
+            songs = await engine.recommend("listener", ["rock"], "free", limit=1)
+        finally:
+            CATALOG["rock"].pop(0)
+
+        assert [s.id for s in songs] == ["new"]
+
+    async def test_limit_is_capped_and_failed_genres_are_skipped(self):
+        engine = self.engine(max_limit=2)
+
+        songs = await engine.recommend("listener", ["jazz", "rock"], "free", limit=10)
+
+        assert [s.id for s in songs] == ["r1", "r2"]
+        # the failed genre is retried instead of caching a partial list
+        await engine.recommend("listener", ["jazz", "rock"], "free", limit=10)
+        assert self.client.get_songs_by_genre.await_count == 3
+
+    async def test_changing_subscription_reranks(self):
+        engine = self.engine()
+        await engine.recommend("listener", ["rock"], "free", limit=10)
+
+        engine.pools["rock"] = [song("gold", "rock", tier="premium")]
+        engine._catalog = None
+        free = await engine.recommend("listener", ["rock"], "free", limit=10)
+        premium = await engine.recommend("listener", ["rock"], "premium", limit=10)
+
+        # free is still served from the listener's cached ranking
+        assert [s.id for s in free] == ["r1", "r2", "shared"]
+        assert [s.id for s in premium] == ["gold"]
+
+    async def test_genre_pools_are_capped_least_recently_used_first(self):
+        engine = self.engine(max_genres=1)
+
+        await engine.recommend("listener", ["rock"], "free", limit=10)
+        songs = await engine.recommend("other", ["pop"], "free", limit=10)
+
+        assert list(engine.pools) == ["pop"]
+        assert [s.id for s in songs] == ["p1", "shared"]
+
+    async def test_refresh_drops_genres_nobody_requested(self):
+        engine = self.engine()
+        await engine.recommend("listener", ["rock", "pop"], "free", limit=10)
+        await engine.refresh()
+        await engine.recommend("other", ["pop"], "free", limit=10)
+
+        await engine.refresh()
+
+        assert list(engine.pools) == ["pop"]
+        # refetched rock and pop, then only pop
+        assert self.client.get_songs_by_genre.await_count == 5
+
+
+class TestCatalog(unittest.TestCase):
+    def test_filters_by_allowed_tiers(self):
+        catalog = Catalog(
+            {
+                "rock": [
+                    song("premium", "rock", tier="premium"),
+                    song("normal", "rock", tier="normal"),
+                    song("free", "rock", tier="free"),
+                    song("untiered", "rock"),
+                    song("unknown", "rock", tier="gold"),
+                ]
+            }
+        )
+
+        ranked = catalog.rank(["rock"], ["free", "normal"], k=10)
+
+        assert [s.id for s in ranked] == ["normal", "free", "untiered"]
+        assert catalog.rank(["rock"], [""], k=10) == []
+
+    def test_skips_songs_outside_interests(self):
+        catalog = Catalog({"rock": [song("r1", "rock")], "pop": [song("p1", "pop")]})
+
+        assert [s.id for s in catalog.rank(["pop", "jazz"], ["free"], k=10)] == ["p1"]
+
+    def test_penalizes_repeated_artists(self):
+        catalog = Catalog(
+            {
+                "rock": [
+                    song("a1", "rock", artist="a"),
+                    song("a2", "rock", artist="a"),
+                    song("a3", "rock", artist="a"),
+                    song("b1", "rock", artist="b"),
+                ]
+            }
+        )
+
+        assert [s.id for s in catalog.rank(["rock"], ["free"], k=2)] == ["a1", "b1"]
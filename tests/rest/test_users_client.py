@@ -2,7 +2,10 @@ import unittest
 import httpx
 import respx
 
+from app.conf.config import Settings
 from app.rest import UserClient
+from app.rest.cache import UserCache
+from app.rest.cache_backends import CacheBackends
 from app.rest.dtos.request.user import UserRequestDto, UpdateUserRequestDto
 from app.rest.dtos.user import UserResponseDto
 
@@ -27,56 +30,61 @@ def get_user_response_mock() -> UserResponseDto:
     )
 
 
-class TestUserClient(unittest.TestCase):
+class TestUserClient(unittest.IsolatedAsyncioTestCase):
     test_url = "https://test-api.com"
 
+    async def asyncSetUp(self):
+        self.http = httpx.AsyncClient()
+
+    async def asyncTearDown(self):
+        await self.http.aclose()
+
     @respx.mock
-    def test_create_user(self, respx_mock):
+    async def test_create_user(self, respx_mock):
         mock = get_user_response_mock()
         req = UserRequestDto(**mock.dict())
         respx_mock.post(f"{self.test_url}/users", json=req.dict()).mock(
             return_value=get_mocked_response(201, mock))
-        client = UserClient(self.test_url)
-        dto = client.create_user(req)
+        client = UserClient(self.test_url, self.http)
+        dto = await client.create_user(req)
 
         assert dto.id == "id"
 
     @respx.mock
-    def test_create_user_error(self, respx_mock):
+    async def test_create_user_error(self, respx_mock):
         mock = get_user_response_mock()
         req = UserRequestDto(**mock.dict())
         respx_mock.post(f"{self.test_url}/users", json=req.dict()).mock(
             return_value=get_mocked_response(500, mock))
-        client = UserClient(self.test_url)
-        self.assertRaises(
-            Exception, client.create_user, req
-        )
+        client = UserClient(self.test_url, self.http)
+        with self.assertRaises(Exception):
+            await client.create_user(req)
 
     @respx.mock
-    def test_get_user(self, respx_mock):
+    async def test_get_user(self, respx_mock):
         mock = get_user_response_mock()
         respx_mock.get(f"{self.test_url}/users/id").mock(
             return_value=get_mocked_response(200, mock))
-        client = UserClient(self.test_url)
-        dto = client.get("id")
+        client = UserClient(self.test_url, self.http)
+        dto = await client.get("id")
 
         assert dto.id == "id"
 
     @respx.mock
-    def test_all_with_query(self, respx_mock):
+    async def test_all_with_query(self, respx_mock):
         mock = get_user_response_mock()
         respx_mock.get(f"{self.test_url}/users?user_ids=123").mock(
             return_value=httpx.Response(
                 status_code=200,
                 json=[mock.dict()],
             ))
-        client = UserClient(self.test_url)
-        dto = client.all("123")
+        client = UserClient(self.test_url, self.http)
+        dto = await client.all("123")
 
         assert len(dto) == 1
 
     @respx.mock
-    def test_all(self, respx_mock):
+    async def test_all(self, respx_mock):
         mock = get_user_response_mock()
         mock2 = get_user_response_mock()
         respx_mock.get(f"{self.test_url}/users").mock(
@@ -84,13 +92,13 @@ class TestUserClient(unittest.TestCase):
                 status_code=200,
                 json=[mock.dict(), mock2.dict()],
             ))
-        client = UserClient(self.test_url)
-        dto = client.all()
+        client = UserClient(self.test_url, self.http)
+        dto = await client.all()
 
         assert len(dto) == 2
 
     @respx.mock
-    def test_all_error(self, respx_mock):
+    async def test_all_error(self, respx_mock):
         mock = get_user_response_mock()
         req = UserRequestDto(**mock.dict())
         respx_mock.get(f"{self.test_url}/users").mock(
@@ -98,13 +106,12 @@ class TestUserClient(unittest.TestCase):
                 status_code=500,
                 json=mock.dict(),
             ))
-        client = UserClient(self.test_url)
-        self.assertRaises(
-            Exception, client.all, None
-        )
+        client = UserClient(self.test_url, self.http)
+        with self.assertRaises(Exception):
+            await client.all(None)
 
     @respx.mock
-    def test_update(self, respx_mock):
+    async def test_update(self, respx_mock):
         mock = get_user_response_mock()
         req = UpdateUserRequestDto(**mock.dict())
         respx_mock.put(f"{self.test_url}/users/123", json=req.dict()).mock(
@@ -112,13 +119,13 @@ class TestUserClient(unittest.TestCase):
                 status_code=202,
                 json=mock.dict(),
             ))
-        client = UserClient(self.test_url)
-        dto = client.update("123", req)
+        client = UserClient(self.test_url, self.http)
+        dto = await client.update("123", req)
 
         assert dto.id == "id"
 
     @respx.mock
-    def test_update_error(self, respx_mock):
+    async def test_update_error(self, respx_mock):
         mock = get_user_response_mock()
         req = UpdateUserRequestDto(**mock.dict())
         respx_mock.put(f"{self.test_url}/users/123", json=req.dict()).mock(
@@ -126,7 +133,122 @@ class TestUserClient(unittest.TestCase):
                 status_code=500,
                 json=mock.dict(),
             ))
-        client = UserClient(self.test_url)
-        self.assertRaises(
-            Exception, client.all, "123", req
+        client = UserClient(self.test_url, self.http)
+        with self.assertRaises(Exception):
+            await client.update("123", req)
+
+    @respx.mock
+    async def test_get_is_cached_until_update(self, respx_mock):
+        mock = get_user_response_mock()
+        route = respx_mock.get(f"{self.test_url}/users/id").mock(
+            return_value=get_mocked_response(200, mock))
+        respx_mock.put(f"{self.test_url}/users/id").mock(
+            return_value=get_mocked_response(202, mock))
+        settings = Settings(
+            title="test", version="1", db_path="", users_api="", multimedia_api=""
         )
+        cache = UserCache(settings, CacheBackends(settings))
+        client = UserClient(self.test_url, self.http, cache=cache)
+
+        await client.get("id")
+        await client.get("id")
+        assert route.call_count == 1
+
+        await client.update("id", UpdateUserRequestDto(**mock.dict()))
+        await client.get("id")
+        assert route.call_count == 2
+
+    @respx.mock
+    async def test_update_invalidates_user_lists(self, respx_mock):
+        mock = get_user_response_mock()
+        updated = mock.copy(update={"first_name": "other"})
+        by_ids = respx_mock.get(f"{self.test_url}/users?user_ids=id").mock(
+            side_effect=[
+                httpx.Response(status_code=200, json=[mock.dict()]),
+                httpx.Response(status_code=200, json=[updated.dict()]),
+            ]
+        )
+        everyone = respx_mock.get(f"{self.test_url}/users").mock(
+            side_effect=[
+                httpx.Response(status_code=200, json=[mock.dict()]),
+                httpx.Response(status_code=200, json=[updated.dict()]),
+            ]
+        )
+        respx_mock.put(f"{self.test_url}/users/id").mock(
+            return_value=get_mocked_response(202, updated))
+        settings = Settings(
+            title="test", version="1", db_path="", users_api="", multimedia_api=""
+        )
+        cache = UserCache(settings, CacheBackends(settings))
+        client = UserClient(self.test_url, self.http, cache=cache)
+
+        await client.all()
+        await client.all("id")
+        await client.update("id", UpdateUserRequestDto(**updated.dict()))
+
+        assert (await client.all())[0].first_name == "other"
+        assert (await client.all("id"))[0].first_name == "other"
+        assert everyone.call_count == 2
+        assert by_ids.call_count == 2
+
+    @respx.mock
+    async def test_get_many_chunks_and_reports_missing(self, respx_mock):
+        requested = []
+
+        def users_by_ids(request):
+            ids = request.url.params["user_ids"].split(",")
+            requested.append(ids)
+            if "boom" in ids:
+                return httpx.Response(status_code=500)
+            users = [
+                get_user_response_mock().copy(update={"id": user_id}).dict()
+                for user_id in ids
+                if user_id != "gone"
+            ]
+            return httpx.Response(status_code=200, json=users)
+
+        respx_mock.get(f"{self.test_url}/users").mock(side_effect=users_by_ids)
+        client = UserClient(self.test_url, self.http, batch_size=2)
+
+        users, missing = await client.get_many(["a", "b", "a", "gone", "c", "boom"])
+
+        assert sorted(map(len, requested)) == [1, 2, 2]
+        assert set(users) == {"a", "b", "c"}
+        assert missing == ["gone", "boom"]
+
+    @respx.mock
+    async def test_get_many_serves_cached_users(self, respx_mock):
+        mock = get_user_response_mock()
+        route = respx_mock.get(f"{self.test_url}/users").mock(
+            return_value=httpx.Response(status_code=200, json=[mock.dict()]))
+        settings = Settings(
+            title="test", version="1", db_path="", users_api="", multimedia_api=""
+        )
+        cache = UserCache(settings, CacheBackends(settings))
+        client = UserClient(self.test_url, self.http, cache=cache)
+
+        await client.get_many(["id"])
+        users, missing = await client.get_many(["id"])
+        assert route.call_count == 1
+        assert users["id"].id == "id"
+        assert missing == []
+
+    async def test_get_many_without_ids_does_not_call_upstream(self):
+        client = UserClient(self.test_url, self.http)
+        assert await client.get_many([]) == ({}, [])
+
+    @respx.mock
+    async def test_create_users_keeps_failures_per_request(self, respx_mock):
+        mock = get_user_response_mock()
+        ok = UserRequestDto(**mock.dict())
+        bad = UserRequestDto(**mock.copy(update={"email": "bad"}).dict())
+        respx_mock.post(f"{self.test_url}/users", json=ok.dict()).mock(
+            return_value=get_mocked_response(201, mock))
+        respx_mock.post(f"{self.test_url}/users", json=bad.dict()).mock(
+            return_value=get_mocked_response(500, mock))
+        client = UserClient(self.test_url, self.http)
+
+        created, failed = await client.create_users([ok, bad], max_concurrency=1)
+
+        assert created.id == "id"
+        assert isinstance(failed, httpx.HTTPStatusError)